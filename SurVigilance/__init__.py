@@ -4,6 +4,7 @@ __version__ = "1.0.1"
 
 
 submodules = [
+    "faers",
     "ui",
 ]
 
@@ -0,0 +1,62 @@
+"""
+Processing of the FAERS quarterly ASCII data.
+
+The functions in this module read the tables of the quarterly zips
+downloaded by ``SurVigilance.ui.scrapers.download_file`` (:func:`read_table`)
+and turn them into a Parquet dataset that can be queried without re-reading
+the text files; :func:`build_warehouse` gathers every quarter, FAERS and
+legacy AERS, into one Parquet warehouse, and :func:`update_case_index`
+tracks the latest version of every case in it. :func:`update_coded_arrays`
+stores the reactions and drugs of every report as integer-coded,
+memory-mapped arrays, and :func:`update_postings` indexes the reports of
+every drug, active ingredient and PT. :func:`update_drug_event_cube` keeps
+sparse drug x PT counts of deduplicated cases for screening every pair,
+and :func:`update_drug_pt_series` their counts in every quarter for trends.
+:func:`stratify` counts the reports of a drug by age, sex and country.
+:func:`sync_faers` keeps a data folder up to date with the quarters
+published on the FAERS website.
+"""
+
+from .coded import CodedArrays, update_coded_arrays
+from .convert import convert_quarter, table_path
+from .cube import DrugEventCube, update_drug_event_cube
+from .dedup import latest_reports, read_case_index, update_case_index
+from .pipeline import PipelineResult, download_and_ingest
+from .postings import PostingsIndex, update_postings
+from .reader import read_table
+from .series import DrugPTSeries, update_drug_pt_series
+from .strata import StratifiedCounts, stratify
+from .sync import SyncPlan, sync_faers
+from .warehouse import (
+    build_warehouse,
+    convert_to_warehouse,
+    open_warehouse,
+    quarters_with_drug,
+)
+
+__all__ = [
+    "CodedArrays",
+    "DrugEventCube",
+    "DrugPTSeries",
+    "PipelineResult",
+    "PostingsIndex",
+    "StratifiedCounts",
+    "SyncPlan",
+    "build_warehouse",
+    "convert_quarter",
+    "convert_to_warehouse",
+    "download_and_ingest",
+    "latest_reports",
+    "open_warehouse",
+    "quarters_with_drug",
+    "read_case_index",
+    "read_table",
+    "stratify",
+    "sync_faers",
+    "table_path",
+    "update_case_index",
+    "update_coded_arrays",
+    "update_drug_event_cube",
+    "update_drug_pt_series",
+    "update_postings",
+]
@@ -0,0 +1,46 @@
+"""
+Command line entry point for unattended FAERS syncs, e.g. from a nightly job::
+
+    python -m SurVigilance.faers --data-root data --since 2020Q1 --workers 4
+    python -m SurVigilance.faers --data-root data --dry-run
+"""
+
+import argparse
+import sys
+
+from .sync import sync_faers
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m SurVigilance.faers",
+        description="Download the FAERS quarterly archives that are missing locally.",
+    )
+    parser.add_argument("--data-root", default="data", help="Data folder.")
+    parser.add_argument("--since", help="First quarter to sync, e.g. 2020Q1.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan only.")
+    parser.add_argument(
+        "--no-refresh",
+        action="store_true",
+        help="Use the saved list of available quarters instead of the website.",
+    )
+    args = parser.parse_args(argv)
+
+    plan = sync_faers(
+        args.data_root,
+        since=args.since,
+        workers=args.workers,
+        dry_run=args.dry_run,
+        refresh=not args.no_refresh,
+    )
+    if plan.results is None:
+        return 0
+    print(plan.format())
+    for url, message in plan.results.failures:
+        print(f"failed: {url}: {message}", file=sys.stderr)
+    return 0 if plan.results.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
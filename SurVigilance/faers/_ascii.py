@@ -0,0 +1,137 @@
+"""
+Internal helpers to read the ``$``-delimited tables of a FAERS ASCII zip.
+
+A quarterly archive holds one text file per table, e.g. ``ASCII/DEMO24Q1.txt``
+(``ascii/DEMO04Q1.TXT`` in the legacy AERS archives up to 2012 Q3). The first
+line is the header; fields are separated by ``$`` and are never quoted. AERS
+files end every line, including the header, with an extra ``$``.
+"""
+
+import os
+import re
+import zipfile
+from collections.abc import Iterator
+
+import pyarrow as pa
+from pyarrow import csv
+
+TABLES = ("DEMO", "DRUG", "REAC", "OUTC", "RPSR", "THER", "INDI")
+
+_MEMBER_RE = re.compile(
+    r"^(DEMO|DRUG|REAC|OUTC|RPSR|THER|INDI)(\d{2})Q([1-4])\.txt$", re.IGNORECASE
+)
+_QUARTER_RE = re.compile(r"(\d{4})q([1-4])", re.IGNORECASE)
+
+# Large enough that a block holds many rows, small enough to keep memory flat.
+DEFAULT_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def quarter_from_filename(path: str) -> tuple[int, int]:
+    """
+    Return ``(year, quarter)`` for an archive named like ``faers_ascii_2024q1.zip``.
+
+    Raises ``ValueError`` when the name does not contain a year and quarter.
+    """
+    m = _QUARTER_RE.search(os.path.basename(path))
+    if not m:
+        raise ValueError(f"Cannot tell the year and quarter of {path}")
+    return int(m.group(1)), int(m.group(2))
+
+
+def table_members(zf: zipfile.ZipFile) -> dict[str, str]:
+    """Map each table name (``"DEMO"``, ...) to its member in the archive."""
+    members = {}
+    for info in zf.infolist():
+        m = _MEMBER_RE.match(os.path.basename(info.filename))
+        if m and not info.is_dir():
+            members.setdefault(m.group(1).upper(), info.filename)
+    return members
+
+
+def read_header(zf: zipfile.ZipFile, member: str) -> tuple[list[str], bool]:
+    """
+    Return the lower-cased column names of a table and whether lines end in ``$``.
+    """
+    with zf.open(member) as f:
+        line = f.readline().decode("latin-1")
+    names = line.lstrip("\ufeff").rstrip("\r\n").split("$")
+    trailing = len(names) > 1 and names[-1] == ""
+    if trailing:
+        names.pop()
+    return [name.strip().lower() for name in names], trailing
+
+
+class TableReader:
+    """
+    Stream one table of a FAERS zip as ``pyarrow`` record batches.
+
+    All columns are read as strings. Rows whose number of fields does not
+    match the header (e.g. a stray ``$`` inside a free-text field) are
+    skipped and counted in ``skipped_rows``.
+
+    Parameters
+    -----------
+    zf: zipfile.ZipFile
+        Open archive.
+
+    member: str
+        Name of the table's text file in the archive.
+
+    columns: list of str, optional
+        Lower-cased names of the columns to read (default all).
+
+    block_size: int
+        Bytes of text parsed per batch (default 16 MiB).
+    """
+
+    def __init__(
+        self,
+        zf: zipfile.ZipFile,
+        member: str,
+        columns: list[str] | None = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> None:
+        self.zf = zf
+        self.member = member
+        self.names, self._trailing = read_header(zf, member)
+        self.columns = [c for c in (columns or self.names) if c in self.names]
+        self.block_size = block_size
+        self.skipped_rows = 0
+
+    @property
+    def schema(self) -> pa.Schema:
+        return pa.schema([(name, pa.string()) for name in self.columns])
+
+    def _skip(self, row: object) -> str:
+        self.skipped_rows += 1
+        return "skip"
+
+    def __iter__(self) -> Iterator[pa.RecordBatch]:
+        # AERS rows end with "$", i.e. one more (empty) field than names.
+        names = [*self.names, "_trailing"] if self._trailing else self.names
+        with self.zf.open(self.member) as f:
+            reader = csv.open_csv(
+                f,
+                read_options=csv.ReadOptions(
+                    column_names=names,
+                    skip_rows=1,
+                    encoding="latin-1",
+                    block_size=self.block_size,
+                ),
+                parse_options=csv.ParseOptions(
+                    delimiter="$",
+                    quote_char=False,
+                    newlines_in_values=False,
+                    invalid_row_handler=self._skip,
+                ),
+                convert_options=csv.ConvertOptions(
+                    column_types=dict.fromkeys(names, pa.string()),
+                    include_columns=self.columns,
+                    include_missing_columns=True,
+                    strings_can_be_null=False,
+                    quoted_strings_can_be_null=False,
+                ),
+            )
+            for batch in reader:
+                if batch.num_rows:
+                    yield batch
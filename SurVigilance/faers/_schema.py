@@ -0,0 +1,129 @@
+"""
+Column types of the FAERS ASCII tables.
+
+The text files carry no types. Identifiers and sequence numbers are read as
+integers, ages, weights and doses as floats, and the short code columns as
+dictionary-encoded strings; everything else (names, free text and the dates,
+which are often partial such as ``2024`` or ``202401``) stays a string.
+"""
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+INT_COLUMNS = {
+    "primaryid": pa.int64(),
+    "caseid": pa.int64(),
+    "isr": pa.int64(),
+    "case": pa.int64(),
+    "caseversion": pa.int32(),
+    "drug_seq": pa.int32(),
+    "dsg_drug_seq": pa.int32(),
+    "indi_drug_seq": pa.int32(),
+}
+
+FLOAT_COLUMNS = ("age", "age_years", "wt", "dose_amt", "cum_dose_chr", "dur")
+
+# Years per unit of DEMO.age_cod.
+AGE_UNITS = {
+    "DEC": 10.0,
+    "YR": 1.0,
+    "MON": 1 / 12,
+    "WK": 7 / 365.25,
+    "DY": 1 / 365.25,
+    "HR": 1 / (24 * 365.25),
+}
+
+CODE_COLUMNS = (
+    "i_f_code",
+    "i_f_cod",
+    "rept_cod",
+    "age_cod",
+    "age_grp",
+    "sex",
+    "gndr_cod",
+    "e_sub",
+    "wt_cod",
+    "to_mfr",
+    "occp_cod",
+    "reporter_country",
+    "occr_country",
+    "role_cod",
+    "val_vbm",
+    "route",
+    "dechal",
+    "rechal",
+    "dose_unit",
+    "dose_form",
+    "dose_freq",
+    "cum_dose_unit",
+    "dur_cod",
+    "outc_cod",
+    "rpsr_cod",
+    "drug_rec_act",
+)
+
+_INTEGER = r"^\s*-?\d+\s*$"
+_NUMBER = r"^\s*-?(\d+\.?\d*|\.\d+)\s*$"
+
+
+def column_type(name: str) -> pa.DataType:
+    """Return the Arrow type ``name`` is converted to by :func:`cast_batch`."""
+    if name in INT_COLUMNS:
+        return INT_COLUMNS[name]
+    if name in FLOAT_COLUMNS:
+        return pa.float64()
+    if name in CODE_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+def typed_schema(names: list[str]) -> pa.Schema:
+    return pa.schema([(name, column_type(name)) for name in names])
+
+
+def to_number(column: pa.Array, type_: pa.DataType) -> pa.Array:
+    """
+    Cast a string column to ``type_``; values that are not plain numbers
+    (typos such as "1,5", "UNK") become null instead of failing the batch.
+    """
+    pattern = _INTEGER if pa.types.is_integer(type_) else _NUMBER
+    valid = pc.match_substring_regex(column, pattern)
+    cleaned = pc.if_else(valid, pc.utf8_trim_whitespace(column), None)
+    return pc.cast(cleaned, type_)
+
+
+def encode_codes(column: pa.Array) -> pa.DictionaryArray:
+    """Dictionary-encode a string column, with empty strings as nulls."""
+    return pc.dictionary_encode(pc.if_else(pc.equal(column, ""), None, column))
+
+
+def cast_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Convert a batch of string columns to the types of :func:`column_type`."""
+    arrays = []
+    for name, column in zip(batch.schema.names, batch.columns):
+        type_ = column_type(name)
+        if pa.types.is_dictionary(type_):
+            arrays.append(encode_codes(column))
+        elif type_ != pa.string():
+            arrays.append(to_number(column, type_))
+        else:
+            arrays.append(column)
+    return pa.RecordBatch.from_arrays(arrays, schema=typed_schema(batch.schema.names))
+
+
+def age_in_years(age: pa.Array, age_cod: pa.Array) -> pa.Array:
+    """
+    Convert ``age`` in the units of ``age_cod`` (``AGE_UNITS``) to years.
+
+    The unit of every distinct code is looked up once and the ages are
+    multiplied by it in one vectorized pass. Ages with a missing or unknown
+    unit, and negative ages, become null.
+    """
+    if not pa.types.is_dictionary(age_cod.type):
+        age_cod = encode_codes(age_cod)
+    codes = age_cod.dictionary.to_pylist()
+    units = pa.array(
+        [AGE_UNITS.get((code or "").strip().upper()) for code in codes], pa.float64()
+    )
+    years = pc.multiply(pc.cast(age, pa.float64()), units.take(age_cod.indices))
+    return pc.if_else(pc.less(years, 0), None, years)
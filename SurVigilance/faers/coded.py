@@ -0,0 +1,600 @@
+"""
+Integer-coded REAC and DRUG relations stored as memory-mapped arrays.
+
+:func:`update_coded_arrays` gives every report of the warehouse, every MedDRA
+preferred term and every normalized drug name a dense integer code, and
+appends the report->PT and report->drug pairs of each new quarter to flat
+``int32`` files in ``<warehouse>/coded``::
+
+    pt.txt, drug.txt,           one term per line; the code is the line number
+    country.txt
+    reports.i64, reports.i16    primaryid and year * 10 + quarter per report
+    reports.outcomes.u8         outcomes of every report (OUTCOME_BITS)
+    reports.age.f4              age in years of every report (NaN if unknown)
+    reports.sex.u8              sex of every report (SEX_CODES)
+    reports.country.i16         occr_country code of every report (-1 if unknown)
+    reac.report.i32, reac.pt.i32
+    drug.report.i32, drug.drug.i32
+    drug.roles.u8               roles of the drug in the report (ROLE_BITS)
+    meta.json                   quarters included and the length of each file
+
+:class:`CodedArrays` maps the files with ``numpy.memmap``, so any number of
+processes share one copy in the page cache and nothing is parsed when a
+query starts: counting the reactions reported with a drug is a few array
+operations instead of string comparisons over the tables.
+
+The ``role_cod`` of the DRUG rows and the ``outc_cod`` of the OUTC rows are
+stored as ``uint8`` bitmasks, so filters such as "primary or secondary
+suspect" or "death or hospitalization" are one bitwise AND per row instead
+of string comparisons. The age (in years, see ``age_years`` in
+:func:`build_warehouse`), sex and country of occurrence of every report come
+from the DEMO table of its quarter, for stratified counts (:func:`stratify`).
+
+Both pair arrays are ordered by report code, so DRUG and REAC are joined
+with :func:`merge_join`, a sorted merge that yields the matching rows in
+chunks instead of materializing the joined table as ``pandas.merge`` does.
+"""
+
+import glob
+import json
+import os
+import re
+from collections.abc import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from ._schema import age_in_years
+from .convert import table_path
+
+CODED_DIR = "coded"
+
+_ARRAYS = {
+    "reports": ("reports.i64", "<i8"),
+    "report_quarters": ("reports.i16", "<i2"),
+    "report_outcomes": ("reports.outcomes.u8", "u1"),
+    "report_age": ("reports.age.f4", "<f4"),
+    "report_sex": ("reports.sex.u8", "u1"),
+    "report_country": ("reports.country.i16", "<i2"),
+    "reac_report": ("reac.report.i32", "<i4"),
+    "reac_pt": ("reac.pt.i32", "<i4"),
+    "drug_report": ("drug.report.i32", "<i4"),
+    "drug_drug": ("drug.drug.i32", "<i4"),
+    "drug_roles": ("drug.roles.u8", "u1"),
+}
+_TERMS = {"pts": "pt.txt", "drugs": "drug.txt", "countries": "country.txt"}
+_REAC_RE = re.compile(r"year=(\d{4})[/\\]quarter=([1-4])[/\\]table=REAC")
+
+# Bit of every DRUG.role_cod and OUTC.outc_cod value in the uint8 masks.
+ROLE_BITS = {"PS": 1, "SS": 2, "C": 4, "I": 8}
+OUTCOME_BITS = {"DE": 1, "LT": 2, "HO": 4, "DS": 8, "CA": 16, "RI": 32, "OT": 64}
+
+# Code of every DEMO.sex value; 0 is unknown (missing, "UNK" or "NS").
+SEX_CODES = {"F": 1, "M": 2}
+
+# Rows of the left side of a join matched at a time.
+JOIN_CHUNK_SIZE = 1 << 16
+
+
+def normalize_drugnames(names: pa.Array) -> pa.Array:
+    """
+    Normalize verbatim drug names: upper case, single spaces, no trailing dots.
+
+    ``" Aspirin."`` and ``"ASPIRIN"`` both become ``"ASPIRIN"``.
+    """
+    names = pc.utf8_upper(names)
+    names = pc.replace_substring_regex(names, r"\s+", " ")
+    return pc.utf8_trim(names, " .")
+
+
+def normalize_pts(pts: pa.Array) -> pa.Array:
+    """
+    Normalize preferred terms: trimmed, with single spaces.
+
+    PTs come from the MedDRA vocabulary, so their case is kept.
+    """
+    return pc.utf8_trim_whitespace(pc.replace_substring_regex(pts, r"\s+", " "))
+
+
+def _read_terms(path: str, count: int) -> list[str]:
+    if not count:
+        return []
+    with open(path, encoding="utf-8") as f:
+        terms = f.read().split("\n")
+    return terms[:count]
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _warehouse_quarters(warehouse_dir: str) -> list[tuple[int, int]]:
+    # Quarters that have both a REAC and a DRUG table.
+    pattern = os.path.join(
+        warehouse_dir, "year=*", "quarter=*", "table=REAC", "*.parquet"
+    )
+    quarters = []
+    for path in glob.glob(pattern):
+        m = _REAC_RE.search(path)
+        if m:
+            year, quarter = int(m.group(1)), int(m.group(2))
+            if os.path.isfile(table_path(warehouse_dir, year, quarter, "DRUG")):
+                quarters.append((year, quarter))
+    return sorted(quarters)
+
+
+def bitmask(codes: list[str], bits: dict[str, int]) -> int:
+    """
+    Return the mask of ``codes`` in ``bits`` (``ROLE_BITS`` or ``OUTCOME_BITS``).
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers.coded import ROLE_BITS, bitmask
+        >>> bitmask(["PS", "SS"], ROLE_BITS)
+        3
+    """
+    mask = 0
+    for code in codes:
+        if code.upper() not in bits:
+            raise ValueError(f"Unknown code {code!r}; expected one of {list(bits)}")
+        mask |= bits[code.upper()]
+    return mask
+
+
+def _flags(column: pa.ChunkedArray, bits: dict[str, int]) -> np.ndarray:
+    # The bit of every row's code, 0 for missing or unknown codes.
+    encoded = pc.dictionary_encode(column.combine_chunks())
+    values = [(v or "").strip().upper() for v in encoded.dictionary.to_pylist()]
+    lookup = np.array([bits.get(v, 0) for v in values] + [0], dtype=np.uint8)
+    indices = encoded.indices.fill_null(len(values))
+    return lookup[indices.to_numpy(zero_copy_only=False)]
+
+
+def _pairs(
+    reports: np.ndarray, codes: np.ndarray, flags: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    # Distinct (report, code) pairs, ordered by report then code: a drug
+    # listed twice in a report (e.g. as suspect and concomitant) counts once,
+    # with the flags of its rows OR-ed together.
+    keys = (reports.astype(np.int64) << 32) | codes.astype(np.int64)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    merged = None
+    if flags is not None:
+        merged = np.bitwise_or.reduceat(flags[order], np.flatnonzero(first))
+        merged = merged if len(keys) else flags[:0]
+    keys = keys[first]
+    return (keys >> 32).astype(np.int32), (keys & 0xFFFFFFFF).astype(np.int32), merged
+
+
+def _outcomes(
+    warehouse_dir: str, year: int, quarter: int, primaryids: np.ndarray
+) -> np.ndarray:
+    # OUTCOME_BITS of every report of a quarter, from its OUTC table if any.
+    outcomes = np.zeros(len(primaryids), dtype=np.uint8)
+    path = table_path(warehouse_dir, year, quarter, "OUTC")
+    if not os.path.isfile(path) or not len(primaryids):
+        return outcomes
+    outc = pq.read_table(path, columns=["primaryid", "outc_cod"])
+    flags = _flags(outc.column("outc_cod"), OUTCOME_BITS)
+    ids = outc.column("primaryid").fill_null(-1).to_numpy()
+    pos = np.searchsorted(primaryids, ids)
+    pos[pos == len(primaryids)] = 0
+    hit = primaryids[pos] == ids
+    np.bitwise_or.at(outcomes, pos[hit], flags[hit])
+    return outcomes
+
+
+def _normalize_countries(countries: pa.Array) -> pa.Array:
+    return pc.utf8_upper(pc.utf8_trim_whitespace(countries))
+
+
+def _demographics(
+    warehouse_dir: str,
+    year: int,
+    quarter: int,
+    primaryids: np.ndarray,
+    countries: list[str],
+    lookup: dict[str, int],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Age in years, SEX_CODES and country code of every report of a quarter,
+    # from its DEMO table if any.
+    age = np.full(len(primaryids), np.nan, dtype=np.float32)
+    sex = np.zeros(len(primaryids), dtype=np.uint8)
+    country = np.full(len(primaryids), -1, dtype=np.int16)
+    path = table_path(warehouse_dir, year, quarter, "DEMO")
+    if not os.path.isfile(path) or not len(primaryids):
+        return age, sex, country
+    names = pq.read_schema(path).names
+    # Warehouses built before ``age_years`` existed still have age and age_cod.
+    ages = ["age_years"] if "age_years" in names else ["age", "age_cod"]
+    demo = pq.read_table(path, columns=["primaryid", *ages, "sex", "occr_country"])
+    years = (
+        demo.column("age_years")
+        if "age_years" in names
+        else age_in_years(
+            demo.column("age").combine_chunks(),
+            demo.column("age_cod").combine_chunks(),
+        )
+    )
+    ids = demo.column("primaryid").fill_null(-1).to_numpy()
+    pos = np.searchsorted(primaryids, ids)
+    pos[pos == len(primaryids)] = 0
+    hit = primaryids[pos] == ids
+    age[pos[hit]] = pc.fill_null(years, np.nan).to_numpy(zero_copy_only=False)[hit]
+    sex[pos[hit]] = _flags(demo.column("sex"), SEX_CODES)[hit]
+    codes, _ = _encode(
+        demo.column("occr_country"), _normalize_countries, countries, lookup
+    )
+    country[pos[hit]] = codes[hit]
+    return age, sex, country
+
+
+def _encode(
+    column: pa.ChunkedArray, normalize, terms: list[str], lookup: dict[str, int]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return the term code of every row and a mask of the rows that have one.
+
+    Only the distinct values are normalized and looked up; new terms are
+    appended to ``terms`` and ``lookup``.
+    """
+    encoded = pc.dictionary_encode(column.combine_chunks())
+    codes = np.empty(len(encoded.dictionary), dtype=np.int32)
+    for i, term in enumerate(normalize(encoded.dictionary).to_pylist()):
+        if not term:
+            codes[i] = -1
+            continue
+        code = lookup.get(term)
+        if code is None:
+            code = lookup[term] = len(terms)
+            terms.append(term)
+        codes[i] = code
+    indices = encoded.indices.fill_null(0).to_numpy(zero_copy_only=False)
+    rows = codes[indices] if len(codes) else np.full(len(indices), -1, np.int32)
+    rows[pc.is_null(encoded.indices).to_numpy(zero_copy_only=False)] = -1
+    return rows, rows >= 0
+
+
+def _ids(table: pa.Table, ok: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # primaryid of the rows that have a term and an id, and the updated mask.
+    ids = table.column("primaryid")
+    ok = ok & pc.is_valid(ids).to_numpy(zero_copy_only=False)
+    return ids.fill_null(0).to_numpy()[ok], ok
+
+
+def merge_join(
+    left: np.ndarray, right: np.ndarray, chunk_size: int = JOIN_CHUNK_SIZE
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """
+    Join two sorted key arrays, yielding the positions of the matching rows.
+
+    Every chunk of at most ``chunk_size`` left rows is matched with two
+    binary searches in the slice of ``right`` that its keys span, so the
+    work is linear in the rows of the chunk and of that slice and only the
+    matches of one chunk are held at a time. Each yielded pair of arrays
+    ``(i, j)`` has ``left[i] == right[j]``; ``i`` is non-decreasing.
+
+    Examples
+    ---------
+        >>> import numpy as np
+        >>> from SurVigilance.faers.coded import merge_join
+        >>> list(merge_join(np.array([1, 2, 2, 5]), np.array([2, 3, 5, 5])))
+        [(array([1, 2, 3, 3]), array([0, 0, 2, 3]))]
+    """
+    for start in range(0, len(left), chunk_size):
+        keys = np.asarray(left[start : start + chunk_size])
+        lo = np.searchsorted(right, keys[0], side="left")
+        hi = np.searchsorted(right, keys[-1], side="right")
+        window = np.asarray(right[lo:hi])
+        first = np.searchsorted(window, keys, side="left")
+        repeat = np.searchsorted(window, keys, side="right") - first
+        if not repeat.any():
+            continue
+        i = np.repeat(np.arange(start, start + len(keys)), repeat)
+        offsets = np.cumsum(repeat) - repeat
+        within = np.arange(len(i)) - np.repeat(offsets, repeat)
+        yield i, lo + np.repeat(first, repeat) + within
+
+
+def update_coded_arrays(warehouse_dir: str) -> dict:
+    """
+    Append the quarters added to the warehouse since the last call to its coded arrays.
+
+    Codes are never reassigned: new reports and terms get the next free
+    codes, so existing arrays only grow. A call interrupted half-way is
+    undone by the next one, which truncates every file to the lengths
+    recorded in ``meta.json`` before appending. The outcomes of a report
+    come from the OUTC table of its quarter, and its age, sex and country
+    from the DEMO table, if they are in the warehouse when the quarter is
+    coded.
+
+    Parameters
+    -----------
+    warehouse_dir: str
+        Root of a warehouse made by ``build_warehouse``.
+
+    Returns
+    --------
+    A dict with the ``quarters`` added and the number of ``reports``,
+    ``pts``, ``drugs``, ``reac`` and ``drug`` pairs now stored.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import CodedArrays, update_coded_arrays
+        >>> update_coded_arrays("data/faers/warehouse")
+        >>> CodedArrays("data/faers/warehouse").pt_counts("HUMIRA").head()
+    """
+    folder = os.path.join(warehouse_dir, CODED_DIR)
+    os.makedirs(folder, exist_ok=True)
+    meta_path = os.path.join(folder, "meta.json")
+    meta = {"quarters": [], "lengths": {}}
+    if os.path.isfile(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    if meta["lengths"] and set(_ARRAYS) - set(meta["lengths"]):
+        # Written before some of the arrays existed: code everything again.
+        meta = {"quarters": [], "lengths": {}}
+    lengths = meta["lengths"]
+
+    for name, (filename, dtype) in _ARRAYS.items():
+        path = os.path.join(folder, filename)
+        with open(path, "ab") as f:
+            f.truncate(lengths.get(name, 0) * np.dtype(dtype).itemsize)
+    terms = {
+        name: _read_terms(os.path.join(folder, filename), lengths.get(name, 0))
+        for name, filename in _TERMS.items()
+    }
+    lookups = {name: {t: i for i, t in enumerate(v)} for name, v in terms.items()}
+
+    done = {tuple(q) for q in meta["quarters"]}
+    added = []
+    for year, quarter in _warehouse_quarters(warehouse_dir):
+        if (year, quarter) in done:
+            continue
+        reac = pq.read_table(
+            table_path(warehouse_dir, year, quarter, "REAC"),
+            columns=["primaryid", "pt"],
+        )
+        drug = pq.read_table(
+            table_path(warehouse_dir, year, quarter, "DRUG"),
+            columns=["primaryid", "drugname", "role_cod"],
+        )
+        pts, reac_ok = _encode(
+            reac.column("pt"), normalize_pts, terms["pts"], lookups["pts"]
+        )
+        drugs, drug_ok = _encode(
+            drug.column("drugname"),
+            normalize_drugnames,
+            terms["drugs"],
+            lookups["drugs"],
+        )
+        reac_ids, reac_ok = _ids(reac, reac_ok)
+        drug_ids, drug_ok = _ids(drug, drug_ok)
+        primaryids = np.unique(np.concatenate([reac_ids, drug_ids]))
+        base = lengths.get("reports", 0)
+        reac_report, reac_pt, _ = _pairs(
+            base + np.searchsorted(primaryids, reac_ids), pts[reac_ok]
+        )
+        drug_report, drug_drug, drug_roles = _pairs(
+            base + np.searchsorted(primaryids, drug_ids),
+            drugs[drug_ok],
+            _flags(drug.column("role_cod"), ROLE_BITS)[drug_ok],
+        )
+        age, sex, country = _demographics(
+            warehouse_dir,
+            year,
+            quarter,
+            primaryids,
+            terms["countries"],
+            lookups["countries"],
+        )
+        columns = {
+            "reports": primaryids,
+            "report_quarters": np.full(len(primaryids), year * 10 + quarter),
+            "report_outcomes": _outcomes(warehouse_dir, year, quarter, primaryids),
+            "report_age": age,
+            "report_sex": sex,
+            "report_country": country,
+            "reac_report": reac_report,
+            "reac_pt": reac_pt,
+            "drug_report": drug_report,
+            "drug_drug": drug_drug,
+            "drug_roles": drug_roles,
+        }
+        for name, values in columns.items():
+            filename, dtype = _ARRAYS[name]
+            with open(os.path.join(folder, filename), "ab") as f:
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            lengths[name] = lengths.get(name, 0) + len(values)
+        added.append((year, quarter))
+
+    for name, filename in _TERMS.items():
+        _write_atomic(os.path.join(folder, filename), "\n".join(terms[name]))
+        lengths[name] = len(terms[name])
+    meta["quarters"] = sorted([list(q) for q in done | set(added)])
+    _write_atomic(meta_path, json.dumps(meta, indent=1))
+
+    return {
+        "quarters": [f"{y}Q{q}" for y, q in added],
+        "reports": lengths.get("reports", 0),
+        "pts": lengths["pts"],
+        "drugs": lengths["drugs"],
+        "reac": lengths.get("reac_report", 0),
+        "drug": lengths.get("drug_report", 0),
+    }
+
+
+class CodedArrays:
+    """
+    Read-only, memory-mapped view of the coded arrays of a warehouse.
+
+    Attributes
+    -----------
+    pts, drugs, countries: list of str
+        The term of every PT, drug and country code.
+
+    reports: numpy.ndarray
+        ``primaryid`` of every report code (int64).
+
+    report_quarters: numpy.ndarray
+        ``year * 10 + quarter`` of every report code (int16).
+
+    report_outcomes: numpy.ndarray
+        ``OUTCOME_BITS`` of the outcomes of every report code (uint8).
+
+    report_age, report_sex, report_country: numpy.ndarray
+        Age in years (float32, NaN if unknown), ``SEX_CODES`` (uint8, 0 if
+        unknown) and country of occurrence code (int16, -1 if unknown) of
+        every report code.
+
+    reac_report, reac_pt: numpy.ndarray
+        The distinct (report code, PT code) pairs of the REAC rows (int32),
+        ordered by report code.
+
+    drug_report, drug_drug: numpy.ndarray
+        The distinct (report code, drug code) pairs of the DRUG rows
+        (int32), ordered by report code.
+
+    drug_roles: numpy.ndarray
+        ``ROLE_BITS`` of the roles of the drug in the report, for every
+        drug pair (uint8).
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import CodedArrays
+        >>> coded = CodedArrays("data/faers/warehouse")
+        >>> coded.pt_counts("ASPIRIN").head(10)
+    """
+
+    def __init__(self, warehouse_dir: str) -> None:
+        folder = os.path.join(warehouse_dir, CODED_DIR)
+        with open(os.path.join(folder, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        lengths = meta["lengths"]
+        self.quarters = [tuple(q) for q in meta["quarters"]]
+        for name, filename in _TERMS.items():
+            terms = _read_terms(os.path.join(folder, filename), lengths.get(name, 0))
+            setattr(self, name, terms)
+        for name, (filename, dtype) in _ARRAYS.items():
+            n = lengths.get(name, 0)
+            if n:
+                array = np.memmap(
+                    os.path.join(folder, filename), dtype=dtype, mode="r", shape=(n,)
+                )
+            else:
+                array = np.empty(0, dtype=dtype)
+            setattr(self, name, array)
+        self._pt_codes = {t: i for i, t in enumerate(self.pts)}
+        self._drug_codes = {t: i for i, t in enumerate(self.drugs)}
+
+    def pt_code(self, pt: str) -> int:
+        """Return the code of a preferred term; ``KeyError`` if it is unknown."""
+        return self._pt_codes[normalize_pts(pa.array([pt]))[0].as_py()]
+
+    def drug_code(self, drugname: str) -> int:
+        """Return the code of a (normalized) drug name; ``KeyError`` if unknown."""
+        return self._drug_codes[normalize_drugnames(pa.array([drugname]))[0].as_py()]
+
+    def reports_with_drug(self, drugname: str) -> np.ndarray:
+        """Return the sorted codes of the reports that list ``drugname``."""
+        return np.unique(self.drug_report[self.drug_drug == self.drug_code(drugname)])
+
+    def _drug_rows(
+        self,
+        drugname: str | None,
+        reports: np.ndarray | None,
+        roles: list[str] | None,
+        outcomes: list[str] | None,
+    ) -> np.ndarray | None:
+        # Positions of the drug pairs kept by the filters; None keeps all.
+        rows = None
+        if drugname is not None:
+            rows = np.flatnonzero(self.drug_drug == self.drug_code(drugname))
+        if outcomes is not None:
+            found = (self.report_outcomes & bitmask(outcomes, OUTCOME_BITS)) != 0
+            reports = found if reports is None else reports & found
+        if reports is None and roles is None:
+            return rows
+        report = self.drug_report if rows is None else self.drug_report[rows]
+        keep = np.ones(len(report), dtype=bool)
+        if reports is not None:
+            keep &= reports[report]
+        if roles is not None:
+            role = self.drug_roles if rows is None else self.drug_roles[rows]
+            keep &= (role & bitmask(roles, ROLE_BITS)) != 0
+        return np.flatnonzero(keep) if rows is None else rows[keep]
+
+    def drug_reactions(
+        self,
+        drugname: str | None = None,
+        reports: np.ndarray | None = None,
+        chunk_size: int = JOIN_CHUNK_SIZE,
+        roles: list[str] | None = None,
+        outcomes: list[str] | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Join the drug and reaction pairs on report, in chunks.
+
+        Yields frames with the ``report``, ``drug`` and ``pt`` codes of every
+        (drug, PT) pair of a report, ordered by report. ``drugname`` keeps
+        the rows of one drug, and ``reports``, a boolean mask over the report
+        codes, the rows of some reports; each frame holds the matches of at
+        most ``chunk_size`` drug rows. ``roles`` (e.g. ``["PS", "SS"]``)
+        keeps the drugs with one of these roles in the report, and
+        ``outcomes`` (e.g. ``["DE", "LT", "HO"]``) the reports with one of
+        these outcomes.
+        """
+        rows = self._drug_rows(drugname, reports, roles, outcomes)
+        left = self.drug_report if rows is None else self.drug_report[rows]
+        for i, j in merge_join(left, self.reac_report, chunk_size):
+            if rows is not None:
+                i = rows[i]
+            yield pd.DataFrame(
+                {
+                    "report": self.reac_report[j],
+                    "drug": self.drug_drug[i],
+                    "pt": self.reac_pt[j],
+                }
+            )
+
+    def pt_counts(
+        self,
+        drugname: str,
+        reports: np.ndarray | None = None,
+        roles: list[str] | None = None,
+        outcomes: list[str] | None = None,
+    ) -> pd.Series:
+        """
+        Count the reports of every PT among the reports that list ``drugname``.
+
+        ``reports``, a boolean mask over the report codes (for instance of
+        the latest version of every case), restricts the reports counted,
+        and ``roles`` and ``outcomes`` are filters as in
+        :meth:`drug_reactions`. The result is sorted by count and omits PTs
+        with no report.
+
+        Examples
+        ---------
+            >>> coded.pt_counts("HUMIRA", roles=["PS"], outcomes=["DE", "LT", "HO"])
+        """
+        counts = np.zeros(len(self.pts), dtype=np.int64)
+        # The pairs are distinct, so a report has at most one row of the drug
+        # and every (report, PT) pair of the join is distinct too.
+        for chunk in self.drug_reactions(
+            drugname, reports, roles=roles, outcomes=outcomes
+        ):
+            counts += np.bincount(chunk["pt"].to_numpy(), minlength=len(self.pts))
+        found = np.flatnonzero(counts)
+        series = pd.Series(
+            counts[found], index=pd.Index([self.pts[i] for i in found], name="pt")
+        )
+        return series.sort_values(ascending=False, kind="stable")
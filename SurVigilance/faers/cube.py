@@ -0,0 +1,263 @@
+"""
+Sparse drug x PT case counts for screening every drug against every event.
+
+:func:`update_drug_event_cube` counts, for every pair of a normalized drug
+name and a preferred term, the deduplicated cases (the latest report of
+every case, see :func:`update_case_index`) that list both, and stores the
+counts as a ``scipy.sparse`` matrix in ``<warehouse>/cube.npz`` together
+with the marginals: the cases of every drug, of every PT, and the total.
+
+A case is only counted once, through its latest report. When a new quarter
+brings a follow-up of a case, the pairs of the report it replaces are
+subtracted and those of the new report added, so an update costs time in
+proportion to the reports that changed rather than to the whole history.
+
+:class:`DrugEventCube` derives the 2x2 table of every pair from the matrix
+and the marginals with vectorized arithmetic::
+
+                  PT      not PT
+    drug          a       b = drug_cases - a
+    not drug      c       d = n_cases - a - b - c
+                  = pt_cases - a
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .coded import CodedArrays, update_coded_arrays
+from .dedup import read_case_index, update_case_index
+
+CUBE_FILE = "cube.npz"
+
+# Reports whose pairs are expanded at a time, to bound memory.
+_CHUNK_REPORTS = 500_000
+
+
+def _members(reports: np.ndarray, pair_reports: np.ndarray) -> np.ndarray:
+    # Mask of the pairs whose report is in ``reports`` (both sorted).
+    if not len(reports):
+        return np.zeros(len(pair_reports), dtype=bool)
+    pos = np.searchsorted(reports, pair_reports)
+    pos[pos == len(reports)] = 0
+    return reports[pos] == pair_reports
+
+
+def _cross(
+    coded: CodedArrays, reports: np.ndarray, shape: tuple[int, int]
+) -> tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Count the (drug, PT) pairs of ``reports`` (sorted report codes).
+
+    Returns the counts and the number of those reports listing every drug
+    and every PT.
+    """
+    if not len(reports):
+        empty = sparse.csr_matrix(shape, dtype=np.int32)
+        return empty, np.zeros(shape[0], np.int64), np.zeros(shape[1], np.int64)
+    pairs = {}
+    for name, report, code in (
+        ("drug", coded.drug_report, coded.drug_drug),
+        ("reac", coded.reac_report, coded.reac_pt),
+    ):
+        # Only the pairs between the first and the last report can match.
+        lo = np.searchsorted(report, reports[0], side="left")
+        hi = np.searchsorted(report, reports[-1], side="right")
+        report, code = np.asarray(report[lo:hi]), np.asarray(code[lo:hi])
+        hit = _members(reports, report)
+        pairs[name] = report[hit], code[hit]
+    (drug_report, drug), (reac_report, pt) = pairs["drug"], pairs["reac"]
+
+    # Pair every drug row with the PT rows of its report: both are ordered
+    # by report, so those are one contiguous slice of the REAC pairs.
+    start = np.searchsorted(reac_report, drug_report, side="left")
+    stop = np.searchsorted(reac_report, drug_report, side="right")
+    repeat = stop - start
+    first = np.cumsum(repeat) - repeat
+    within = np.arange(int(repeat.sum())) - np.repeat(first, repeat)
+    rows = np.repeat(drug, repeat)
+    cols = pt[np.repeat(start, repeat) + within]
+    counts = sparse.coo_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape
+    ).tocsr()
+    drug_cases = np.bincount(drug, minlength=shape[0])
+    pt_cases = np.bincount(pt, minlength=shape[1])
+    return counts, drug_cases, pt_cases
+
+
+def _latest_codes(warehouse_dir: str, coded: CodedArrays) -> np.ndarray:
+    # Sorted report codes of the latest report of every case.
+    index = read_case_index(warehouse_dir)
+    quarters = index.column("year").to_numpy().astype(np.int64) * 10
+    quarters += index.column("quarter").to_numpy()
+    wanted = index.column("primaryid").to_numpy() * 100_000 + quarters
+    keys = np.asarray(coded.reports, dtype=np.int64) * 100_000
+    keys += coded.report_quarters
+    order = np.argsort(keys, kind="stable")
+    pos = np.searchsorted(keys, wanted, sorter=order)
+    pos[pos == len(keys)] = 0
+    found = order[pos][keys[order[pos]] == wanted] if len(keys) else pos[:0]
+    return np.sort(found).astype(np.int32)
+
+
+def _load(path: str) -> dict:
+    with np.load(path) as f:
+        return {name: f[name] for name in f.files}
+
+
+def update_drug_event_cube(warehouse_dir: str) -> dict:
+    """
+    Bring the drug x PT case counts of a warehouse up to date.
+
+    The coded arrays and the case index are updated first (both only read
+    the quarters they do not have yet). The reports that became, or stopped
+    being, the latest report of their case since the last call are then
+    added to, or subtracted from, the stored counts.
+
+    Parameters
+    -----------
+    warehouse_dir: str
+        Root of a warehouse made by ``build_warehouse``.
+
+    Returns
+    --------
+    A dict with the ``quarters`` added, the reports ``added`` and
+    ``removed``, the number of ``cases``, ``drugs`` and ``pts``, the
+    ``nonzero`` cells of the matrix, and ``seconds``.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import DrugEventCube, update_drug_event_cube
+        >>> update_drug_event_cube("data/faers/warehouse")
+        >>> DrugEventCube("data/faers/warehouse").two_by_two(min_count=3)
+    """
+    began = time.perf_counter()
+    update_coded_arrays(warehouse_dir)
+    update_case_index(warehouse_dir)
+    coded = CodedArrays(warehouse_dir)
+    shape = (len(coded.drugs), len(coded.pts))
+
+    path = os.path.join(warehouse_dir, CUBE_FILE)
+    if os.path.isfile(path):
+        state = _load(path)
+        counts = sparse.csr_matrix(
+            (state["data"], state["indices"], state["indptr"]),
+            shape=tuple(state["shape"]),
+        )
+        counts.resize(shape)
+        drug_cases = np.zeros(shape[0], dtype=np.int64)
+        drug_cases[: len(state["drug_cases"])] = state["drug_cases"]
+        pt_cases = np.zeros(shape[1], dtype=np.int64)
+        pt_cases[: len(state["pt_cases"])] = state["pt_cases"]
+        counted = state["reports"]
+        done = {tuple(q) for q in json.loads(str(state["quarters"]))}
+    else:
+        counts = sparse.csr_matrix(shape, dtype=np.int32)
+        drug_cases = np.zeros(shape[0], dtype=np.int64)
+        pt_cases = np.zeros(shape[1], dtype=np.int64)
+        counted = np.empty(0, dtype=np.int32)
+        done = set()
+
+    latest = _latest_codes(warehouse_dir, coded)
+    added = np.setdiff1d(latest, counted, assume_unique=True)
+    removed = np.setdiff1d(counted, latest, assume_unique=True)
+    for reports, sign in ((added, 1), (removed, -1)):
+        for i in range(0, len(reports), _CHUNK_REPORTS):
+            cells, drugs, pts = _cross(coded, reports[i : i + _CHUNK_REPORTS], shape)
+            counts = counts + sign * cells
+            drug_cases += sign * drugs
+            pt_cases += sign * pts
+    counts.eliminate_zeros()
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            data=counts.data.astype(np.int32),
+            indices=counts.indices,
+            indptr=counts.indptr,
+            shape=np.array(shape),
+            drug_cases=drug_cases,
+            pt_cases=pt_cases,
+            reports=latest,
+            quarters=np.array(json.dumps(coded.quarters)),
+        )
+    os.replace(tmp, path)
+    return {
+        "quarters": [f"{y}Q{q}" for y, q in coded.quarters if (y, q) not in done],
+        "added": len(added),
+        "removed": len(removed),
+        "cases": len(latest),
+        "drugs": shape[0],
+        "pts": shape[1],
+        "nonzero": counts.nnz,
+        "seconds": time.perf_counter() - began,
+    }
+
+
+class DrugEventCube:
+    """
+    The drug x PT case counts of a warehouse and their marginals.
+
+    Attributes
+    -----------
+    counts: scipy.sparse.csr_matrix
+        Cases listing drug ``i`` (row) and PT ``j`` (column).
+
+    drug_cases, pt_cases: numpy.ndarray
+        Cases listing every drug and every PT.
+
+    n_cases: int
+        Cases counted: the latest reports that have a drug or a PT.
+
+    drugs, pts: list of str
+        The normalized drug name and PT of every row and column.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import DrugEventCube
+        >>> cube = DrugEventCube("data/faers/warehouse")
+        >>> tables = cube.two_by_two(min_count=3)
+        >>> tables["ror"] = (tables["a"] * tables["d"]) / (tables["b"] * tables["c"])
+    """
+
+    def __init__(self, warehouse_dir: str) -> None:
+        state = _load(os.path.join(warehouse_dir, CUBE_FILE))
+        shape = tuple(int(n) for n in state["shape"])
+        self.counts = sparse.csr_matrix(
+            (state["data"], state["indices"], state["indptr"]), shape=shape
+        )
+        self.drug_cases = state["drug_cases"]
+        self.pt_cases = state["pt_cases"]
+        self.n_cases = len(state["reports"])
+        coded = CodedArrays(warehouse_dir)
+        self.drugs = coded.drugs[: shape[0]]
+        self.pts = coded.pts[: shape[1]]
+
+    def two_by_two(self, min_count: int = 1) -> pd.DataFrame:
+        """
+        Return the 2x2 table of every drug/PT pair with at least ``min_count`` cases.
+
+        The frame has one row per pair, with the ``drug`` and ``pt`` (as
+        categoricals) and the ``a``, ``b``, ``c`` and ``d`` cells.
+        """
+        cells = self.counts.tocoo()
+        keep = cells.data >= min_count
+        rows, cols = cells.row[keep], cells.col[keep]
+        a = cells.data[keep].astype(np.int64)
+        b = self.drug_cases[rows] - a
+        c = self.pt_cases[cols] - a
+        return pd.DataFrame(
+            {
+                "drug": pd.Categorical.from_codes(rows, categories=self.drugs),
+                "pt": pd.Categorical.from_codes(cols, categories=self.pts),
+                "a": a,
+                "b": b,
+                "c": c,
+                "d": self.n_cases - a - b - c,
+            }
+        )
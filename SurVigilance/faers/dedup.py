@@ -0,0 +1,199 @@
+"""
+Deduplication of FAERS case versions across quarters.
+
+A FAERS case (``caseid``) gets a new report, with a new ``primaryid`` and a
+higher ``caseversion``, every time it is followed up, and the versions are
+spread over the quarters in which they were received. Counting drug/event
+pairs over all reports therefore counts many cases more than once.
+
+:func:`update_case_index` keeps one row per case, for its latest report, in
+``<warehouse>/cases.parquet``. Each call reads only the DEMO table of the
+quarters that are not in the index yet and merges them into it with one
+vectorized sort, so adding a quarter never re-reads the ones before it.
+:func:`latest_reports` turns the index into a filter for the datasets of
+:func:`open_warehouse`.
+"""
+
+import glob
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ._schema import to_number
+from .convert import write_parquet
+
+INDEX_FILE = "cases.parquet"
+
+INDEX_SCHEMA = pa.schema(
+    [
+        ("caseid", pa.int64()),
+        ("primaryid", pa.int64()),
+        ("caseversion", pa.int32()),
+        ("fda_dt", pa.int32()),
+        ("year", pa.int16()),
+        ("quarter", pa.int8()),
+    ]
+)
+
+_QUARTERS_KEY = b"survigilance.quarters"
+_DEMO_RE = re.compile(r"year=(\d{4})[/\\]quarter=([1-4])[/\\]table=DEMO")
+
+
+def latest_versions(
+    caseid: np.ndarray,
+    caseversion: np.ndarray,
+    fda_dt: np.ndarray,
+    primaryid: np.ndarray,
+) -> np.ndarray:
+    """
+    Return the positions of the latest report of every case, ordered by caseid.
+
+    The latest report has the highest ``caseversion``, then the latest
+    ``fda_dt``, then the highest ``primaryid``. The arguments are integer
+    arrays of equal length; missing values should be filled with a number
+    lower than any real one (AERS reports have no ``caseversion``).
+    """
+    order = np.lexsort((primaryid, fda_dt, caseversion, caseid))
+    # Within a case the last row of this order is its latest report.
+    ids = caseid[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = ids[1:] != ids[:-1]
+    return order[last]
+
+
+def _demo_files(warehouse_dir: str) -> dict[tuple[int, int], str]:
+    pattern = os.path.join(
+        warehouse_dir, "year=*", "quarter=*", "table=DEMO", "*.parquet"
+    )
+    files = {}
+    for path in glob.glob(pattern):
+        m = _DEMO_RE.search(path)
+        if m:
+            files[int(m.group(1)), int(m.group(2))] = path
+    return files
+
+
+def _index_rows(path: str, year: int, quarter: int) -> pa.Table:
+    demo = pq.read_table(path, columns=["caseid", "primaryid", "caseversion", "fda_dt"])
+    demo = demo.filter(pc.is_valid(demo.column("caseid")))
+    n = demo.num_rows
+    return pa.table(
+        {
+            "caseid": demo.column("caseid"),
+            "primaryid": demo.column("primaryid"),
+            "caseversion": demo.column("caseversion"),
+            "fda_dt": to_number(demo.column("fda_dt"), pa.int32()),
+            "year": pa.array(np.full(n, year, dtype=np.int16)),
+            "quarter": pa.array(np.full(n, quarter, dtype=np.int8)),
+        },
+        schema=INDEX_SCHEMA,
+    )
+
+
+def _label(year: int, quarter: int) -> str:
+    return f"{year}Q{quarter}"
+
+
+def read_case_index(warehouse_dir: str) -> pa.Table:
+    """
+    Return the case index of a warehouse: one row per case, for its latest report.
+
+    The table has the columns of ``INDEX_SCHEMA``; it is empty when
+    :func:`update_case_index` has not been run yet.
+    """
+    path = os.path.join(warehouse_dir, INDEX_FILE)
+    if not os.path.isfile(path):
+        return INDEX_SCHEMA.empty_table()
+    return pq.read_table(path)
+
+
+def indexed_quarters(index: pa.Table) -> list[tuple[int, int]]:
+    """Return the ``(year, quarter)`` pairs merged into a case index."""
+    labels = json.loads((index.schema.metadata or {}).get(_QUARTERS_KEY, b"[]"))
+    return [(int(label[:4]), int(label[5])) for label in labels]
+
+
+def update_case_index(warehouse_dir: str, rebuild: bool = False) -> dict:
+    """
+    Merge the quarters added to the warehouse since the last call into its case index.
+
+    Parameters
+    -----------
+    warehouse_dir: str
+        Root of a warehouse made by ``build_warehouse``.
+
+    rebuild: bool
+        Start from an empty index and read the DEMO table of every quarter
+        (default False).
+
+    Returns
+    --------
+    A dict with the ``path`` of the index, the ``quarters`` added, the DEMO
+    ``rows`` read, the ``cases`` now in the index, ``seconds``,
+    ``peak_bytes`` (the arrays held while merging) and, normalised by the
+    rows merged (index plus new rows), ``seconds_per_million_rows`` and
+    ``bytes_per_million_rows``.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import build_warehouse, update_case_index
+        >>> build_warehouse("data/faers")
+        >>> update_case_index("data/faers/warehouse")["cases"]
+    """
+    began = time.perf_counter()
+    path = os.path.join(warehouse_dir, INDEX_FILE)
+    index = INDEX_SCHEMA.empty_table() if rebuild else read_case_index(warehouse_dir)
+    done = set(indexed_quarters(index))
+    new = {q: p for q, p in sorted(_demo_files(warehouse_dir).items()) if q not in done}
+    result = {"path": path, "quarters": [_label(*q) for q in new], "rows": 0}
+
+    merged_rows = peak_bytes = 0
+    if new:
+        parts = [_index_rows(p, *q) for q, p in new.items()]
+        result["rows"] = sum(part.num_rows for part in parts)
+        combined = pa.concat_tables([index.cast(INDEX_SCHEMA), *parts])
+        keys = [
+            combined.column("caseid").to_numpy(),
+            combined.column("caseversion").fill_null(-1).to_numpy(),
+            combined.column("fda_dt").fill_null(-1).to_numpy(),
+            combined.column("primaryid").fill_null(-1).to_numpy(),
+        ]
+        keep = latest_versions(*keys)
+        merged_rows = combined.num_rows
+        peak_bytes = combined.nbytes + sum(k.nbytes for k in keys) + 2 * keep.nbytes
+        index = combined.take(keep)
+        labels = sorted(_label(*q) for q in done | set(new))
+        schema = INDEX_SCHEMA.with_metadata({_QUARTERS_KEY: json.dumps(labels)})
+        write_parquet(path, schema, index.cast(schema).to_batches())
+
+    seconds = time.perf_counter() - began
+    millions = max(merged_rows, 1) / 1e6
+    result.update(
+        cases=index.num_rows,
+        seconds=seconds,
+        peak_bytes=peak_bytes,
+        seconds_per_million_rows=seconds / millions,
+        bytes_per_million_rows=peak_bytes / millions,
+    )
+    return result
+
+
+def latest_reports(warehouse_dir: str) -> ds.Expression:
+    """
+    Return a dataset filter that keeps only the latest report of every case.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import latest_reports, open_warehouse
+        >>> reac = open_warehouse("data/faers/warehouse", "REAC")
+        >>> reac.to_table(filter=latest_reports("data/faers/warehouse"))
+    """
+    index = read_case_index(warehouse_dir)
+    return ds.field("primaryid").isin(index.column("primaryid"))
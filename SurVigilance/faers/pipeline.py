@@ -0,0 +1,302 @@
+"""
+Overlapped download and ingest of FAERS quarters.
+
+:func:`download_and_ingest` runs two stages at the same time: a download
+thread fetches one quarterly zip after the other, and every finished zip is
+handed to a worker process that converts its tables to Parquet (see
+:func:`convert_quarter`) while the next quarter downloads. The stages are
+joined by bounded queues, so downloads pause when ingestion falls behind and
+at most ``max_pending`` archives wait on disk. The wall-clock time of a
+multi-quarter sync is then close to the time of the slower stage instead of
+the sum of both.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlparse
+
+from ..ui.scrapers.scrape_faers import download_file
+from .convert import convert_quarter
+
+_DONE = object()
+
+
+@dataclass
+class PipelineResult:
+    """
+    Outcome of :func:`download_and_ingest`.
+
+    Attributes
+    -----------
+    quarters: list
+        One dict per ingested quarter, in completion order, with ``url``,
+        ``zip_path``, ``year``, ``quarter``, ``tables`` (see
+        :func:`convert_quarter`), ``download_seconds`` and
+        ``ingest_seconds``.
+
+    failures: list
+        ``(url, error message)`` pairs for the quarters that could not be
+        downloaded or ingested.
+
+    stage_seconds: dict
+        Time each stage spent working: ``download``, ``ingest`` (summed over
+        the worker processes) and ``ingest_wait``, the time ingestion sat
+        idle waiting for a download.
+
+    wall_seconds: float
+        Wall-clock duration of the whole run.
+    """
+
+    quarters: list[dict] = field(default_factory=list)
+    failures: list[tuple[str, str]] = field(default_factory=list)
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+def download_and_ingest(
+    urls: Iterable[str],
+    download_dir: str = "data/faers",
+    output_dir: str | None = None,
+    ingest_workers: int = 1,
+    max_pending: int = 2,
+    tables: list[str] | None = None,
+    timeout: int = 600,
+    callback: Callable[[dict], None] | None = None,
+    num_retries: int = 5,
+    segments: int = 1,
+    session: Any = None,
+    poll_interval: float = 0.2,
+) -> PipelineResult:
+    """
+    Download FAERS quarterly zips and convert each to Parquet as soon as it lands.
+
+    Parameters
+    -----------
+    urls: iterable of str
+        Direct URLs of the quarterly ASCII zips, e.g. from ``faers_ascii_url``.
+
+    download_dir: str
+        Directory where the zips are saved (default "data/faers").
+
+    output_dir: str, optional
+        Root of the Parquet dataset (default ``<download_dir>/parquet``).
+
+    ingest_workers: int
+        Number of worker processes converting quarters (default 1).
+
+    max_pending: int
+        Maximum number of downloaded zips waiting for a worker (default 2).
+        The download stage blocks while this many are queued.
+
+    tables: list of str, optional
+        Tables to convert (default all seven).
+
+    timeout, num_retries, segments, session:
+        Passed to :func:`download_file` for every quarter.
+
+    callback: callable, optional
+        Callable to receive UI/status events, called with a dict on the
+        calling thread. Download events are forwarded with ``url`` and
+        ``filename`` added; the ingest stage sends ``ingest_start`` and
+        ``ingest_complete`` (with ``rows`` and ``seconds``), and a final
+        ``pipeline_complete`` carries the stage timings.
+
+    poll_interval: float
+        Seconds between checks of the two stages (default 0.2).
+
+    Returns
+    --------
+    A :class:`PipelineResult` with per-quarter results and stage timings.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import download_and_ingest
+        >>> from SurVigilance.ui.scrapers import faers_ascii_url
+        >>> urls = [faers_ascii_url(2024, q) for q in (1, 2, 3, 4)]
+        >>> download_and_ingest(urls, "data/faers").stage_seconds
+    """
+
+    def _emit(evt: dict) -> None:
+        if callback:
+            try:
+                callback(evt)
+            except Exception:  # pragma: no cover
+                raise  # pragma: no cover
+
+    urls = [str(u) for u in urls]
+    output_dir = output_dir or os.path.join(download_dir, "parquet")
+    os.makedirs(download_dir, exist_ok=True)
+
+    events: queue.Queue = queue.Queue()
+    # Downloaded zips waiting for a worker; bounded so downloads cannot run
+    # arbitrarily far ahead of ingestion.
+    ready: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+    stop = threading.Event()
+    result = PipelineResult()
+    timings = {"download": 0.0, "ingest": 0.0, "ingest_wait": 0.0}
+    began = time.perf_counter()
+
+    def _put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=poll_interval)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _download_stage() -> None:
+        try:
+            for u in urls:
+                if stop.is_set():
+                    return
+                started = time.perf_counter()
+                try:
+                    path = download_file(
+                        url=u,
+                        download_dir=download_dir,
+                        timeout=timeout,
+                        callback=lambda evt, u=u: events.put((u, evt)),
+                        num_retries=num_retries,
+                        segments=segments,
+                        session=session,
+                    )
+                except Exception as e:  # pragma: no cover
+                    events.put((u, {"type": "_failed", "message": str(e)}))
+                    continue
+                finally:
+                    timings["download"] += time.perf_counter() - started
+                if not _put((u, path, time.perf_counter() - started)):
+                    return
+        finally:
+            _put(_DONE)
+
+    def _forward(u: str, evt: dict) -> None:
+        if evt.get("type") == "_failed":
+            result.failures.append((u, evt["message"]))
+            return
+        evt.setdefault("url", u)
+        evt.setdefault("filename", os.path.basename(urlparse(u).path))
+        _emit(evt)
+
+    def _drain() -> None:
+        while True:
+            try:
+                u, evt = events.get_nowait()
+            except queue.Empty:
+                return
+            _forward(u, evt)
+
+    downloader = threading.Thread(target=_download_stage, daemon=True)
+    inflight: dict[Future, tuple[str, str, float]] = {}
+    downloads_done = False
+    idle_since: float | None = time.perf_counter()
+
+    # "spawn" keeps the workers independent of the threads of this process
+    # (download threads, Streamlit's server).
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max(1, ingest_workers), mp_context=ctx
+        ) as pool:
+            downloader.start()
+            while not downloads_done or inflight:
+                _drain()
+                while not downloads_done and len(inflight) < max(1, ingest_workers):
+                    try:
+                        item = ready.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        downloads_done = True
+                        break
+                    u, path, download_seconds = item
+                    _drain()  # deliver download_complete before ingest_start
+                    _emit(
+                        {
+                            "type": "ingest_start",
+                            "url": u,
+                            "filename": os.path.basename(path),
+                        }
+                    )
+                    fut = pool.submit(convert_quarter, path, output_dir, tables)
+                    inflight[fut] = (u, path, download_seconds)
+                    if idle_since is not None:
+                        timings["ingest_wait"] += time.perf_counter() - idle_since
+                        idle_since = None
+
+                if not inflight:
+                    if not downloads_done:
+                        time.sleep(poll_interval / 4)
+                    continue
+                done, _ = wait(
+                    list(inflight), timeout=poll_interval, return_when=FIRST_COMPLETED
+                )
+                for fut in done:
+                    u, path, download_seconds = inflight.pop(fut)
+                    try:
+                        converted = fut.result()
+                    except Exception as e:  # pragma: no cover
+                        result.failures.append((u, str(e)))
+                        _emit(
+                            {
+                                "type": "error",
+                                "message": f"Failed to ingest {path}: {e}",
+                                "url": u,
+                            }
+                        )
+                        continue
+                    timings["ingest"] += converted["seconds"]
+                    result.quarters.append(
+                        {
+                            "url": u,
+                            "zip_path": path,
+                            "year": converted["year"],
+                            "quarter": converted["quarter"],
+                            "tables": converted["tables"],
+                            "download_seconds": download_seconds,
+                            "ingest_seconds": converted["seconds"],
+                        }
+                    )
+                    _emit(
+                        {
+                            "type": "ingest_complete",
+                            "url": u,
+                            "filename": os.path.basename(path),
+                            "rows": {
+                                t: info["rows"]
+                                for t, info in converted["tables"].items()
+                            },
+                            "seconds": converted["seconds"],
+                        }
+                    )
+                if not inflight and idle_since is None:
+                    idle_since = time.perf_counter()
+            _drain()
+    finally:
+        stop.set()
+        downloader.join(timeout=poll_interval * 5)
+
+    result.stage_seconds = timings
+    result.wall_seconds = time.perf_counter() - began
+    _emit(
+        {
+            "type": "pipeline_complete",
+            "quarters": len(result.quarters),
+            "failures": len(result.failures),
+            "stage_seconds": dict(timings),
+            "wall_seconds": result.wall_seconds,
+        }
+    )
+    return result
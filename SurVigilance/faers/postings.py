@@ -0,0 +1,316 @@
+"""
+Inverted index from drug name, active ingredient and PT to primaryids.
+
+:func:`update_postings` keeps, for every normalized drug name (``drugname``),
+active ingredient (``prod_ai``) and preferred term of the warehouse, the
+sorted list of the ``primaryid`` of the reports that mention it. The lists
+are stored delta-encoded as LEB128 varints (7 bits per byte, high bit set on
+all but the last byte of a number), which takes 1-3 bytes per report instead
+of 8. Files, in ``<warehouse>/postings``::
+
+    drug.terms.txt, drug.offsets.i64, drug.counts.i32, drug.bin
+    ingredient.*, pt.*          the same for the other two kinds
+    meta.json                   quarters included
+
+:class:`PostingsIndex` memory-maps the lists and decodes only the ones a
+lookup needs, so finding every report of a drug over the whole history takes
+milliseconds, and intersects lists for queries such as "reports with drug A
+and PT B".
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .coded import _warehouse_quarters, normalize_drugnames, normalize_pts
+from .convert import table_path
+
+POSTINGS_DIR = "postings"
+
+KINDS = {
+    "drug": ("DRUG", "drugname", normalize_drugnames),
+    "ingredient": ("DRUG", "prod_ai", normalize_drugnames),
+    "pt": ("REAC", "pt", normalize_pts),
+}
+
+
+def encode_varints(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Encode non-negative integers as LEB128 varints.
+
+    Returns the bytes (``uint8``) and the number of bytes of every value.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        sizes += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.cumsum(sizes) - sizes
+    out = np.empty(int(sizes.sum()), dtype=np.uint8)
+    for k in range(int(sizes.max(initial=0))):
+        has = sizes > k
+        byte = (values[has] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (sizes[has] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has] + k] = byte | more
+    return out, sizes
+
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Decode a run of LEB128 varints (``uint8``) into ``uint64`` values."""
+    data = np.asarray(data, dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    shift = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7F).astype(np.uint64) << (7 * shift).astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+
+def encode_postings(
+    terms: np.ndarray, ids: np.ndarray, n_terms: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Encode the (term code, id) pairs, sorted and distinct, as posting lists.
+
+    Returns the bytes of all lists, the byte offset of every term's list
+    (``n_terms + 1`` entries) and the length of every list.
+    """
+    deltas = np.empty(len(ids), dtype=np.int64)
+    if len(ids):
+        deltas[0] = ids[0]
+        deltas[1:] = np.diff(ids)
+        # Every list starts with an absolute id.
+        first = np.ones(len(ids), dtype=bool)
+        first[1:] = terms[1:] != terms[:-1]
+        deltas[first] = ids[first]
+    data, sizes = encode_varints(deltas)
+    offsets = np.zeros(n_terms + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(terms, weights=sizes, minlength=n_terms))
+    counts = np.bincount(terms, minlength=n_terms).astype(np.int32)
+    return data, offsets, counts
+
+
+def _decode_all(data: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Inverse of encode_postings: the (term code, id) pairs of every list.
+    deltas = decode_varints(data).astype(np.int64)
+    terms = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+    starts = np.cumsum(counts) - counts
+    # Undo the deltas with one cumsum, restarting at the start of each list.
+    ids = np.cumsum(deltas)
+    nonempty = counts > 0
+    base = np.zeros(len(counts), dtype=np.int64)
+    before = starts[nonempty] - 1
+    base[nonempty] = np.where(before >= 0, ids[np.maximum(before, 0)], 0)
+    return terms, ids - np.repeat(base, counts)
+
+
+def _load_terms(path: str) -> list[str]:
+    if not os.path.isfile(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return text.split("\n") if text else []
+
+
+def _load_kind(folder: str, kind: str) -> tuple[list[str], np.ndarray, np.ndarray]:
+    terms = _load_terms(os.path.join(folder, f"{kind}.terms.txt"))
+    if not terms:
+        return [], np.empty(0, np.uint8), np.empty(0, np.int32)
+    data = np.fromfile(os.path.join(folder, f"{kind}.bin"), dtype=np.uint8)
+    counts = np.fromfile(os.path.join(folder, f"{kind}.counts.i32"), dtype="<i4")
+    return terms, data, counts
+
+
+def _quarter_pairs(
+    warehouse_dir: str, year: int, quarter: int, kind: str
+) -> tuple[pa.Array, np.ndarray]:
+    table, column, normalize = KINDS[kind]
+    rows = pq.read_table(
+        table_path(warehouse_dir, year, quarter, table), columns=["primaryid", column]
+    )
+    encoded = pc.dictionary_encode(rows.column(column).combine_chunks())
+    names = normalize(encoded.dictionary)
+    ok = pc.and_(pc.is_valid(encoded.indices), pc.is_valid(rows.column("primaryid")))
+    ok = ok.to_numpy(zero_copy_only=False)
+    indices = encoded.indices.fill_null(0).to_numpy(zero_copy_only=False)[ok]
+    ids = rows.column("primaryid").fill_null(0).to_numpy()[ok]
+    return names.take(pa.array(indices)), ids
+
+
+def update_postings(warehouse_dir: str) -> dict:
+    """
+    Add the quarters added to the warehouse since the last call to its inverted index.
+
+    The lists of the new quarters are merged into the existing ones without
+    reading the tables of earlier quarters. The new files are written to a
+    temporary folder that then replaces the old one, so an interrupted
+    update leaves the previous index intact.
+
+    Parameters
+    -----------
+    warehouse_dir: str
+        Root of a warehouse made by ``build_warehouse``.
+
+    Returns
+    --------
+    A dict with the ``quarters`` added and, for every kind, the number of
+    ``terms`` and of ``postings`` and the ``bytes`` of its lists.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import PostingsIndex, update_postings
+        >>> update_postings("data/faers/warehouse")
+        >>> PostingsIndex("data/faers/warehouse").cases(drug="HUMIRA", pt="Death")
+    """
+    folder = os.path.join(warehouse_dir, POSTINGS_DIR)
+    meta = {"quarters": []}
+    if os.path.isfile(os.path.join(folder, "meta.json")):
+        with open(os.path.join(folder, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    done = {tuple(q) for q in meta["quarters"]}
+    new = [q for q in _warehouse_quarters(warehouse_dir) if q not in done]
+    result = {"quarters": [f"{y}Q{q}" for y, q in new]}
+    if not new:
+        return result
+
+    tmp = f"{folder}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for kind in KINDS:
+        terms, data, counts = _load_kind(folder, kind)
+        lookup = {t: i for i, t in enumerate(terms)}
+        old_terms, old_ids = _decode_all(data, counts)
+        term_parts, id_parts = [old_terms], [old_ids]
+        for year, quarter in new:
+            names, ids = _quarter_pairs(warehouse_dir, year, quarter, kind)
+            distinct = pc.unique(names)
+            # Names that are blank once normalized get code -1 and are dropped.
+            codes = np.full(len(distinct), -1, dtype=np.int64)
+            for i, name in enumerate(distinct.to_pylist()):
+                if not name:
+                    continue
+                if name not in lookup:
+                    lookup[name] = len(terms)
+                    terms.append(name)
+                codes[i] = lookup[name]
+            found = codes[pc.index_in(names, value_set=distinct).to_numpy()]
+            term_parts.append(found[found >= 0])
+            id_parts.append(ids[found >= 0])
+        all_terms = np.concatenate(term_parts)
+        all_ids = np.concatenate(id_parts)
+        order = np.lexsort((all_ids, all_terms))
+        all_terms, all_ids = all_terms[order], all_ids[order]
+        # A drug listed twice in a report (or a report seen again) counts once.
+        distinct = np.ones(len(order), dtype=bool)
+        distinct[1:] = (all_terms[1:] != all_terms[:-1]) | (all_ids[1:] != all_ids[:-1])
+        all_terms, all_ids = all_terms[distinct], all_ids[distinct]
+        data, offsets, counts = encode_postings(all_terms, all_ids, len(terms))
+        data.tofile(os.path.join(tmp, f"{kind}.bin"))
+        offsets.astype("<i8").tofile(os.path.join(tmp, f"{kind}.offsets.i64"))
+        counts.astype("<i4").tofile(os.path.join(tmp, f"{kind}.counts.i32"))
+        with open(os.path.join(tmp, f"{kind}.terms.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(terms))
+        result[kind] = {
+            "terms": len(terms),
+            "postings": len(all_ids),
+            "bytes": len(data),
+        }
+    meta["quarters"] = sorted([list(q) for q in done | set(new)])
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+
+    old = f"{folder}.{os.getpid()}.old"
+    if os.path.isdir(folder):
+        os.replace(folder, old)
+    os.replace(tmp, folder)
+    shutil.rmtree(old, ignore_errors=True)
+    return result
+
+
+def intersect(*lists: np.ndarray) -> np.ndarray:
+    """
+    Intersect sorted, distinct id arrays.
+
+    The shortest list is searched for in the others, so the cost depends on
+    its length rather than on the longest list.
+    """
+    lists = sorted(lists, key=len)
+    result = lists[0]
+    for other in lists[1:]:
+        if not len(result) or not len(other):
+            return result[:0]
+        pos = np.searchsorted(other, result)
+        pos[pos == len(other)] = 0
+        result = result[other[pos] == result]
+    return result
+
+
+class PostingsIndex:
+    """
+    Memory-mapped view of the inverted index of a warehouse.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import PostingsIndex
+        >>> index = PostingsIndex("data/faers/warehouse")
+        >>> index.lookup("drug", "humira")
+        >>> index.cases(ingredient="ADALIMUMAB", pt="Injection site pain")
+    """
+
+    def __init__(self, warehouse_dir: str) -> None:
+        self.folder = os.path.join(warehouse_dir, POSTINGS_DIR)
+        self._kinds = {}
+
+    def _kind(self, kind: str) -> tuple[dict[str, int], np.ndarray, np.ndarray]:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind {kind!r}; expected one of {list(KINDS)}")
+        if kind not in self._kinds:
+            terms = _load_terms(os.path.join(self.folder, f"{kind}.terms.txt"))
+            offsets = np.fromfile(
+                os.path.join(self.folder, f"{kind}.offsets.i64"), dtype="<i8"
+            )
+            path = os.path.join(self.folder, f"{kind}.bin")
+            data = (
+                np.memmap(path, dtype=np.uint8, mode="r")
+                if os.path.getsize(path)
+                else np.empty(0, np.uint8)
+            )
+            self._kinds[kind] = ({t: i for i, t in enumerate(terms)}, offsets, data)
+        return self._kinds[kind]
+
+    def lookup(self, kind: str, term: str) -> np.ndarray:
+        """
+        Return the sorted primaryids of the reports that mention ``term``.
+
+        ``kind`` is "drug", "ingredient" or "pt"; ``term`` is normalized like
+        the index, and an unknown term gives an empty array.
+        """
+        codes, offsets, data = self._kind(kind)
+        normalize = KINDS[kind][2]
+        code = codes.get(normalize(pa.array([term])).to_pylist()[0])
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        chunk = data[offsets[code] : offsets[code + 1]]
+        return np.cumsum(decode_varints(chunk).astype(np.int64))
+
+    def cases(
+        self,
+        drug: str | None = None,
+        ingredient: str | None = None,
+        pt: str | None = None,
+    ) -> np.ndarray:
+        """Return the sorted primaryids of the reports matching all the terms given."""
+        wanted = {"drug": drug, "ingredient": ingredient, "pt": pt}
+        lists = [self.lookup(k, t) for k, t in wanted.items() if t is not None]
+        if not lists:
+            raise ValueError("Give at least one of drug, ingredient or pt")
+        return intersect(*lists)
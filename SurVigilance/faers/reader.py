@@ -0,0 +1,166 @@
+"""
+Reading FAERS ASCII tables straight out of the quarterly zips.
+
+:func:`read_table` decompresses one member of the archive as a stream and
+parses it in fixed-size blocks, so nothing is extracted to disk and memory
+use is bounded by the block and chunk sizes, not by the size of the quarter.
+"""
+
+import zipfile
+from collections.abc import Iterator
+
+import pandas as pd
+import pyarrow as pa
+
+from ._ascii import DEFAULT_BLOCK_SIZE, TABLES, TableReader, table_members
+from ._schema import cast_batch, typed_schema
+
+_PANDAS_TYPES = {
+    pa.int64(): pd.Int64Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+}
+
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    # Nullable integer columns stay integers instead of becoming floats.
+    return table.to_pandas(types_mapper=_PANDAS_TYPES.get)
+
+
+def _rechunk(batches: Iterator[pa.RecordBatch], chunksize: int) -> Iterator[pa.Table]:
+    pending: list[pa.RecordBatch] = []
+    rows = 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunksize)
+            rest = table.slice(chunksize)
+            pending = rest.to_batches()
+            rows = rest.num_rows
+    if rows:
+        yield pa.Table.from_batches(pending)
+
+
+def _open_reader(
+    zf: zipfile.ZipFile,
+    zip_path: str,
+    table: str,
+    usecols: list[str] | None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> TableReader:
+    name = str(table).upper()
+    if name not in TABLES:
+        raise ValueError(f"Unknown FAERS table {table!r}; expected one of {TABLES}")
+    members = table_members(zf)
+    if name not in members:
+        raise ValueError(f"{zip_path} has no {name} table")
+    columns = [c.lower() for c in usecols] if usecols else None
+    reader = TableReader(zf, members[name], columns=columns, block_size=block_size)
+    unknown = sorted(set(columns or ()) - set(reader.names))
+    if unknown:
+        raise ValueError(f"Columns {unknown} are not in the {name} table")
+    return reader
+
+
+def table_schema(
+    zip_path: str, table: str, usecols: list[str] | None = None, typed: bool = True
+) -> pa.Schema:
+    """Return the Arrow schema :func:`read_table` produces for ``table``."""
+    with zipfile.ZipFile(zip_path) as zf:
+        reader = _open_reader(zf, zip_path, table, usecols)
+    return typed_schema(reader.columns) if typed else reader.schema
+
+
+def iter_table(
+    zip_path: str,
+    table: str,
+    usecols: list[str] | None = None,
+    typed: bool = True,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Yield the rows of one table of a FAERS zip as ``pyarrow`` record batches.
+
+    See :func:`read_table` for the parameters.
+    """
+    with zipfile.ZipFile(zip_path) as zf:
+        reader = _open_reader(zf, zip_path, table, usecols, block_size)
+        for batch in reader:
+            yield cast_batch(batch) if typed else batch
+
+
+def read_table(
+    zip_path: str,
+    table: str,
+    chunksize: int | None = None,
+    usecols: list[str] | None = None,
+    output: str = "pandas",
+    typed: bool = True,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> pd.DataFrame | pa.Table | Iterator[pd.DataFrame] | Iterator[pa.Table]:
+    """
+    Read a ``$``-delimited table from a FAERS quarterly zip without extracting it.
+
+    Column names are lower-cased. With ``typed=True`` identifiers and
+    sequence numbers are nullable integers, ages, weights and doses floats,
+    and code columns (``role_cod``, ``outc_cod``, ``sex``, ...) categoricals;
+    values that are not valid numbers become missing. Rows with the wrong
+    number of fields are skipped.
+
+    Parameters
+    -----------
+    zip_path: str
+        Path to a quarterly archive, e.g. ``data/faers/faers_ascii_2024q1.zip``,
+        or a subset made by ``fetch_zip_members``.
+
+    table: str
+        One of DEMO, DRUG, REAC, OUTC, RPSR, THER or INDI (any case).
+
+    chunksize: int, optional
+        Return an iterator of frames of at most this many rows instead of a
+        single frame. Only one chunk (plus one parse block) is in memory at
+        a time.
+
+    usecols: list of str, optional
+        Columns to read (default all). The others are skipped while parsing.
+
+    output: str
+        "pandas" for DataFrames (default) or "arrow" for ``pyarrow.Table``.
+
+    typed: bool
+        Convert columns to their types (default True); False keeps every
+        column as a string.
+
+    block_size: int
+        Bytes of text parsed at a time (default 16 MiB).
+
+    Returns
+    --------
+    A DataFrame (or Arrow table), or an iterator of them if ``chunksize`` is
+    given.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import read_table
+        >>> reac = read_table("data/faers/faers_ascii_2024q1.zip", "REAC")
+        >>> for chunk in read_table(
+        ...     "data/faers/faers_ascii_2024q1.zip",
+        ...     "DRUG",
+        ...     chunksize=500_000,
+        ...     usecols=["primaryid", "drugname", "role_cod"],
+        ... ):
+        ...     print(len(chunk))
+    """
+    if output not in ("pandas", "arrow"):
+        raise ValueError("output must be 'pandas' or 'arrow'")
+    if chunksize is not None and chunksize < 1:
+        raise ValueError("chunksize must be a positive integer")
+    convert = _to_pandas if output == "pandas" else (lambda t: t)
+    # Checks the table and columns now rather than at the first chunk.
+    schema = table_schema(zip_path, table, usecols, typed)
+    batches = iter_table(zip_path, table, usecols, typed, block_size)
+
+    if chunksize is not None:
+        return (convert(t) for t in _rechunk(batches, chunksize))
+    return convert(pa.Table.from_batches(list(batches), schema=schema))
@@ -0,0 +1,215 @@
+"""
+Per-quarter drug x PT report counts for trend queries.
+
+:func:`update_drug_pt_series` materializes, for every quarter of the coded
+arrays, the number of reports of that quarter listing each drug and PT
+pair, as a long table of (quarter, drug, PT, count) ordered by drug within
+each quarter. Each quarter is appended as one chunk of flat arrays in
+``<warehouse>/series``::
+
+    pt.i32, count.i32           PT code and report count of every row
+    drug.i32                    for every chunk, the codes of the drugs
+                                reported in its quarter, in order
+    offsets.i64                 for every chunk, where the rows of each of
+                                these drugs start, and where the last ends
+                                (the chunk's CSR indptr)
+    meta.json                   year, quarter, number of drugs and position
+                                in drug.i32 and offsets.i64 of every chunk,
+                                and the length of each file
+
+so the whole history of one drug is one slice per quarter of memory-mapped
+arrays (:class:`DrugPTSeries`), and adding a quarter never rewrites the
+previous ones. Codes are those of :class:`CodedArrays`.
+"""
+
+import json
+import os
+from itertools import pairwise
+
+import numpy as np
+import pandas as pd
+
+from .coded import CodedArrays, _write_atomic, update_coded_arrays
+from .cube import _cross
+
+SERIES_DIR = "series"
+
+_ARRAYS = {
+    "pt": ("pt.i32", "<i4"),
+    "count": ("count.i32", "<i4"),
+    "drug": ("drug.i32", "<i4"),
+    "offsets": ("offsets.i64", "<i8"),
+}
+
+
+def _read_meta(folder: str) -> dict:
+    path = os.path.join(folder, "meta.json")
+    if not os.path.isfile(path):
+        return {"chunks": [], "lengths": {}}
+    with open(path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta["chunks"] and "drug" not in meta["lengths"]:
+        # Series written before drug.i32 kept an offset for every drug
+        # code in every chunk; they are rebuilt.
+        return {"chunks": [], "lengths": {}}
+    return meta
+
+
+def _quarter_ranges(report_quarters: np.ndarray) -> dict[int, tuple[int, int]]:
+    # Reports are coded one quarter after another, so the report codes of a
+    # quarter are one contiguous range: find where every range starts.
+    starts = np.flatnonzero(np.diff(report_quarters)) + 1
+    bounds = [0, *starts.tolist(), len(report_quarters)]
+    return {
+        int(report_quarters[start]): (start, stop)
+        for start, stop in pairwise(bounds)
+        if stop > start
+    }
+
+
+def update_drug_pt_series(warehouse_dir: str) -> dict:
+    """
+    Append the quarters coded since the last call to the drug x PT series.
+
+    The coded arrays are updated first. Every report counts in the quarter
+    in which it was received, so a case followed up in a later quarter
+    counts in both. Like :func:`update_coded_arrays`, a call interrupted
+    half-way is undone by the next one.
+
+    Parameters
+    -----------
+    warehouse_dir: str
+        Root of a warehouse made by ``build_warehouse``.
+
+    Returns
+    --------
+    A dict with the ``quarters`` added and the ``rows`` now stored.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import DrugPTSeries, update_drug_pt_series
+        >>> update_drug_pt_series("data/faers/warehouse")
+        >>> DrugPTSeries("data/faers/warehouse").pair("HUMIRA", "Injection site pain")
+    """
+    update_coded_arrays(warehouse_dir)
+    coded = CodedArrays(warehouse_dir)
+    folder = os.path.join(warehouse_dir, SERIES_DIR)
+    os.makedirs(folder, exist_ok=True)
+    meta = _read_meta(folder)
+    lengths = meta["lengths"]
+    for name, (filename, dtype) in _ARRAYS.items():
+        with open(os.path.join(folder, filename), "ab") as f:
+            f.truncate(lengths.get(name, 0) * np.dtype(dtype).itemsize)
+
+    done = {(c["year"], c["quarter"]) for c in meta["chunks"]}
+    added = []
+    shape = (len(coded.drugs), len(coded.pts))
+    ranges = None
+    for year, quarter in coded.quarters:
+        if (year, quarter) in done:
+            continue
+        if ranges is None:
+            ranges = _quarter_ranges(np.asarray(coded.report_quarters))
+        start, stop = ranges.get(year * 10 + quarter, (0, 0))
+        reports = np.arange(start, stop, dtype=np.int32)
+        counts = _cross(coded, reports, shape)[0]
+        counts.sum_duplicates()
+        counts.sort_indices()
+        # Only the drugs reported in the quarter get an offset.
+        drugs = np.flatnonzero(np.diff(counts.indptr))
+        indptr = counts.indptr[np.append(drugs, shape[0])]
+        base = lengths.get("pt", 0)
+        columns = {
+            "pt": counts.indices,
+            "count": counts.data,
+            "drug": drugs,
+            "offsets": base + indptr.astype(np.int64),
+        }
+        meta["chunks"].append(
+            {
+                "year": year,
+                "quarter": quarter,
+                "drugs": len(drugs),
+                "drug": lengths.get("drug", 0),
+                "offsets": lengths.get("offsets", 0),
+            }
+        )
+        for name, values in columns.items():
+            filename, dtype = _ARRAYS[name]
+            with open(os.path.join(folder, filename), "ab") as f:
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            lengths[name] = lengths.get(name, 0) + len(values)
+        added.append((year, quarter))
+        _write_atomic(os.path.join(folder, "meta.json"), json.dumps(meta, indent=1))
+
+    return {
+        "quarters": [f"{y}Q{q}" for y, q in added],
+        "rows": lengths.get("pt", 0),
+    }
+
+
+class DrugPTSeries:
+    """
+    Memory-mapped view of the per-quarter drug x PT counts of a warehouse.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import DrugPTSeries
+        >>> series = DrugPTSeries("data/faers/warehouse")
+        >>> series.history("HUMIRA").pivot(index="pt", columns="quarter")
+    """
+
+    def __init__(self, warehouse_dir: str) -> None:
+        folder = os.path.join(warehouse_dir, SERIES_DIR)
+        meta = _read_meta(folder)
+        self.chunks = meta["chunks"]
+        self.quarters = [f"{c['year']}Q{c['quarter']}" for c in self.chunks]
+        for name, (filename, dtype) in _ARRAYS.items():
+            n = meta["lengths"].get(name, 0)
+            array = (
+                np.memmap(
+                    os.path.join(folder, filename), dtype=dtype, mode="r", shape=(n,)
+                )
+                if n
+                else np.empty(0, dtype=dtype)
+            )
+            setattr(self, f"_{name}", array)
+        self.coded = CodedArrays(warehouse_dir)
+
+    def history(self, drugname: str) -> pd.DataFrame:
+        """
+        Return the report counts of every PT of a drug in every quarter.
+
+        The long frame has the ``quarter`` (e.g. "2024Q1"), ``pt`` and
+        ``count`` of every quarter and PT with at least one report,
+        ordered by quarter and PT code.
+        """
+        code = self.coded.drug_code(drugname)
+        quarters = [np.empty(0, dtype=object)]
+        pts, counts = [np.empty(0, dtype=np.int32)], [np.empty(0, dtype=np.int32)]
+        for label, chunk in sorted(zip(self.quarters, self.chunks)):
+            drugs = self._drug[chunk["drug"] : chunk["drug"] + chunk["drugs"]]
+            i = int(np.searchsorted(drugs, code))
+            if i == len(drugs) or drugs[i] != code:
+                continue
+            first = chunk["offsets"] + i
+            start, stop = self._offsets[first : first + 2]
+            quarters.append(np.full(stop - start, label, dtype=object))
+            pts.append(self._pt[start:stop])
+            counts.append(self._count[start:stop])
+        return pd.DataFrame(
+            {
+                "quarter": np.concatenate(quarters),
+                "pt": pd.Categorical.from_codes(
+                    np.concatenate(pts), categories=self.coded.pts
+                ),
+                "count": np.concatenate(counts),
+            }
+        )
+
+    def pair(self, drugname: str, pt: str) -> pd.Series:
+        """Return the report counts of a drug and PT in every quarter, with zeros."""
+        history = self.history(drugname)
+        rows = history[history["pt"].cat.codes == self.coded.pt_code(pt)]
+        series = rows.set_index("quarter")["count"]
+        return series.reindex(sorted(self.quarters), fill_value=0).rename(pt)
@@ -0,0 +1,187 @@
+"""
+Report counts of a drug stratified by age, sex and country of occurrence.
+
+The age of every report is converted to years once, when its quarter is
+added to the warehouse (``age_years``, from ``age`` in the unit of
+``age_cod``), and stored with its sex and ``occr_country`` as per-report
+arrays of :class:`CodedArrays`. :func:`stratify` then bins and counts the
+reports of a drug in one pass: the stratum of every report is one
+``numpy.ravel_multi_index`` over the per-report codes, and the counts of
+every stratum one ``numpy.bincount``, returned as an array with one axis per
+dimension::
+
+    counts[age bin, sex, country]           reports of the drug
+    counts[age bin, sex, country, pt]       reports of the drug and the PT
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from itertools import pairwise
+
+import numpy as np
+import pandas as pd
+
+from .coded import SEX_CODES, CodedArrays, merge_join
+
+# Edges of the default age bins, in years; the last bin is open-ended.
+AGE_BINS = (0, 2, 12, 18, 65)
+
+DIMENSIONS = ("age", "sex", "country")
+
+UNKNOWN = "unknown"
+
+SEXES = sorted(SEX_CODES, key=SEX_CODES.get)
+
+# Position on the sex axis of every SEX_CODES code; unknown (0) goes last.
+_SEX_AXIS = np.array([len(SEXES), *range(len(SEXES))], dtype=np.intp)
+
+
+@dataclass
+class StratifiedCounts:
+    """
+    Counts of reports in every stratum, as returned by :func:`stratify`.
+
+    Attributes
+    -----------
+    counts: numpy.ndarray
+        Reports in every stratum (int64), with one axis per dimension.
+
+    axes: dict
+        The labels along every axis of ``counts``, in order, by dimension
+        ("age", "sex", "country" or "pt"). Reports with an unknown age, sex
+        or country count in the last label, "unknown".
+    """
+
+    counts: np.ndarray
+    axes: dict[str, list[str]]
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Return the strata with at least one report as a long frame.
+
+        The frame has one categorical column per dimension and the
+        ``count`` of the stratum.
+        """
+        cells = np.nonzero(self.counts)
+        columns = {
+            name: pd.Categorical.from_codes(codes, categories=labels)
+            for (name, labels), codes in zip(self.axes.items(), cells)
+        }
+        return pd.DataFrame({**columns, "count": self.counts[cells]})
+
+
+def _age_labels(edges: Sequence[float]) -> list[str]:
+    labels = [f"{lo:g}-{hi:g}" for lo, hi in pairwise(edges)]
+    return [*labels, f"{edges[-1]:g}+", UNKNOWN]
+
+
+def _strata(
+    coded: CodedArrays, report: np.ndarray, by: Sequence[str], edges: np.ndarray
+) -> tuple[np.ndarray, dict[str, list[str]]]:
+    # Flat stratum of every report in ``report``, and the labels of every axis.
+    codes, axes = [], {}
+    for name in by:
+        if name == "age":
+            age = coded.report_age[report]
+            code = np.searchsorted(edges, age, side="right") - 1
+            code[np.isnan(age) | (code < 0)] = len(edges)
+            axes[name] = _age_labels(edges.tolist())
+        elif name == "sex":
+            code = _SEX_AXIS[coded.report_sex[report]]
+            axes[name] = [*SEXES, UNKNOWN]
+        elif name == "country":
+            code = coded.report_country[report].astype(np.intp)
+            code[code < 0] = len(coded.countries)
+            axes[name] = [*coded.countries, UNKNOWN]
+        else:
+            raise ValueError(
+                f"Unknown dimension {name!r}; expected one of {DIMENSIONS}"
+            )
+        codes.append(code)
+    shape = [len(labels) for labels in axes.values()]
+    if not codes:
+        return np.zeros(len(report), dtype=np.intp), axes
+    return np.ravel_multi_index(codes, shape), axes
+
+
+def stratify(
+    coded: CodedArrays,
+    drugname: str,
+    by: Sequence[str] = DIMENSIONS,
+    pts: Sequence[str] | None = None,
+    age_bins: Sequence[float] = AGE_BINS,
+    reports: np.ndarray | None = None,
+    roles: list[str] | None = None,
+    outcomes: list[str] | None = None,
+) -> StratifiedCounts:
+    """
+    Count the reports of a drug in every age, sex and country stratum.
+
+    The reports that list the drug are binned along every dimension of
+    ``by`` and counted with one ``numpy.bincount``. With ``pts``, the
+    counts gain a last axis with the reports of the drug that list each of
+    these PTs, from a :func:`merge_join` of the drug and reaction pairs.
+
+    Parameters
+    -----------
+    coded: CodedArrays
+        The coded arrays of a warehouse (see ``update_coded_arrays``).
+
+    drugname: str
+        Drug name; it is normalized as the DRUG rows are.
+
+    by: sequence of str
+        The dimensions, in the order of the axes: any of "age", "sex" and
+        "country" (the country of occurrence).
+
+    pts: sequence of str, optional
+        Preferred terms to count the reports of; PTs never reported are
+        counted as zero.
+
+    age_bins: sequence of float
+        Increasing edges of the age bins, in years. A bin holds the ages
+        from its edge up to (excluding) the next one; the last bin is
+        open-ended, and ages below the first edge count as unknown.
+
+    reports, roles, outcomes:
+        Filters on the reports and the roles of the drug, as in
+        ``CodedArrays.drug_reactions``.
+
+    Returns
+    --------
+    A :class:`StratifiedCounts`.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import CodedArrays, stratify
+        >>> coded = CodedArrays("data/faers/warehouse")
+        >>> strata = stratify(coded, "HUMIRA", by=["age", "sex"], roles=["PS"])
+        >>> strata.to_frame()
+    """
+    edges = np.asarray(age_bins, dtype=np.float64)
+    if not len(edges) or np.any(np.diff(edges) <= 0):
+        raise ValueError("age_bins must be increasing edges, in years")
+    rows = coded._drug_rows(drugname, reports, roles, outcomes)
+    # The drug pairs are distinct, so a report has one row of the drug.
+    drug_report = coded.drug_report[rows]
+    strata, axes = _strata(coded, drug_report, by, edges)
+    shape = [len(labels) for labels in axes.values()]
+    size = int(np.prod(shape))
+    if pts is None:
+        counts = np.bincount(strata, minlength=size).astype(np.int64)
+        return StratifiedCounts(counts.reshape(shape), axes)
+
+    wanted = np.full(len(coded.pts), -1, dtype=np.intp)
+    for i, pt in enumerate(pts):
+        try:
+            wanted[coded.pt_code(pt)] = i
+        except KeyError:
+            continue
+    counts = np.zeros(size * len(pts), dtype=np.int64)
+    for i, j in merge_join(drug_report, coded.reac_report):
+        pt = wanted[coded.reac_pt[j]]
+        keep = pt >= 0
+        cells = strata[i[keep]] * len(pts) + pt[keep]
+        counts += np.bincount(cells, minlength=len(counts))
+    axes["pt"] = list(pts)
+    return StratifiedCounts(counts.reshape([*shape, len(pts)]), axes)
@@ -0,0 +1,263 @@
+"""
+Planning and running an unattended sync of the FAERS quarterly archives.
+
+:func:`sync_faers` compares the quarters published on the FAERS website with
+the archives already in ``<data_root>/faers`` (its download manifest) and
+downloads only the missing ones, in parallel. With ``dry_run=True`` it only
+prints the plan. The same entry point is available from the command line::
+
+    python -m SurVigilance.faers --data-root data --since 2020Q1 --workers 4
+"""
+
+import os
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from ..ui.scrapers.archive_store import get_archive_store
+from ..ui.scrapers.download_manifest import DownloadManifest
+from ..ui.scrapers.faers_links import faers_ascii_url, quarter_number
+from ..ui.scrapers.scrape_faers import (
+    DownloadResults,
+    download_files,
+    scrape_faers_sb,
+)
+
+AVAILABLE_CSV = "faers_available_quarters.csv"
+
+Quarter = tuple[int, int]
+
+
+def parse_quarter(value: str | int | Quarter) -> Quarter:
+    """
+    Return ``(year, quarter)`` for ``"2020Q1"``, ``(2020, 1)`` or a year.
+
+    A bare year means its first quarter.
+    """
+    if isinstance(value, tuple):
+        year, quarter = value
+        return int(year), int(quarter)
+    if isinstance(value, int):
+        return value, 1
+    m = re.fullmatch(r"\s*(\d{4})\s*(?:[-_ ]?q([1-4]))?\s*", str(value), re.IGNORECASE)
+    if not m:
+        raise ValueError(f"Cannot parse quarter {value!r}; expected e.g. '2020Q1'")
+    return int(m.group(1)), int(m.group(2) or 1)
+
+
+def _label(q: Quarter) -> str:
+    return f"{q[0]}Q{q[1]}"
+
+
+def available_quarters(
+    faers_dir: str,
+    refresh: bool = True,
+    headless: bool = True,
+    callback: Callable[[dict], None] | None = None,
+) -> list[Quarter]:
+    """
+    Return the quarters published on the FAERS website, oldest first.
+
+    With ``refresh=True`` (or when no list has been saved yet) the website is
+    scraped with ``scrape_faers_sb``, which also updates
+    ``faers_available_quarters.csv`` in ``faers_dir``; otherwise that file is
+    read.
+    """
+    csv_path = os.path.join(faers_dir, AVAILABLE_CSV)
+    if refresh or not os.path.isfile(csv_path):
+        df = scrape_faers_sb(output_dir=faers_dir, headless=headless, callback=callback)
+    else:
+        df = pd.read_csv(csv_path, dtype=str)
+
+    quarters = set()
+    for year, label in zip(df["Year"], df["Quarter"]):
+        number = quarter_number(label)
+        if number is not None and str(year).strip().isdigit():
+            quarters.add((int(str(year).strip()), number))
+    return sorted(quarters)
+
+
+@dataclass
+class SyncPlan:
+    """
+    What :func:`sync_faers` found and what it will download.
+
+    Attributes
+    -----------
+    faers_dir: str
+        Directory holding the quarterly zips.
+
+    available: list
+        ``(year, quarter)`` pairs published on the website (after ``since``).
+
+    present: list
+        Quarters whose archive is already in ``faers_dir``.
+
+    shared: list
+        Missing quarters held by the shared archive store; they are linked
+        into ``faers_dir`` without a download.
+
+    missing: list
+        Quarters that have to be downloaded.
+
+    urls: dict
+        Download URL of every quarter in ``shared`` and ``missing``.
+
+    results: DownloadResults or None
+        Outcome of the downloads; None for a dry run.
+    """
+
+    faers_dir: str
+    available: list[Quarter] = field(default_factory=list)
+    present: list[Quarter] = field(default_factory=list)
+    shared: list[Quarter] = field(default_factory=list)
+    missing: list[Quarter] = field(default_factory=list)
+    urls: dict[Quarter, str] = field(default_factory=dict)
+    results: DownloadResults | None = None
+
+    def format(self) -> str:
+        """Return the plan as human-readable text."""
+
+        def _span(quarters: list[Quarter]) -> str:
+            if not quarters:
+                return ""
+            return f" ({_label(quarters[0])} - {_label(quarters[-1])})"
+
+        lines = [
+            f"FAERS sync plan for {os.path.abspath(self.faers_dir)}",
+            f"  available: {len(self.available)}{_span(self.available)}",
+            f"  present:   {len(self.present)}",
+            f"  linked from the shared archive store: {len(self.shared)}",
+            f"  to download: {len(self.missing)}",
+        ]
+        for q in self.shared:
+            lines.append(f"    link      {_label(q)}  {self.urls[q]}")
+        for q in self.missing:
+            lines.append(f"    download  {_label(q)}  {self.urls[q]}")
+        return "\n".join(lines)
+
+
+def plan_sync(
+    faers_dir: str,
+    available: Iterable[Quarter],
+    since: str | int | Quarter | None = None,
+    url_for: Callable[[int, int], str] = faers_ascii_url,
+) -> SyncPlan:
+    """
+    Compare ``available`` quarters with the archives in ``faers_dir``.
+
+    A quarter is present when its zip is in ``faers_dir``, with the size
+    recorded in the download manifest if there is an entry for it.
+    """
+    start = parse_quarter(since) if since is not None else (0, 0)
+    manifest = DownloadManifest(faers_dir)
+    entries = manifest.entries()
+    store = get_archive_store()
+    plan = SyncPlan(faers_dir)
+
+    for q in sorted({parse_quarter(q) for q in available}):
+        if q < start:
+            continue
+        plan.available.append(q)
+        url = url_for(*q)
+        filename = os.path.basename(urlparse(url).path)
+        path = os.path.join(faers_dir, filename)
+        entry = entries.get(filename)
+        if os.path.isfile(path) and (
+            entry is None or entry.get("size") == os.path.getsize(path)
+        ):
+            plan.present.append(q)
+            continue
+        plan.urls[q] = url
+        if store is not None and store.lookup(url) is not None:
+            plan.shared.append(q)
+        else:
+            plan.missing.append(q)
+    return plan
+
+
+def sync_faers(
+    data_root: str = "data",
+    since: str | int | Quarter | None = None,
+    workers: int = 4,
+    dry_run: bool = False,
+    available: Iterable[Quarter] | None = None,
+    refresh: bool = True,
+    headless: bool = True,
+    callback: Callable[[dict], None] | None = None,
+    num_retries: int = 5,
+    segments: int = 1,
+    url_for: Callable[[int, int], str] = faers_ascii_url,
+) -> SyncPlan:
+    """
+    Download the FAERS quarters that are published but not yet on disk.
+
+    Parameters
+    -----------
+    data_root: str
+        Data folder; archives are kept in ``<data_root>/faers`` (default "data").
+
+    since: str, int or tuple, optional
+        First quarter to consider, e.g. ``"2020Q1"``, ``(2020, 1)`` or
+        ``2020`` (default all).
+
+    workers: int
+        Number of archives downloaded at the same time (default 4).
+
+    dry_run: bool
+        Print the plan and return it without downloading anything.
+
+    available: iterable of (year, quarter), optional
+        Quarters to sync. By default they are read from the FAERS website
+        (see ``refresh``).
+
+    refresh: bool
+        Scrape the website for the list of quarters (default True). With
+        False the list saved by the last scrape is used when there is one.
+
+    headless: bool
+        Run the browser in headless mode when scraping (default True).
+
+    callback: callable, optional
+        Callable to receive UI/status events, called with a dict; the events
+        of the scraper and of ``download_files`` are forwarded.
+
+    num_retries, segments:
+        Passed to ``download_files``.
+
+    url_for: callable
+        Maps ``(year, quarter)`` to the archive URL (default ``faers_ascii_url``).
+
+    Returns
+    --------
+    The :class:`SyncPlan`, with ``results`` set unless ``dry_run`` is True.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import sync_faers
+        >>> sync_faers("data", since="2020Q1", dry_run=True)
+        >>> sync_faers("data", since="2020Q1", workers=4).results.ok
+    """
+    faers_dir = os.path.join(os.path.expanduser(data_root), "faers")
+    os.makedirs(faers_dir, exist_ok=True)
+    if available is None:
+        available = available_quarters(faers_dir, refresh, headless, callback)
+
+    plan = plan_sync(faers_dir, available, since, url_for)
+    if dry_run:
+        print(plan.format())
+        return plan
+
+    urls = [plan.urls[q] for q in plan.shared + plan.missing]
+    plan.results = download_files(
+        urls,
+        download_dir=faers_dir,
+        max_workers=workers,
+        callback=callback,
+        num_retries=num_retries,
+        segments=segments,
+    )
+    return plan
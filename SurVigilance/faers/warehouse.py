@@ -0,0 +1,654 @@
+"""
+A single Parquet warehouse built from all downloaded FAERS and AERS quarters.
+
+:func:`build_warehouse` converts every ``faers_ascii_YYYYqN.zip`` and legacy
+``aers_ascii_YYYYqN.zip`` archive of a download folder into one dataset with
+the layout of :func:`table_path`::
+
+    <warehouse>/year=2011/quarter=2/table=DRUG/part-0.parquet
+    <warehouse>/year=2024/quarter=1/table=DRUG/part-0.parquet
+
+Unlike :func:`convert_quarter`, which keeps each file as it is, the
+warehouse gives every quarter the same typed columns:
+
+- AERS columns are renamed to their FAERS names in the same pass (``isr`` to
+  ``primaryid``, ``case`` to ``caseid``, ``gndr_cod`` to ``sex``, ...);
+  FAERS columns that a quarter does not have are null, and AERS-only columns
+  (``foll_seq``, ``image``, ``death_dt``, ``confid``) are dropped.
+- Identifiers and numbers are typed as in :func:`read_table`, and DEMO
+  gains ``age_years``, the age converted from the unit of ``age_cod``
+  (years, decades, months, weeks, days or hours) to years. Codes, drug
+  names, active ingredients and MedDRA terms are dictionary-encoded: in the
+  Parquet pages, and as Arrow dictionaries when read with
+  :func:`open_warehouse`.
+- DRUG rows are sorted by drug name, so the min/max statistics of its row
+  groups let a filter on ``drugname`` skip most of the file.
+- The footer of every DRUG file holds a Bloom filter of the normalized drug
+  names and active ingredients of its quarter, which
+  :func:`quarters_with_drug` uses to skip the quarters without a drug.
+
+:func:`open_warehouse` opens one table of all quarters as a
+``pyarrow.dataset.Dataset`` with ``year`` and ``quarter`` columns.
+"""
+
+import glob
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ._ascii import (
+    DEFAULT_BLOCK_SIZE,
+    TABLES,
+    TableReader,
+    quarter_from_filename,
+    read_header,
+    table_members,
+)
+from ._schema import age_in_years, cast_batch, column_type, encode_codes
+from .bloom import BloomFilter
+from .coded import normalize_drugnames
+from .convert import table_path, write_parquet
+
+FAERS_COLUMNS = {
+    "DEMO": (
+        "primaryid",
+        "caseid",
+        "caseversion",
+        "i_f_code",
+        "event_dt",
+        "mfr_dt",
+        "init_fda_dt",
+        "fda_dt",
+        "rept_cod",
+        "auth_num",
+        "mfr_num",
+        "mfr_sndr",
+        "lit_ref",
+        "age",
+        "age_cod",
+        "age_grp",
+        "age_years",
+        "sex",
+        "e_sub",
+        "wt",
+        "wt_cod",
+        "rept_dt",
+        "to_mfr",
+        "occp_cod",
+        "reporter_country",
+        "occr_country",
+    ),
+    "DRUG": (
+        "primaryid",
+        "caseid",
+        "drug_seq",
+        "role_cod",
+        "drugname",
+        "prod_ai",
+        "val_vbm",
+        "route",
+        "dose_vbm",
+        "cum_dose_chr",
+        "cum_dose_unit",
+        "dechal",
+        "rechal",
+        "lot_num",
+        "exp_dt",
+        "nda_num",
+        "dose_amt",
+        "dose_unit",
+        "dose_form",
+        "dose_freq",
+    ),
+    "REAC": ("primaryid", "caseid", "pt", "drug_rec_act"),
+    "OUTC": ("primaryid", "caseid", "outc_cod"),
+    "RPSR": ("primaryid", "caseid", "rpsr_cod"),
+    "THER": (
+        "primaryid",
+        "caseid",
+        "dsg_drug_seq",
+        "start_dt",
+        "end_dt",
+        "dur",
+        "dur_cod",
+    ),
+    "INDI": ("primaryid", "caseid", "indi_drug_seq", "indi_pt"),
+}
+
+# AERS (up to 2012 Q3) and early FAERS names of the columns above.
+RENAMES = {
+    "isr": "primaryid",
+    "case": "caseid",
+    "i_f_cod": "i_f_code",
+    "gndr_cod": "sex",
+}
+TABLE_RENAMES = {
+    "THER": {"drug_seq": "dsg_drug_seq"},
+    "INDI": {"drug_seq": "indi_drug_seq"},
+}
+
+# Repetitive free-text columns that are dictionary-encoded on top of the codes.
+TERM_COLUMNS = ("drugname", "prod_ai", "pt", "indi_pt")
+
+SORT_KEYS = {"DRUG": ("drugname", "primaryid", "drug_seq")}
+
+# Small enough that a sorted DRUG quarter spans a dozen or so row groups.
+ROW_GROUP_SIZE = 128 * 1024
+
+# Zstandard makes the warehouse about a third smaller than Snappy would.
+COMPRESSION = "zstd"
+
+# Footer key of the Bloom filter of the drug names of a DRUG file.
+DRUG_BLOOM_KEY = "survigilance.drug_bloom"
+
+_ARCHIVE_RE = re.compile(r"^(faers|aers)_ascii_(\d{4})q([1-4])\.zip$", re.IGNORECASE)
+
+_QUARTER_RE = re.compile(r"year=(\d{4})[/\\]quarter=([1-4])[/\\]")
+_PARTITIONING = ds.partitioning(
+    pa.schema([("year", pa.int16()), ("quarter", pa.int8())]), flavor="hive"
+)
+
+
+def warehouse_schema(table: str) -> pa.Schema:
+    """Return the schema every quarter of ``table`` has in the warehouse."""
+    fields = []
+    for name in FAERS_COLUMNS[table.upper()]:
+        if name in TERM_COLUMNS:
+            fields.append((name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append((name, column_type(name)))
+    return pa.schema(fields)
+
+
+def _storage_schema(schema: pa.Schema) -> pa.Schema:
+    # Columns are written as plain strings (Parquet still dictionary-encodes
+    # the pages): the dataset scanner only prunes row groups by the
+    # statistics of columns that are not stored as Arrow dictionaries.
+    return pa.schema(
+        [
+            (f.name, f.type.value_type if pa.types.is_dictionary(f.type) else f.type)
+            for f in schema
+        ]
+    )
+
+
+def _decoded(
+    batches: Iterator[pa.RecordBatch], storage: pa.Schema
+) -> Iterator[pa.RecordBatch]:
+    for batch in batches:
+        arrays = [c.cast(f.type) for c, f in zip(batch.columns, storage)]
+        yield pa.RecordBatch.from_arrays(arrays, schema=storage)
+
+
+def _source_names(table: str, names: list[str]) -> dict[str, str]:
+    # Map the columns of one file to the warehouse columns they fill.
+    renames = {**RENAMES, **TABLE_RENAMES.get(table, {})}
+    wanted = set(FAERS_COLUMNS[table])
+    mapping = {}
+    for name in names:
+        target = renames.get(name, name)
+        if target in wanted and target not in mapping.values():
+            mapping[name] = target
+    return mapping
+
+
+def _conform(
+    batch: pa.RecordBatch, mapping: dict[str, str], schema: pa.Schema
+) -> pa.RecordBatch:
+    renamed = batch.rename_columns([mapping[n] for n in batch.schema.names])
+    typed = cast_batch(renamed)
+    arrays = []
+    for field in schema:
+        if field.name == "age_years" and {"age", "age_cod"} <= set(typed.schema.names):
+            age, unit = typed.column("age"), typed.column("age_cod")
+            arrays.append(age_in_years(age, unit))
+        elif field.name not in typed.schema.names:
+            arrays.append(pa.nulls(typed.num_rows, field.type))
+        elif field.name in TERM_COLUMNS:
+            arrays.append(encode_codes(typed.column(field.name)))
+        else:
+            arrays.append(typed.column(field.name))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _sorted(
+    batches: Iterator[pa.RecordBatch],
+    schema: pa.Schema,
+    keys: tuple[str, ...],
+    row_group_size: int,
+) -> Iterator[pa.RecordBatch]:
+    table = pa.Table.from_batches(list(batches), schema=schema)
+    # Arrow cannot sort dictionary columns, so sort on their decoded values.
+    key_table = pa.table(
+        {
+            k: table.column(k).cast(pa.string())
+            if pa.types.is_dictionary(table.schema.field(k).type)
+            else table.column(k)
+            for k in keys
+        }
+    )
+    order = pc.sort_indices(key_table, [(k, "ascending") for k in keys])
+    del key_table
+    yield from table.take(order).to_batches(max_chunksize=row_group_size)
+
+
+def _collect_drug_names(
+    batches: Iterator[pa.RecordBatch], names: set[str]
+) -> Iterator[pa.RecordBatch]:
+    for batch in batches:
+        for column in ("drugname", "prod_ai"):
+            distinct = normalize_drugnames(pc.unique(batch.column(column)))
+            names.update(n for n in distinct.to_pylist() if n)
+        yield batch
+
+
+def convert_table(
+    zip_path: str,
+    table: str,
+    warehouse_dir: str = "data/faers/warehouse",
+    row_group_size: int = ROW_GROUP_SIZE,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> dict | None:
+    """
+    Write one table of a quarterly zip to the warehouse.
+
+    Returns a dict with the ``path``, ``rows``, ``skipped_rows`` and
+    ``seconds``, or None when the archive has no such table.
+    """
+    began = time.perf_counter()
+    year, quarter = quarter_from_filename(zip_path)
+    table = table.upper()
+    with zipfile.ZipFile(zip_path) as zf:
+        members = table_members(zf)
+        if table not in members:
+            return None
+        names, _ = read_header(zf, members[table])
+        mapping = _source_names(table, names)
+        reader = TableReader(
+            zf, members[table], columns=list(mapping), block_size=block_size
+        )
+        schema = warehouse_schema(table)
+        batches = (_conform(b, mapping, schema) for b in reader)
+        if table in SORT_KEYS:
+            batches = _sorted(batches, schema, SORT_KEYS[table], row_group_size)
+        storage = _storage_schema(schema)
+        batches = _decoded(batches, storage)
+        metadata = None
+        if table == "DRUG":
+            names = set()
+            batches = _collect_drug_names(batches, names)
+
+            def metadata() -> dict[str, str]:
+                bloom = BloomFilter.for_items(sorted(names))
+                return {DRUG_BLOOM_KEY: bloom.to_string()}
+
+        path = table_path(warehouse_dir, year, quarter, table)
+        rows = write_parquet(
+            path,
+            storage,
+            batches,
+            row_group_size,
+            compression=COMPRESSION,
+            metadata=metadata,
+        )
+    return {
+        "path": path,
+        "rows": rows,
+        "skipped_rows": reader.skipped_rows,
+        "seconds": time.perf_counter() - began,
+    }
+
+
+def convert_to_warehouse(
+    zip_path: str,
+    warehouse_dir: str = "data/faers/warehouse",
+    tables: list[str] | None = None,
+    row_group_size: int = ROW_GROUP_SIZE,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> dict:
+    """
+    Add one FAERS or AERS quarterly zip to the Parquet warehouse.
+
+    Every table except DRUG is streamed, so memory use does not depend on its
+    size; DRUG is held in memory (dictionary-encoded) to sort it by drug name.
+
+    Parameters
+    -----------
+    zip_path: str
+        Path to ``faers_ascii_YYYYqN.zip`` or ``aers_ascii_YYYYqN.zip``.
+
+    warehouse_dir: str
+        Root of the warehouse (default "data/faers/warehouse").
+
+    tables: list of str, optional
+        Tables to convert (default all seven).
+
+    row_group_size: int
+        Maximum number of rows per Parquet row group (default 131072).
+
+    block_size: int
+        Bytes of text parsed at a time (default 16 MiB).
+
+    Returns
+    --------
+    A dict like the one of :func:`convert_quarter`.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import convert_to_warehouse
+        >>> convert_to_warehouse("data/faers/aers_ascii_2011q2.zip")["tables"]
+    """
+    began = time.perf_counter()
+    year, quarter = quarter_from_filename(zip_path)
+    result = {"year": year, "quarter": quarter, "tables": {}}
+    for table in tables or TABLES:
+        converted = convert_table(
+            zip_path, table, warehouse_dir, row_group_size, block_size
+        )
+        if converted is not None:
+            del converted["seconds"]
+            result["tables"][table.upper()] = converted
+    result["seconds"] = time.perf_counter() - began
+    return result
+
+
+def find_archives(download_dir: str) -> list[str]:
+    """Return the quarterly FAERS and AERS zips of a folder, oldest first."""
+    found = []
+    for name in os.listdir(download_dir):
+        m = _ARCHIVE_RE.match(name)
+        if m:
+            found.append((int(m.group(2)), int(m.group(3)), name))
+    return [os.path.join(download_dir, name) for _, _, name in sorted(found)]
+
+
+def _converted_before(zip_path: str, table: str, warehouse_dir: str) -> dict | None:
+    # Files are renamed into place only when complete, so one that is newer
+    # than its archive is a finished conversion of it.
+    path = table_path(warehouse_dir, *quarter_from_filename(zip_path), table)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(zip_path):
+            return None
+        rows = pq.ParquetFile(path).metadata.num_rows
+    except OSError:
+        return None
+    return {"path": path, "rows": rows, "skipped_rows": 0, "resumed": True}
+
+
+def build_warehouse(
+    download_dir: str = "data/faers",
+    warehouse_dir: str | None = None,
+    archives: list[str] | None = None,
+    tables: list[str] | None = None,
+    row_group_size: int = ROW_GROUP_SIZE,
+    callback: Callable[[dict], None] | None = None,
+    workers: int = 1,
+    max_large_tables: int = 1,
+    overwrite: bool = False,
+) -> dict:
+    """
+    Convert all downloaded FAERS and AERS quarters into one Parquet warehouse.
+
+    Every table of every quarter is a separate task; with ``workers`` above 1
+    the tasks run in a pool of processes. At most ``workers`` tables are
+    converted at a time and, of those, at most ``max_large_tables`` are
+    tables held in memory to be sorted (DRUG), so peak memory is bounded by
+    the settings rather than by the number of quarters. Tables already
+    converted from the same archive are kept, so an interrupted run resumes
+    where it stopped.
+
+    Parameters
+    -----------
+    download_dir: str
+        Folder holding the quarterly zips (default "data/faers").
+
+    warehouse_dir: str, optional
+        Root of the warehouse (default ``<download_dir>/warehouse``).
+
+    archives: list of str, optional
+        Archives to convert (default every ``faers_ascii_*.zip`` and
+        ``aers_ascii_*.zip`` in ``download_dir``).
+
+    tables: list of str, optional
+        Tables to convert (default all seven).
+
+    row_group_size: int
+        Maximum number of rows per Parquet row group (default 131072).
+
+    callback: callable, optional
+        Callable to receive UI/status events, called with a dict on the
+        calling thread: ``ingest_start`` and ``ingest_complete`` for every
+        archive, ``error`` for a table that failed, then
+        ``warehouse_complete``.
+
+    workers: int
+        Number of worker processes (default 1, convert in this process).
+
+    max_large_tables: int
+        Maximum number of DRUG tables converted at the same time (default 1).
+
+    overwrite: bool
+        Convert every table again, even when it is up to date (default False).
+
+    Returns
+    --------
+    A dict with the ``warehouse_dir``, one entry per archive under
+    ``quarters`` (like the result of :func:`convert_to_warehouse`; tables
+    kept from an earlier run have ``resumed`` set), the ``failures`` as
+    ``(zip path, table, error message)`` and the total ``seconds``.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import build_warehouse, open_warehouse
+        >>> build_warehouse("data/faers", workers=4)
+        >>> drug = open_warehouse("data/faers/warehouse", "DRUG")
+    """
+    began = time.perf_counter()
+    warehouse_dir = warehouse_dir or os.path.join(download_dir, "warehouse")
+    if archives is None:
+        archives = find_archives(download_dir)
+    wanted = [t.upper() for t in (tables or TABLES)]
+    workers = max(1, workers)
+    max_large_tables = max(1, max_large_tables)
+
+    quarters = {}
+    remaining = {}
+    tasks = []
+    for path in archives:
+        year, quarter = quarter_from_filename(path)
+        quarters[path] = {
+            "zip_path": path,
+            "year": year,
+            "quarter": quarter,
+            "tables": {},
+            "seconds": 0.0,
+        }
+        remaining[path] = 0
+        for table in wanted:
+            done = None if overwrite else _converted_before(path, table, warehouse_dir)
+            if done is not None:
+                quarters[path]["tables"][table] = done
+            else:
+                tasks.append((path, table))
+                remaining[path] += 1
+    failures = []
+    started = set()
+
+    def _emit(evt: dict) -> None:
+        if callback:
+            callback(evt)
+
+    def _start(path: str) -> None:
+        if path not in started:
+            started.add(path)
+            _emit({"type": "ingest_start", "filename": os.path.basename(path)})
+
+    def _finish(path: str, table: str, outcome: dict | None, error: str) -> None:
+        remaining[path] -= 1
+        if error:
+            failures.append((path, table, error))
+            _emit(
+                {
+                    "type": "error",
+                    "message": f"Failed to convert {table} of {path}: {error}",
+                    "filename": os.path.basename(path),
+                }
+            )
+        elif outcome is not None:
+            quarters[path]["seconds"] += outcome.pop("seconds")
+            quarters[path]["tables"][table] = outcome
+        if remaining[path] == 0:
+            _emit(
+                {
+                    "type": "ingest_complete",
+                    "filename": os.path.basename(path),
+                    "seconds": quarters[path]["seconds"],
+                }
+            )
+
+    if workers == 1:
+        for path, table in tasks:
+            _start(path)
+            try:
+                outcome = convert_table(path, table, warehouse_dir, row_group_size)
+            except Exception as e:
+                _finish(path, table, None, str(e))
+            else:
+                _finish(path, table, outcome, "")
+    else:
+        # "spawn" keeps the workers independent of the threads of this process
+        # (download threads, Streamlit's server).
+        ctx = multiprocessing.get_context("spawn")
+        # Large tables take longest: start them first so that none is left
+        # running alone at the end.
+        pending = sorted(tasks, key=lambda task: task[1] not in SORT_KEYS)
+        inflight: dict[Future, tuple[str, str]] = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            while pending or inflight:
+                large = sum(table in SORT_KEYS for _, table in inflight.values())
+                for path, table in list(pending):
+                    if len(inflight) >= workers:
+                        break
+                    if table in SORT_KEYS:
+                        if large >= max_large_tables:
+                            continue
+                        large += 1
+                    pending.remove((path, table))
+                    _start(path)
+                    fut = pool.submit(
+                        convert_table, path, table, warehouse_dir, row_group_size
+                    )
+                    inflight[fut] = (path, table)
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    path, table = inflight.pop(fut)
+                    try:
+                        outcome = fut.result()
+                    except Exception as e:
+                        _finish(path, table, None, str(e))
+                    else:
+                        _finish(path, table, outcome, "")
+
+    seconds = time.perf_counter() - began
+    _emit(
+        {
+            "type": "warehouse_complete",
+            "quarters": len(quarters),
+            "failures": len(failures),
+            "seconds": seconds,
+        }
+    )
+    return {
+        "warehouse_dir": warehouse_dir,
+        "quarters": list(quarters.values()),
+        "failures": failures,
+        "seconds": seconds,
+    }
+
+
+def _quarter_of(path: str) -> tuple[int, int]:
+    m = _QUARTER_RE.search(path)
+    return int(m.group(1)), int(m.group(2))
+
+
+def quarters_with_drug(warehouse_dir: str, drug: str) -> list[tuple[int, int]]:
+    """
+    Return the quarters of the warehouse that may have a drug, oldest first.
+
+    Only the footer of every DRUG file is read: a quarter is left out when
+    the Bloom filter of its drug names and active ingredients does not have
+    ``drug`` (normalized as by ``normalize_drugnames``). About 1% of the
+    quarters without the drug are kept anyway, and quarters converted
+    before the filters existed are always kept.
+
+    Examples
+    ---------
+        >>> from SurVigilance.faers import quarters_with_drug
+        >>> quarters_with_drug("data/faers/warehouse", "Humira")
+        [(2004, 1), (2004, 2), ...]
+    """
+    name = normalize_drugnames(pa.array([drug])).to_pylist()[0]
+    pattern = os.path.join(
+        warehouse_dir, "year=*", "quarter=*", "table=DRUG", "*.parquet"
+    )
+    quarters = set()
+    for path in glob.glob(pattern):
+        metadata = pq.read_metadata(path).metadata or {}
+        serialized = metadata.get(DRUG_BLOOM_KEY.encode())
+        if serialized is None or name in BloomFilter.from_string(serialized):
+            quarters.add(_quarter_of(path))
+    return sorted(quarters)
+
+
+def open_warehouse(
+    warehouse_dir: str, table: str, drug: str | None = None
+) -> ds.Dataset:
+    """
+    Open one table of the warehouse, over all quarters, as a dataset.
+
+    The dataset has the columns of :func:`warehouse_schema` plus the
+    ``year`` and ``quarter`` partition columns, which filters can use to
+    skip whole quarters. With ``drug``, only the quarters that may have it
+    (see :func:`quarters_with_drug`) are included; rows still have to be
+    filtered on ``drugname`` or ``primaryid``.
+
+    Examples
+    ---------
+        >>> import pyarrow.dataset as ds
+        >>> from SurVigilance.faers import open_warehouse
+        >>> drug = open_warehouse("data/faers/warehouse", "DRUG")
+        >>> drug.to_table(
+        ...     columns=["primaryid", "role_cod"],
+        ...     filter=(ds.field("drugname") == "HUMIRA") & (ds.field("year") >= 2020),
+        ... )
+        >>> reac = open_warehouse("data/faers/warehouse", "REAC", drug="HUMIRA")
+    """
+    table = table.upper()
+    if table not in FAERS_COLUMNS:
+        raise ValueError(f"Unknown FAERS table {table!r}; expected one of {TABLES}")
+    pattern = os.path.join(
+        warehouse_dir, "year=*", "quarter=*", f"table={table}", "*.parquet"
+    )
+    paths = sorted(glob.glob(pattern))
+    if drug is not None:
+        keep = set(quarters_with_drug(warehouse_dir, drug))
+        paths = [p for p in paths if _quarter_of(p) in keep]
+    schema = warehouse_schema(table)
+    for field in _PARTITIONING.schema:
+        schema = schema.append(field)
+    return ds.dataset(
+        paths,
+        schema=schema,
+        format="parquet",
+        partitioning=_PARTITIONING,
+        partition_base_dir=warehouse_dir,
+    )
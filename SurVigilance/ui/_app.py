@@ -12,7 +12,11 @@ from pathlib import Path
 
 import streamlit as st
 
-from SurVigilance.ui.scrapers import check_all_scraper_sites
+from SurVigilance.ui.scrapers import (
+    archive_store,
+    check_all_scraper_sites,
+    download_governor,
+)
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:  # pragma: no cover
@@ -168,6 +172,73 @@ try:
 except Exception:  # pragma: no cover
     raise  # pragma: no cover
 
+st.subheader("Download limits")
+
+
+def update_download_limits():
+    """Callback to apply the edited limits to the shared download governor."""
+    download_governor.configure_download_limits(
+        max_bytes_per_sec=st.session_state.max_download_mbps * 1e6,
+        max_connections_per_host=st.session_state.max_connections_per_host,
+    )
+
+
+# The limits are shared by every session: show the ones in effect, and only
+# change them when a user edits a widget, never on a rerun.
+limits = download_governor.get_governor().limits
+st.session_state.max_download_mbps = (limits.max_bytes_per_sec or 0.0) / 1e6
+st.session_state.max_connections_per_host = limits.max_connections_per_host
+
+limit_cols = st.columns(2)
+with limit_cols[0]:
+    st.number_input(
+        "Maximum download bandwidth (MB/s)",
+        help=(
+            "Combined bandwidth of all downloads made by this SurVigilance "
+            "server, shared between users. 0 means unlimited."
+        ),
+        key="max_download_mbps",
+        on_change=update_download_limits,
+        min_value=0.0,
+        step=1.0,
+    )
+with limit_cols[1]:
+    st.number_input(
+        "Connections per host",
+        help=(
+            "Maximum number of simultaneous transfers from one website. "
+            "It is reduced automatically while the website asks clients to "
+            "slow down. Defaults to 8."
+        ),
+        key="max_connections_per_host",
+        on_change=update_download_limits,
+        min_value=1,
+        max_value=32,
+        step=1,
+    )
+
+
+def update_archive_store():
+    """Callback to point the shared archive store at the edited folder."""
+    archive_store.configure_archive_store(st.session_state.archive_store_dir.strip())
+
+
+# Like the download limits, the store is shared by every session: show the
+# one in use (empty when disabled) and only change it when a user edits it.
+store = archive_store.get_archive_store()
+st.session_state.archive_store_dir = store.root if store is not None else ""
+
+st.text_input(
+    "Shared archive folder",
+    help=(
+        "Downloaded archives are kept once in this folder and linked into "
+        "every user's data folder, so each file is fetched once per machine. "
+        "Leave empty to disable."
+    ),
+    key="archive_store_dir",
+    on_change=update_archive_store,
+)
+
 st.subheader("Please select a Database to Search")
 
 row1 = st.columns(2)
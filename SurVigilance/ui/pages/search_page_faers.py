@@ -1,6 +1,5 @@
 import importlib
 import os
-import re
 import sys
 from pathlib import Path
 
@@ -15,13 +14,13 @@ if str(ROOT) not in sys.path:  # pragma: no cover
 try:
     scrape_faers_module = importlib.import_module("scrapers.scrape_faers")
     scrape_faers_sb = scrape_faers_module.scrape_faers_sb
-    download_file = scrape_faers_module.download_file
+    download_files = scrape_faers_module.download_files
 
     mapping_module = importlib.import_module("scrapers.faers_links")
     faers_ascii_url = mapping_module.faers_ascii_url
+    quarter_number = mapping_module.quarter_number
 
     QUARTER_MONTHS = mapping_module.QUARTER_MONTHS
-    QUARTER_LABELS = mapping_module.QUARTER_LABELS
 except Exception as e:  # pragma: no cover
     st.error(f"Failed to import the USA FAERS scraper: {e}")
     st.stop()
@@ -36,6 +35,7 @@ st.set_page_config(
 
 st.session_state.setdefault("data_root", "data")
 st.session_state.setdefault("num_retries", 5)
+st.session_state.setdefault("faers_max_workers", 4)
 faers_dir = os.path.join(
     os.path.expanduser(st.session_state.get("data_root", "data")), "faers"
 )
@@ -66,6 +66,14 @@ st.number_input(
     min_value=0,
     step=1,
 )
+st.number_input(
+    "Parallel downloads",
+    help="Number of FAERS files downloaded at the same time. Defaults to 4.",
+    key="faers_max_workers",
+    min_value=1,
+    max_value=16,
+    step=1,
+)
 
 
 fetch = st.button("List all FAERS years and available quarters", width="stretch")
@@ -215,28 +223,11 @@ if df is not None:
                 selected_list.append((str(y), str(q)))
 
         if selected_list:
-            # Trying to convert a label like "Jan-Mar" into Q1.
-            def _infer_quarter_number(label: str) -> int | None:
-                try:
-                    label_lower = (label or "").lower()
-
-                    m = re.search(r"\bq\s*([1-4])\b", label_lower)
-                    if m:
-                        return int(m.group(1))
-
-                    for qnum, qlab in QUARTER_LABELS.items():
-                        if qlab.lower() in label_lower:
-                            return int(qnum)
-
-                except Exception:  # pragma: no cover
-                    raise  # pragma: no cover
-                return None
-
             # Build a list of objects containing year, quarter, and the URL to download
             selections_with_urls = []
             for y, qlabel in selected_list:
                 try:
-                    qnum = _infer_quarter_number(qlabel)
+                    qnum = quarter_number(qlabel)
                     if qnum is None:
                         continue
                     year_int = int(str(y).strip())
@@ -282,61 +273,87 @@ if df is not None:
                 download_overall_status = st.empty()  # Overall success/failure summary
 
                 if download_clicked:
-                    successes = []  # Paths of files that were downloaded
-                    failures = []  # Any (filename, error) pairs that failed
-
                     with download_status_area.container():
+                        overall_text = st.empty()  # Aggregate throughput and ETA
+                        overall_bar = st.progress(0)
+
+                        # One status box and progress bar per file, keyed by URL
+                        file_widgets = {}
                         for item in selections_with_urls:
-                            url = item["url"]
-                            fname = item["filename"]
-
-                            with st.status(
-                                f"Preparing {fname}", expanded=True
-                            ) as st_status:
-                                pbar = st.progress(0)  # Progress for this single file
-
-                                def per_file_callback(
-                                    evt: dict,
-                                ) -> None:  # pragma: no cover
-                                    # Handle per-file download progress/logs and errors.
-                                    et = evt.get("type")
-                                    if et == "download_start":
-                                        st_status.update(
-                                            label=f"Downloading {evt.get('filename', fname)}",
-                                            state="running",
-                                        )
-                                    elif et == "download_progress":
-                                        pct = evt.get("percent")
-                                        if isinstance(pct, int):
-                                            pbar.progress(max(0, min(100, pct)))
-                                    elif et == "download_complete":
-                                        pbar.progress(100)
-                                        st_status.update(
-                                            label=f"Downloaded {fname}",
-                                            state="complete",
-                                        )
-                                    elif et == "error":
-                                        st_status.update(
-                                            label=f"Failed {fname}", state="error"
-                                        )
-                                        error_box.error(
-                                            f"{fname}: {evt.get('message')}"
-                                        )
-                                    elif et == "log":
-                                        st_status.write(evt.get("message", ""))
-
-                                try:
-                                    path = download_file(
-                                        url=url,
-                                        download_dir=faers_dir,
-                                        callback=per_file_callback,
-                                        num_retries=st.session_state.get(
-                                            "num_retries", 5
-                                        ),
-                                    )
-                                    successes.append(path)
-                                except Exception as _e:  # pragma: no cover
-                                    failures.append((fname, str(_e)))
+                            st_status = st.status(
+                                f"Waiting to download {item['filename']}",
+                                expanded=False,
+                            )
+                            with st_status:
+                                pbar = st.progress(0)
+                            file_widgets[item["url"]] = (st_status, pbar)
+
+                        def batch_callback(evt: dict) -> None:  # pragma: no cover
+                            # Route per-file events to their widgets and show
+                            # aggregate progress for the whole batch.
+                            et = evt.get("type")
+                            if et == "batch_progress":
+                                pct = evt.get("percent")
+                                if isinstance(pct, int):
+                                    overall_bar.progress(max(0, min(100, pct)))
+                                rate_mb = evt.get("bytes_per_sec", 0.0) / 1024**2
+                                eta = evt.get("eta_seconds")
+                                eta_text = (
+                                    f", about {int(eta)}s remaining"
+                                    if eta is not None
+                                    else ""
+                                )
+                                overall_text.info(
+                                    f"{evt.get('completed_files', 0)} of "
+                                    f"{evt.get('total_files', 0)} file(s) done at "
+                                    f"{rate_mb:.1f} MB/s{eta_text}"
+                                )
+                                return
+                            if et == "batch_complete":
+                                overall_bar.progress(100)
+                                return
+
+                            widgets = file_widgets.get(evt.get("url"))
+                            if widgets is None:
+                                return
+                            st_status, pbar = widgets
+                            fname = evt.get("filename", "")
+                            if et == "download_start":
+                                st_status.update(
+                                    label=f"Downloading {fname}",
+                                    state="running",
+                                )
+                            elif et == "download_progress":
+                                pct = evt.get("percent")
+                                if isinstance(pct, int):
+                                    pbar.progress(max(0, min(100, pct)))
+                            elif et == "download_complete":
+                                pbar.progress(100)
+                                st_status.update(
+                                    label=(
+                                        f"{fname} is already up to date"
+                                        if evt.get("skipped")
+                                        else f"Downloaded {fname}"
+                                    ),
+                                    state="complete",
+                                )
+                            elif et == "error":
+                                st_status.update(label=f"Failed {fname}", state="error")
+                                error_box.error(f"{fname}: {evt.get('message')}")
+                            elif et == "log":
+                                st_status.write(evt.get("message", ""))
+
+                        result = download_files(
+                            [item["url"] for item in selections_with_urls],
+                            download_dir=faers_dir,
+                            max_workers=st.session_state.get("faers_max_workers", 4),
+                            callback=batch_callback,
+                            num_retries=st.session_state.get("num_retries", 5),
+                        )
+                    successes = result.successes  # Paths of files that were downloaded
+                    failures = [  # Any (filename, error) pairs that failed
+                        (os.path.basename(u), msg) for u, msg in result.failures
+                    ]
 
                     with download_overall_status.container():
                         if successes:
@@ -1,22 +1,59 @@
+import importlib
+import sys
+
+# The UI pages import this package as the top-level ``scrapers`` (with
+# ``SurVigilance/ui`` on sys.path). Point those names at the modules of
+# ``SurVigilance.ui.scrapers``, so the process-wide download limits and
+# archive store exist once however the modules are imported.
+if __name__ != "SurVigilance.ui.scrapers":
+    _package = importlib.import_module("SurVigilance.ui.scrapers")
+    for _name, _module in list(sys.modules.items()):
+        if _name.startswith(f"{_package.__name__}."):
+            sys.modules[__name__ + _name[len(_package.__name__) :]] = _module
+    sys.modules[__name__] = _package
+
+from .archive_store import ArchiveStore, configure_archive_store
+from .async_downloads import adownload_file, adownload_files
 from .check_internet_connectivity import (
     check_all_scraper_sites,
     check_site_connectivity,
 )
+from .download_governor import DownloadLimits, configure_download_limits
+from .download_manifest import DownloadManifest
+from .download_progress import ProgressPolicy
 from .faers_links import faers_ascii_url
+from .remote_zip import RemoteZip, fetch_zip_members
 from .scrape_daen import scrape_daen_sb
 from .scrape_dma import scrape_dma_sb
-from .scrape_faers import download_file, scrape_faers_sb
+from .scrape_faers import (
+    DownloadResults,
+    download_file,
+    download_files,
+    scrape_faers_sb,
+)
 from .scrape_lareb import scrape_lareb_sb
 from .scrape_nzsmars import scrape_medsafe_sb
 from .scrape_vaers import download_vaers_zip_sb, vaers_intermediate_url
 from .scrape_vigiaccess import scrape_vigiaccess_sb
 
 __all__ = [
+    "ArchiveStore",
+    "DownloadLimits",
+    "DownloadManifest",
+    "DownloadResults",
+    "ProgressPolicy",
+    "RemoteZip",
+    "adownload_file",
+    "adownload_files",
     "check_all_scraper_sites",
     "check_site_connectivity",
+    "configure_archive_store",
+    "configure_download_limits",
     "download_file",
+    "download_files",
     "download_vaers_zip_sb",
     "faers_ascii_url",
+    "fetch_zip_members",
     "scrape_daen_sb",
     "scrape_dma_sb",
     "scrape_faers_sb",
@@ -0,0 +1,899 @@
+"""
+Internal helpers shared by the archive downloaders.
+
+Partial downloads are written to ``<file>.part`` next to the final file, with a
+small JSON sidecar (``<file>.part.json``) recording the URL, the validators
+returned by the server (ETag / Last-Modified) and the number of bytes already
+on disk. This lets an interrupted transfer continue with an HTTP ``Range``
+request instead of starting over.
+
+Large files can also be fetched as several byte ranges in parallel
+("segmented" mode). The ``.part`` file is then allocated at its full size up
+front and each segment is written at its own offset; the sidecar records how
+far every segment got.
+
+While the bytes are written they are also fed to a :class:`StreamHasher`,
+which computes the SHA-256 and keeps the last few KiB of the file in memory.
+That tail is enough to check the zip end-of-central-directory record, so a
+truncated or corrupt archive is caught without reading the file back.
+
+The body is read with ``readinto`` into a reusable buffer of a few MiB and
+written with one positional write per full buffer, and when the size is
+known the ``.part`` file is preallocated (``posix_fallocate``). This keeps
+the file contiguous on disk, avoids a system call per network read, and makes
+a download fail before the transfer if the disk cannot hold the file.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import zipfile
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+
+from .download_governor import BACKOFF_STATUS, get_governor, retry_after_seconds
+
+PART_SUFFIX = ".part"
+SIDECAR_SUFFIX = ".part.json"
+
+# Seconds to wait before retrying a failed download.
+RETRY_DELAY = 20
+
+# Segments smaller than this are not worth a separate connection.
+MIN_SEGMENT_BYTES = 1 << 20
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)", re.IGNORECASE)
+
+
+def content_length(headers: Any) -> int:
+    """Return the Content-Length header as an int (0 when missing or invalid)."""
+    try:
+        return int(headers.get("Content-Length") or headers.get("content-length") or 0)
+    except (TypeError, ValueError):  # pragma: no cover
+        return 0
+
+
+def parse_content_range(value: str | None) -> tuple[int, int, int | None] | None:
+    """
+    Parse a ``Content-Range: bytes start-end/total`` header.
+
+    Returns a ``(start, end, total)`` tuple, where total is None when the server
+    sent ``*``, or None when the header is missing or malformed.
+    """
+    if not value:
+        return None
+    m = _CONTENT_RANGE_RE.match(value.strip())
+    if not m:
+        return None
+    total = None if m.group(3) == "*" else int(m.group(3))
+    return int(m.group(1)), int(m.group(2)), total
+
+
+def sidecar_path(file_path: str) -> str:
+    return file_path + SIDECAR_SUFFIX
+
+
+def read_sidecar(file_path: str) -> dict:
+    """Read the resume sidecar for ``file_path``; returns {} if absent or unreadable."""
+    try:
+        with open(sidecar_path(file_path), encoding="utf-8") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def write_sidecar(file_path: str, state: dict) -> None:
+    """Atomically write the resume sidecar for ``file_path``."""
+    path = sidecar_path(file_path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def clear_partial(file_path: str) -> None:
+    """Remove the ``.part`` file and sidecar belonging to ``file_path``."""
+    for path in (file_path + PART_SUFFIX, sidecar_path(file_path)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def resume_state(file_path: str, url: str) -> tuple[int, dict]:
+    """
+    Work out where a previous attempt stopped.
+
+    Returns ``(offset, state)``. For a single-stream download the offset is
+    the size of the ``.part`` file; for a segmented download it is the number
+    of bytes written across all segments. If there is no sidecar for the same
+    URL the offset is 0 and any stale partial data is discarded.
+    """
+    part_path = file_path + PART_SUFFIX
+    state = read_sidecar(file_path)
+    if not state or state.get("url") != url or not os.path.isfile(part_path):
+        clear_partial(file_path)
+        return 0, {}
+
+    if state.get("segments"):
+        return sum(seg[2] for seg in state["segments"]), state
+
+    # The file may be preallocated beyond the data received, so the sidecar
+    # (written when a transfer starts and stops) has the last word.
+    offset = os.path.getsize(part_path)
+    offset = min(offset, int(state.get("offset", offset)))
+    total = int(state.get("total_bytes") or 0)
+    if total and offset > total:
+        clear_partial(file_path)
+        return 0, {}
+    return offset, state
+
+
+def range_headers(offset: int, state: dict) -> dict:
+    """
+    Build request headers to continue a download from ``offset``.
+
+    ``If-Range`` makes the server send the whole file (200) instead of a
+    partial response (206) if it has changed since the first attempt. Weak
+    ETags are not allowed in ``If-Range``, so Last-Modified is used instead.
+    """
+    if offset <= 0:
+        return {}
+    headers = {"Range": f"bytes={offset}-"}
+    etag = state.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["If-Range"] = etag
+    elif state.get("last_modified"):
+        headers["If-Range"] = state["last_modified"]
+    return headers
+
+
+# Enough to hold the zip end-of-central-directory record with the longest
+# possible comment, plus the zip64 locator and record that precede it.
+TAIL_BYTES = 128 * 1024
+
+_EOCD = struct.Struct("<4s4H2LH")
+_ZIP64_LOCATOR = struct.Struct("<4sLQL")
+_ZIP64_EOCD = struct.Struct("<4sQ2H2L4Q")
+
+
+class StreamHasher:
+    """
+    Running SHA-256 of a file as it is written, plus its first and last bytes.
+
+    ``update`` must be called with the file's bytes in order.
+    """
+
+    def __init__(self) -> None:
+        self._sha256 = hashlib.sha256()
+        self._tail: deque[bytes] = deque()
+        self._tail_len = 0
+        self.head = b""
+        self.size = 0
+
+    def update(self, data: bytes | memoryview) -> None:
+        self._sha256.update(data)
+        self.size += len(data)
+        if len(self.head) < 4:
+            self.head += bytes(data[: 4 - len(self.head)])
+        # Only the last TAIL_BYTES of a chunk can end up in the tail.
+        kept = bytes(data[-TAIL_BYTES:])
+        self._tail.append(kept)
+        self._tail_len += len(kept)
+        while self._tail_len - len(self._tail[0]) >= TAIL_BYTES:
+            self._tail_len -= len(self._tail.popleft())
+
+    def update_from_file(self, path: str, start: int, end: int) -> None:
+        """Feed bytes ``[start, end)`` of the file at ``path``."""
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                block = f.read(min(remaining, 1 << 20))
+                if not block:
+                    raise OSError(f"{path} is shorter than expected")
+                self.update(block)
+                remaining -= len(block)
+
+    @property
+    def tail(self) -> bytes:
+        return b"".join(self._tail)[-TAIL_BYTES:]
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+def central_directory_location(tail: bytes, size: int) -> tuple[int, int, int, int]:
+    """
+    Locate the central directory of a zip of ``size`` bytes from its last bytes.
+
+    Returns ``(cd_offset, cd_size, entries, eocd_offset)``, read from the
+    end-of-central-directory record or its zip64 variant. Raises
+    ``zipfile.BadZipFile`` when the records are missing or inconsistent.
+    """
+    pos = tail.rfind(b"PK\x05\x06")
+    while pos >= 0 and pos + _EOCD.size > len(tail):
+        pos = tail.rfind(b"PK\x05\x06", 0, pos)
+    if pos < 0:
+        raise zipfile.BadZipFile("End of central directory record not found")
+
+    fields = _EOCD.unpack_from(tail, pos)
+    entries, cd_size, cd_offset, comment_len = fields[4:]
+    if pos + _EOCD.size + comment_len != len(tail):
+        raise zipfile.BadZipFile("Zip comment length does not match the file end")
+    eocd_offset = size - len(tail) + pos
+
+    loc = pos - _ZIP64_LOCATOR.size
+    if loc >= 0 and tail[loc : loc + 4] == b"PK\x06\x07":
+        _, _, zip64_offset, _ = _ZIP64_LOCATOR.unpack_from(tail, loc)
+        rec = zip64_offset - (size - len(tail))
+        if rec < 0 or tail[rec : rec + 4] != b"PK\x06\x06":
+            raise zipfile.BadZipFile("Zip64 end of central directory record missing")
+        fields = _ZIP64_EOCD.unpack_from(tail, rec)
+        entries, cd_size, cd_offset = fields[-3], fields[-2], fields[-1]
+        eocd_offset = zip64_offset
+
+    elif cd_offset == 0xFFFFFFFF or cd_size == 0xFFFFFFFF:
+        raise zipfile.BadZipFile("Zip64 end of central directory locator missing")
+
+    if cd_offset + cd_size != eocd_offset:
+        raise zipfile.BadZipFile("Central directory does not end at its record")
+    return cd_offset, cd_size, entries, eocd_offset
+
+
+def check_zip_tail(head: bytes, tail: bytes, size: int) -> None:
+    """
+    Check that a zip file of ``size`` bytes is complete from its first and last bytes.
+
+    ``tail`` holds the last bytes of the file. The end-of-central-directory
+    record (or its zip64 variant) must be present, the central directory must
+    end exactly where that record starts and begin with a central directory
+    header. Raises ``zipfile.BadZipFile`` otherwise.
+    """
+    if head[:4] != b"PK\x03\x04" and size > _EOCD.size:
+        raise zipfile.BadZipFile("File does not start with a zip local header")
+
+    cd_offset, cd_size, _, _ = central_directory_location(tail, size)
+    cd_in_tail = cd_offset - (size - len(tail))
+    if (
+        cd_size
+        and cd_in_tail >= 0
+        and tail[cd_in_tail : cd_in_tail + 4] != (b"PK\x01\x02")
+    ):
+        raise zipfile.BadZipFile("Central directory header signature missing")
+
+
+def verify_download(
+    file_path: str, downloaded: int, total_bytes: int, hasher: StreamHasher
+) -> None:
+    """
+    Check a finished ``.part`` file before it is moved into place.
+
+    Raises ``OSError`` when fewer bytes than announced were received (the
+    partial data is kept so the next attempt resumes), and
+    ``zipfile.BadZipFile`` when a ``.zip`` is corrupt (the partial data is
+    discarded so the next attempt downloads it again).
+    """
+    filename = os.path.basename(file_path)
+    if total_bytes and downloaded != total_bytes:
+        raise OSError(
+            f"Incomplete download of {filename}: "
+            f"{downloaded} of {total_bytes} bytes received"
+        )
+    if hasher.size != downloaded:
+        raise OSError(f"Checksum of {filename} does not cover the whole file")
+    if filename.lower().endswith(".zip"):
+        try:
+            check_zip_tail(hasher.head, hasher.tail, hasher.size)
+        except zipfile.BadZipFile as e:
+            clear_partial(file_path)
+            raise zipfile.BadZipFile(f"{filename} is not a valid zip: {e}") from e
+
+
+# Bounds for the adaptive read size used when no fixed chunk size is given.
+MIN_CHUNK_BYTES = 64 * 1024
+MAX_CHUNK_BYTES = 4 * 1024 * 1024
+
+
+class AdaptiveChunkSize:
+    """
+    Read size that follows the measured throughput.
+
+    The size is chosen so that one read takes about ``target_seconds``: on a
+    slow link reads stay small (so progress and cancellation stay
+    responsive), on a fast one they grow up to ``maximum`` so the per-chunk
+    overhead (Python loop, write call, hashing, events) becomes negligible.
+    """
+
+    def __init__(
+        self,
+        minimum: int = MIN_CHUNK_BYTES,
+        maximum: int = MAX_CHUNK_BYTES,
+        target_seconds: float = 0.05,
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self.size = minimum
+        self._rate: float | None = None
+
+    def observe(self, nbytes: int, seconds: float) -> None:
+        rate = nbytes / max(seconds, 1e-6)
+        # Exponentially weighted average smooths out bursty reads.
+        self._rate = rate if self._rate is None else 0.7 * self._rate + 0.3 * rate
+        wanted = int(self._rate * self.target_seconds)
+        size = self.minimum
+        while size < wanted and size < self.maximum:
+            size *= 2
+        self.size = min(size, self.maximum)
+
+
+# Size of the reusable write buffer; one write system call per full buffer.
+BLOCK_BYTES = 8 * 1024 * 1024
+# Smaller buffers for segmented downloads, which need one per segment.
+SEGMENT_BLOCK_BYTES = 2 * 1024 * 1024
+
+
+def preallocate(fd: int, offset: int, length: int, path: str) -> None:
+    """
+    Reserve disk space for bytes ``[offset, offset + length)`` of an open file.
+
+    Raises ``OSError`` with ``errno.ENOSPC`` when the file system does not
+    have room, so a download fails before any data is transferred. Uses
+    ``posix_fallocate`` where available; file systems that do not support it
+    are left to allocate blocks as they are written.
+    """
+    if length <= 0:
+        return
+    free = shutil.disk_usage(os.path.dirname(os.path.abspath(path))).free
+    if free < length:
+        raise OSError(
+            errno.ENOSPC,
+            f"Not enough disk space for {os.path.basename(path)}: "
+            f"{length} bytes needed, {free} available",
+        )
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, offset, length)
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                raise
+            # EOPNOTSUPP / EINVAL: the file system cannot preallocate.
+
+
+def is_disk_full(error: BaseException) -> bool:
+    """True for the error :func:`preallocate` raises; retrying will not help."""
+    return isinstance(error, OSError) and error.errno == errno.ENOSPC
+
+
+def open_part_file(file_path: str, offset: int, total_bytes: int) -> int:
+    """
+    Open ``<file_path>.part`` for writing from ``offset`` and return its descriptor.
+
+    Anything after ``offset`` is discarded, and the rest of the file is
+    preallocated when ``total_bytes`` is known.
+    """
+    part_path = file_path + PART_SUFFIX
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        os.ftruncate(fd, offset)
+        preallocate(fd, offset, total_bytes - offset, part_path)
+    except BaseException:
+        os.ftruncate(fd, offset)
+        os.close(fd)
+        raise
+    return fd
+
+
+class BlockWriter:
+    """
+    Reusable buffer that is filled by reads and written out in large blocks.
+
+    ``write_at`` is a positional writer (see :func:`positional_writer`);
+    ``position`` is the file offset of the first byte in the buffer, so
+    ``position`` is also the end of the data already on disk.
+    """
+
+    def __init__(
+        self,
+        write_at: Callable[[bytes, int], None],
+        position: int,
+        buffer_size: int = BLOCK_BYTES,
+    ) -> None:
+        self.write_at = write_at
+        self.position = position
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.filled = 0
+
+    @property
+    def end(self) -> int:
+        """Offset just past the last byte received (written or buffered)."""
+        return self.position + self.filled
+
+    def space(self) -> memoryview:
+        return self.view[self.filled :]
+
+    def commit(self, nbytes: int) -> memoryview:
+        """
+        Mark ``nbytes`` read into :meth:`space` as filled and return them.
+
+        The returned view stays valid until the next read into the buffer.
+        """
+        data = self.view[self.filled : self.filled + nbytes]
+        self.filled += nbytes
+        if self.filled == len(self.buffer):
+            self.flush()
+        return data
+
+    def write(self, data: bytes | memoryview) -> None:
+        data = memoryview(data)
+        while data:
+            n = min(len(data), len(self.buffer) - self.filled)
+            self.view[self.filled : self.filled + n] = data[:n]
+            self.commit(n)
+            data = data[n:]
+
+    def flush(self) -> None:
+        if self.filled:
+            self.write_at(self.view[: self.filled], self.position)
+            self.position += self.filled
+            self.filled = 0
+
+
+def close_part_file(file_path: str, fd: int, writer: BlockWriter, state: dict) -> int:
+    """
+    Flush ``writer``, close the ``.part`` file and record its length in the sidecar.
+
+    Preallocated space an interrupted transfer did not reach is given back.
+    Returns the number of bytes on disk.
+    """
+    downloaded = writer.end
+    try:
+        writer.flush()
+        os.ftruncate(fd, downloaded)
+    finally:
+        os.close(fd)
+        state["offset"] = downloaded
+        write_sidecar(file_path, state)
+    return downloaded
+
+
+def _readinto(r: requests.Response, view: memoryview) -> int:
+    # Translate urllib3 errors to the ``requests`` exceptions that
+    # ``iter_content`` raises.
+    try:
+        return r.raw.readinto(view)
+    except ProtocolError as e:
+        raise requests.exceptions.ChunkedEncodingError(e) from e
+    except DecodeError as e:  # pragma: no cover
+        raise requests.exceptions.ContentDecodingError(e) from e
+    except ReadTimeoutError as e:  # pragma: no cover
+        raise requests.exceptions.ConnectionError(e) from e
+
+
+def read_response_into(
+    r: requests.Response, writer: BlockWriter, chunk_size: int | None = None
+) -> Iterator[memoryview]:
+    """
+    Read the body of a streamed response into ``writer``.
+
+    Yields each piece as it lands in the buffer (for hashing and progress).
+    Without a ``chunk_size`` the response is read with ``readinto`` straight
+    into the writer's buffer, in reads sized by :class:`AdaptiveChunkSize`;
+    with one, ``r.iter_content(chunk_size)`` is copied into it. Every piece
+    is counted against the process-wide bandwidth limit (see
+    :mod:`download_governor`), which may pause the read.
+    """
+    governor = get_governor()
+    if chunk_size:
+        for chunk in r.iter_content(chunk_size=chunk_size):
+            if chunk:
+                governor.throttle(len(chunk))
+                writer.write(chunk)
+                yield memoryview(chunk)
+        return
+
+    r.raw.decode_content = True
+    sizer = AdaptiveChunkSize()
+    while True:
+        began = time.perf_counter()
+        n = _readinto(r, writer.space()[: sizer.size])
+        if not n:
+            return
+        sizer.observe(n, time.perf_counter() - began)
+        governor.throttle(n)
+        yield writer.commit(n)
+
+
+@contextmanager
+def governed_get(session: Any, url: str, **kwargs: Any) -> Iterator[Any]:
+    """
+    ``session.get(url, stream=True, **kwargs)`` under the per-host connection cap.
+
+    A connection slot for the host is held until the block exits. The
+    outcome is reported to the governor: 429 / 503 answers and reset
+    connections shrink the host's connection window, other responses let
+    it grow again.
+    """
+    governor = get_governor()
+    with governor.connection(url):
+        try:
+            r = session.get(url, stream=True, **kwargs)
+        except requests.ConnectionError:
+            governor.record_backoff(url)
+            raise
+        with r:
+            if r.status_code in BACKOFF_STATUS:
+                governor.record_backoff(
+                    url, retry_after_seconds(r.headers.get("Retry-After"))
+                )
+            elif r.status_code < 400:
+                governor.record_success(url)
+            try:
+                yield r
+            except (
+                requests.exceptions.ChunkedEncodingError,
+                requests.ConnectionError,
+            ):
+                governor.record_backoff(url)
+                raise
+
+
+def _percent(downloaded: int, total_bytes: int) -> int | None:
+    if total_bytes > 0:
+        return int(downloaded * 100 / max(1, total_bytes))
+    return None
+
+
+def progress_event(filename: str, downloaded: int, total_bytes: int) -> dict:
+    return {
+        "type": "download_progress",
+        "downloaded_bytes": downloaded,
+        "total_bytes": total_bytes,
+        "percent": _percent(downloaded, total_bytes),
+        "filename": filename,
+    }
+
+
+def stream_resume_state(file_path: str, url: str) -> tuple[int, dict]:
+    """
+    Like :func:`resume_state`, for a download over a single stream.
+
+    Partial data left by a segmented download has holes, so it is discarded.
+    """
+    offset, state = resume_state(file_path, url)
+    if state.get("segments"):
+        clear_partial(file_path)
+        return 0, {}
+    return offset, state
+
+
+def begin_transfer(
+    file_path: str,
+    url: str,
+    offset: int,
+    status: int,
+    headers: Any,
+    hasher: StreamHasher,
+) -> tuple[int, int, dict]:
+    """
+    Interpret the (successful) response to a possibly ranged GET.
+
+    A 206 must continue exactly at ``offset``; the bytes already on disk are
+    then fed to ``hasher``. Any other status is a full response, either a
+    fresh download or the file changed on the server so the partial data is
+    stale. Writes the sidecar and returns ``(offset, total_bytes, state)``.
+    """
+    filename = os.path.basename(file_path)
+    if status == 206:
+        content_range = parse_content_range(headers.get("Content-Range"))
+        if content_range is None or content_range[0] != offset:
+            clear_partial(file_path)
+            raise OSError(f"Server returned an unexpected range for {filename}")
+        total_bytes = content_range[2] or (offset + content_length(headers))
+        hasher.update_from_file(file_path + PART_SUFFIX, 0, offset)
+    else:
+        offset = 0
+        total_bytes = content_length(headers)
+
+    state = {
+        "url": url,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "total_bytes": total_bytes,
+        "offset": offset,
+    }
+    write_sidecar(file_path, state)
+    return offset, total_bytes, state
+
+
+def download_stream(
+    session: Any,
+    url: str,
+    file_path: str,
+    timeout: int,
+    emit: Callable[[dict], None],
+    hasher: StreamHasher,
+    chunk_size: int | None = None,
+) -> tuple[int, int]:
+    """
+    Download ``url`` over one streamed request into ``<file_path>.part``.
+
+    Continues a previous partial download when the sidecar allows it. Every
+    chunk is passed to ``hasher`` as it is written; when resuming, the bytes
+    already on disk are hashed first. Emits ``download_start`` and
+    ``download_progress`` events and returns ``(downloaded_bytes,
+    total_bytes)``; ``total_bytes`` is 0 when the server did not announce a
+    size. ``chunk_size`` fixes the read size; by default it adapts to the
+    measured throughput (see :class:`AdaptiveChunkSize`).
+    """
+    filename = os.path.basename(file_path)
+    part_path = file_path + PART_SUFFIX
+
+    offset, state = stream_resume_state(file_path, url)
+    total_bytes = int(state.get("total_bytes") or 0)
+    if offset and total_bytes and offset == total_bytes:
+        hasher.update_from_file(part_path, 0, offset)
+        return offset, total_bytes
+
+    with governed_get(
+        session, url, timeout=timeout, headers=range_headers(offset, state)
+    ) as r:
+        if r.status_code == 416:
+            # The partial file no longer matches the remote file.
+            clear_partial(file_path)
+        r.raise_for_status()
+
+        offset, total_bytes, state = begin_transfer(
+            file_path, url, offset, r.status_code, r.headers, hasher
+        )
+        # Fails here, before the body is read, when the disk is full.
+        fd = open_part_file(file_path, offset, total_bytes)
+        emit(
+            {
+                "type": "download_start",
+                "url": url,
+                "filename": filename,
+                "total_bytes": total_bytes,
+                "resumed_from": offset,
+            }
+        )
+
+        writer = BlockWriter(positional_writer(fd), offset)
+        try:
+            for data in read_response_into(r, writer, chunk_size):
+                hasher.update(data)
+                emit(progress_event(filename, writer.end, total_bytes))
+        finally:
+            downloaded = close_part_file(file_path, fd, writer, state)
+
+    return downloaded, total_bytes
+
+
+def probe_url(session: Any, url: str, timeout: int) -> dict:
+    """
+    Send a HEAD request and report size, validators and range support.
+
+    Returns a dict with ``total_bytes``, ``accept_ranges``, ``etag`` and
+    ``last_modified``. Any failure is reported as "no range support" so the
+    caller can fall back to a single stream.
+    """
+    try:
+        r = session.head(url, timeout=timeout, allow_redirects=True)
+        r.raise_for_status()
+    except Exception:  # pragma: no cover
+        return {"total_bytes": 0, "accept_ranges": False}
+    return {
+        "total_bytes": content_length(r.headers),
+        "accept_ranges": "bytes" in (r.headers.get("Accept-Ranges") or "").lower(),
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+    }
+
+
+def plan_segments(total_bytes: int, segments: int) -> list[list[int]]:
+    """
+    Split ``total_bytes`` into at most ``segments`` contiguous ranges.
+
+    Each range is a mutable ``[start, end, written]`` list (``end`` inclusive)
+    so that workers can record their progress in place and the list can be
+    stored in the resume sidecar as is.
+    """
+    segments = max(1, min(segments, total_bytes // MIN_SEGMENT_BYTES or 1))
+    step = -(-total_bytes // segments)
+    return [
+        [start, min(start + step, total_bytes) - 1, 0]
+        for start in range(0, total_bytes, step)
+    ]
+
+
+def positional_writer(fd: int) -> Callable[[bytes, int], None]:
+    """Return ``write(data, offset)`` using ``os.pwrite`` where available."""
+    if hasattr(os, "pwrite"):
+
+        def write(data: bytes, offset: int) -> None:
+            view = memoryview(data)
+            while view:
+                n = os.pwrite(fd, view, offset)
+                view = view[n:]
+                offset += n
+
+        return write
+
+    lock = threading.Lock()  # pragma: no cover
+
+    def write(data: bytes, offset: int) -> None:  # pragma: no cover
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view) :]
+
+    return write  # pragma: no cover
+
+
+def download_segmented(
+    session: Any,
+    url: str,
+    file_path: str,
+    probe: dict,
+    segments: int,
+    timeout: int,
+    emit: Callable[[dict], None],
+    hasher: StreamHasher,
+    chunk_size: int | None = None,
+    poll_interval: float = 0.2,
+) -> tuple[int, int]:
+    """
+    Download ``url`` as ``segments`` concurrent byte ranges.
+
+    ``probe`` is the result of :func:`probe_url`. The ``.part`` file is sized
+    to the full length first and every range is requested on its own thread
+    and written at its offset with ``pwrite``, so segments can arrive in any
+    order. Segment progress is kept in the sidecar so an interrupted run
+    resumes each segment where it stopped.
+
+    Events are only emitted from the calling thread (aggregate bytes across
+    all segments, polled every ``poll_interval`` seconds), which keeps UI
+    callbacks off the worker threads. The calling thread also feeds
+    ``hasher`` with the contiguous prefix of the file as soon as the
+    segments have filled it, so the checksum is ready when the last segment
+    lands. Returns ``(downloaded, total_bytes)``.
+    """
+    filename = os.path.basename(file_path)
+    part_path = file_path + PART_SUFFIX
+    total_bytes = probe["total_bytes"]
+
+    offset, state = resume_state(file_path, url)
+    same_file = (
+        state.get("segments")
+        and state.get("total_bytes") == total_bytes
+        and state.get("etag") == probe.get("etag")
+        and state.get("last_modified") == probe.get("last_modified")
+    )
+    if not same_file:
+        clear_partial(file_path)
+        offset = 0
+        state = {
+            "url": url,
+            "etag": probe.get("etag"),
+            "last_modified": probe.get("last_modified"),
+            "total_bytes": total_bytes,
+            "segments": plan_segments(total_bytes, segments),
+        }
+        # Reserves the space (or fails if the disk is full) before any request.
+        os.close(open_part_file(file_path, 0, total_bytes))
+    write_sidecar(file_path, state)
+
+    emit(
+        {
+            "type": "download_start",
+            "url": url,
+            "filename": filename,
+            "total_bytes": total_bytes,
+            "resumed_from": offset,
+            "segments": len(state["segments"]),
+        }
+    )
+
+    validator = range_headers(1, state).get("If-Range")
+    abort = threading.Event()
+
+    def fetch(seg: list[int]) -> None:
+        start, end, _ = seg
+        pos = start + seg[2]
+        if pos > end:
+            return
+        headers = {"Range": f"bytes={pos}-{end}"}
+        if validator:
+            headers["If-Range"] = validator
+        with governed_get(session, url, timeout=timeout, headers=headers) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise OSError(f"Server ignored the byte range request for {filename}")
+            writer = BlockWriter(write_at, pos, SEGMENT_BLOCK_BYTES)
+            try:
+                for _ in read_response_into(r, writer, chunk_size):
+                    if abort.is_set():
+                        return
+                    # Only count what is on disk: the hash reads it back.
+                    seg[2] = writer.position - start
+            finally:
+                writer.flush()
+                seg[2] = writer.position - start
+        if writer.position != end + 1:
+            raise OSError(
+                f"Segment {start}-{end} of {filename} ended at byte {writer.position}"
+            )
+
+    def written() -> int:
+        return sum(seg[2] for seg in state["segments"])
+
+    def contiguous() -> int:
+        # End of the data written without gaps from the start of the file.
+        for start, end, done in state["segments"]:
+            if start + done <= end:
+                return start + done
+        return total_bytes
+
+    def hash_ready() -> None:
+        frontier = contiguous()
+        if frontier > hasher.size:
+            hasher.update_from_file(part_path, hasher.size, frontier)
+
+    fd = os.open(part_path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+    # Keeps the full length where the file system could not preallocate.
+    os.ftruncate(fd, total_bytes)
+    write_at = positional_writer(fd)
+    try:
+        with ThreadPoolExecutor(max_workers=len(state["segments"])) as pool:
+            pending = {pool.submit(fetch, seg) for seg in state["segments"]}
+            reported = -1
+            while pending:
+                done, pending = wait(
+                    pending, timeout=poll_interval, return_when=FIRST_EXCEPTION
+                )
+                errors = [f.exception() for f in done if f.exception()]
+                if errors:
+                    abort.set()
+                    raise errors[0]
+                hash_ready()
+                current = written()
+                if current != reported:
+                    reported = current
+                    emit(progress_event(filename, current, total_bytes))
+    finally:
+        abort.set()
+        os.close(fd)
+        write_sidecar(file_path, state)
+
+    hash_ready()
+    return written(), total_bytes
+
+
+def pooled_session(pool_size: int) -> requests.Session:
+    """
+    Return a ``requests.Session`` whose connection pool holds ``pool_size``
+    keep-alive connections per host, so concurrent downloads reuse sockets
+    instead of opening a new connection for every request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
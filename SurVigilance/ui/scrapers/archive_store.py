@@ -0,0 +1,290 @@
+"""
+Content-addressed store of downloaded archives shared between data folders.
+
+Every Streamlit session chooses its own data folder, so several users of one
+SurVigilance server would otherwise each download and keep a copy of the
+same quarterly zip. When a shared store is configured, every archive that is
+downloaded is also kept there once, under its SHA-256::
+
+    <store>/sha256/3f/3fa9...c1.zip
+    <store>/download_manifest.json      (source URL -> sha256, size, ...)
+
+``download_file`` and ``download_vaers_zip_sb`` look the URL up in the store
+before going to the network. A stored archive is placed in the requested
+data folder as a hardlink (or, across file systems, a reflink where the file
+system supports it, else a copy), so each archive is fetched and stored once
+per machine. Blobs are made read-only, because a hardlinked copy in a data
+folder shares its content with the store.
+"""
+
+import os
+import shutil
+import stat
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from .download_manifest import DownloadManifest, file_sha256
+
+STORE_ENV_VAR = "SURVIGILANCE_ARCHIVE_STORE"
+
+# ioctl that makes ``dst`` share the extents of ``src`` (Linux: btrfs, XFS).
+_FICLONE = 0x40049409
+
+
+def _reflink(src: str, dst: str) -> None:
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover
+        raise OSError("reflinks are not supported on this platform") from None
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+
+
+def link_file(src: str, dst: str) -> str:
+    """
+    Make ``dst`` a copy of ``src`` that shares its storage where possible.
+
+    Tries a hardlink, then a reflink, then falls back to copying. ``dst`` is
+    replaced atomically. Returns the method used: "hardlink", "reflink",
+    "copy" or "same" when ``dst`` already is ``src``.
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return "same"
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.link"
+    try:
+        try:
+            os.link(src, tmp)
+            method = "hardlink"
+        except OSError:
+            try:
+                _reflink(src, tmp)
+                method = "reflink"
+            except OSError:
+                shutil.copyfile(src, tmp)
+                method = "copy"
+        os.replace(tmp, dst)
+    finally:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+    return method
+
+
+class ArchiveStore:
+    """
+    Archives stored once by SHA-256 and indexed by the URL they came from.
+
+    Parameters
+    -----------
+    root: str
+        Directory of the store, e.g. on a disk shared by all users of the
+        machine.
+
+    Examples
+    ---------
+        >>> from SurVigilance.ui.scrapers import ArchiveStore
+        >>> store = ArchiveStore("/srv/survigilance/archives")
+        >>> store.materialize(url, "data/faers/faers_ascii_2024q1.zip")
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.index = DownloadManifest(self.root)
+
+    def blob_path(self, sha256: str, suffix: str = "") -> str:
+        """Return where the blob with digest ``sha256`` is kept."""
+        return os.path.join(self.root, "sha256", sha256[:2], sha256 + suffix)
+
+    def lookup(self, key: str) -> dict | None:
+        """
+        Return the index entry for ``key`` (usually a URL) with its blob ``path``.
+
+        Returns None when the key is unknown or its blob is missing or has the
+        wrong size; such a stale entry is dropped.
+        """
+        entry = self.index.get(key)
+        if not entry or not entry.get("sha256"):
+            return None
+        path = self.blob_path(entry["sha256"], entry.get("suffix", ""))
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = -1
+        if size != entry.get("size"):
+            self.index.remove(key)
+            return None
+        return {**entry, "path": path}
+
+    def add(self, path: str, key: str, sha256: str | None = None, **fields: Any) -> str:
+        """
+        Put the file at ``path`` in the store under ``key`` and return its blob.
+
+        If the store has no blob with this content yet, ``path`` is linked
+        into it. If it already has one, ``path`` is replaced by a link to the
+        stored blob, so the two copies share their storage. Extra ``fields``
+        (e.g. ``etag``, ``last_modified``) are kept in the index.
+        """
+        sha256 = sha256 or file_sha256(path)
+        suffix = os.path.splitext(path)[1].lower()
+        blob = self.blob_path(sha256, suffix)
+        if os.path.isfile(blob):
+            link_file(blob, path)
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            link_file(path, blob)
+            os.chmod(blob, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        self.index.record(
+            key,
+            sha256=sha256,
+            size=os.path.getsize(blob),
+            suffix=suffix,
+            **fields,
+        )
+        return blob
+
+    def materialize(self, key: str, dest: str) -> dict | None:
+        """
+        Place the archive stored under ``key`` at ``dest``.
+
+        Returns the index entry (with ``path`` and the ``method`` used, see
+        :func:`link_file`), or None when the store does not hold ``key``.
+        """
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        entry["method"] = link_file(entry["path"], dest)
+        return entry
+
+
+_STORE: ArchiveStore | None = (
+    ArchiveStore(os.environ[STORE_ENV_VAR]) if os.environ.get(STORE_ENV_VAR) else None
+)
+
+
+def get_archive_store() -> ArchiveStore | None:
+    """Return the shared store used by the downloaders, or None if disabled."""
+    return _STORE
+
+
+def configure_archive_store(root: str | None) -> ArchiveStore | None:
+    """
+    Set the directory of the shared archive store used by all downloads.
+
+    By default the store is taken from the ``SURVIGILANCE_ARCHIVE_STORE``
+    environment variable and is disabled when it is not set.
+
+    Parameters
+    -----------
+    root: str or None
+        Directory of the store. None or an empty string disables it.
+
+    Returns
+    --------
+    The :class:`ArchiveStore` now in use, or None.
+
+    Examples
+    ---------
+        >>> from SurVigilance.ui.scrapers import configure_archive_store
+        >>> configure_archive_store("~/.cache/survigilance/archives")
+    """
+    global _STORE
+    if not root:
+        _STORE = None
+    else:
+        root = os.path.abspath(os.path.expanduser(root))
+        if _STORE is None or _STORE.root != root:
+            _STORE = ArchiveStore(root)
+    return _STORE
+
+
+def lookup_in_store(
+    store: ArchiveStore | None, key: str, emit: Callable[[dict], None]
+) -> dict | None:
+    """
+    Return the store's index entry for ``key``, or None when it has no copy.
+
+    Errors of the store are reported and treated as a miss.
+    """
+    if store is None:
+        return None
+    try:
+        return store.lookup(key)
+    except OSError as e:
+        emit({"type": "log", "message": f"Shared archive store unavailable: {e}\n"})
+        return None
+
+
+def fetch_from_store(
+    store: ArchiveStore | None,
+    key: str,
+    file_path: str,
+    emit: Callable[[dict], None],
+    is_current: Callable[[dict], bool] | None = None,
+) -> dict | None:
+    """
+    Place the stored copy of ``key`` at ``file_path``.
+
+    ``is_current``, when given, is called with the store's index entry (its
+    ``size``, ``etag`` and ``last_modified``) and decides whether the copy
+    still matches the source, e.g. with a conditional HEAD request; a copy
+    that does not is left in the store and treated as a miss.
+
+    Emits a log event and returns the store's index entry, or returns None
+    when there is no usable copy. Errors of the store are reported and
+    treated as a miss, so the caller downloads the file instead.
+    """
+    name = os.path.basename(file_path)
+    entry = lookup_in_store(store, key, emit)
+    if entry is None:
+        return None
+    if is_current is not None and not is_current(entry):
+        emit(
+            {
+                "type": "log",
+                "message": f"{name} in the shared archive store is out of date.\n",
+            }
+        )
+        return None
+    try:
+        entry = store.materialize(key, file_path)
+    except OSError as e:
+        emit({"type": "log", "message": f"Shared archive store unavailable: {e}\n"})
+        return None
+    if entry is not None:
+        emit(
+            {
+                "type": "log",
+                "message": (
+                    f"{name} found in the shared archive store ({entry['method']}).\n"
+                ),
+            }
+        )
+    return entry
+
+
+def share_download(
+    store: ArchiveStore | None,
+    key: str,
+    file_path: str,
+    emit: Callable[[dict], None],
+    **fields: Any,
+) -> None:
+    """
+    Add a freshly downloaded ``file_path`` to the store, if one is configured.
+
+    A store that cannot be written (permissions, full disk) only produces a
+    log event; the download itself has succeeded.
+    """
+    if store is None:
+        return
+    try:
+        store.add(file_path, key, **fields)
+    except OSError as e:
+        emit(
+            {
+                "type": "log",
+                "message": f"Could not add {os.path.basename(file_path)} "
+                f"to the shared archive store: {e}\n",
+            }
+        )
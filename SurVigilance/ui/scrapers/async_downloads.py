@@ -0,0 +1,586 @@
+"""
+Asyncio versions of :func:`download_file` and :func:`download_files`.
+
+The coroutines use ``aiohttp`` so that many downloads and HEAD requests can
+share one event loop instead of needing a thread each. They write the same
+``.part`` files and sidecars, record the same manifest entries and emit the
+same events as the blocking functions, so a transfer started by one can be
+resumed by the other.
+"""
+
+import asyncio
+import os
+import time
+from collections.abc import Callable, Iterable
+from urllib.parse import urlparse
+
+import aiohttp
+
+from ._downloads import (
+    PART_SUFFIX,
+    RETRY_DELAY,
+    AdaptiveChunkSize,
+    BlockWriter,
+    StreamHasher,
+    begin_transfer,
+    clear_partial,
+    close_part_file,
+    is_disk_full,
+    open_part_file,
+    positional_writer,
+    progress_event,
+    range_headers,
+    read_sidecar,
+    stream_resume_state,
+    verify_download,
+)
+from .archive_store import (
+    ArchiveStore,
+    fetch_from_store,
+    get_archive_store,
+    lookup_in_store,
+    share_download,
+)
+from .download_governor import BACKOFF_STATUS, get_governor, retry_after_seconds
+from .download_manifest import DownloadManifest, head_matches, validator_headers
+from .download_progress import ProgressPolicy
+from .scrape_faers import DownloadResults
+
+
+def _client_timeout(timeout: int) -> aiohttp.ClientTimeout:
+    # Like ``requests``, the timeout applies to connecting and to each read,
+    # not to the whole transfer.
+    return aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+
+
+async def _is_current(
+    manifest: DownloadManifest,
+    filename: str,
+    url: str,
+    session: aiohttp.ClientSession,
+    timeout: int,
+) -> bool:
+    headers = manifest.conditional_headers(filename, url)
+    if headers is None:
+        return False
+    try:
+        async with session.head(
+            url,
+            headers=headers,
+            timeout=_client_timeout(timeout),
+            allow_redirects=True,
+        ) as r:
+            status, resp_headers = r.status, r.headers
+    except (TimeoutError, aiohttp.ClientError):
+        return False
+    # Adopting an unrecorded file hashes it, which can take a while.
+    return await asyncio.to_thread(
+        manifest.check_head_response, filename, url, status, resp_headers
+    )
+
+
+async def _off_loop(function: Callable, *args, emit: Callable[[dict], None], **kw):
+    # Run blocking disk work (linking, copying or hashing archives) in a
+    # thread; the events it emits reach ``emit`` back on the event loop.
+    events = []
+    try:
+        return await asyncio.to_thread(function, *args, events.append, **kw)
+    finally:
+        for evt in events:
+            emit(evt)
+
+
+async def _entry_is_current(
+    entry: dict, url: str, session: aiohttp.ClientSession, timeout: int
+) -> bool:
+    # Async counterpart of ``entry_is_current`` for the archive store.
+    try:
+        async with session.head(
+            url,
+            headers=validator_headers(entry),
+            timeout=_client_timeout(timeout),
+            allow_redirects=True,
+        ) as r:
+            return head_matches(entry, r.status, r.headers)
+    except (TimeoutError, aiohttp.ClientError):
+        return False
+
+
+async def _download_stream(
+    session: aiohttp.ClientSession,
+    url: str,
+    file_path: str,
+    timeout: int,
+    emit: Callable[[dict], None],
+    hasher: StreamHasher,
+    chunk_size: int | None = None,
+) -> tuple[int, int]:
+    """
+    Async counterpart of ``download_stream``; returns ``(downloaded, total)``.
+
+    Reads count against the process-wide bandwidth limit; the number of
+    connections is capped by the caller's per-host semaphore instead of the
+    governor's blocking connection slots.
+    """
+    filename = os.path.basename(file_path)
+    part_path = file_path + PART_SUFFIX
+
+    governor = get_governor()
+    offset, state = stream_resume_state(file_path, url)
+    total_bytes = int(state.get("total_bytes") or 0)
+    if offset and total_bytes and offset == total_bytes:
+        await asyncio.to_thread(hasher.update_from_file, part_path, 0, offset)
+        return offset, total_bytes
+
+    async with session.get(
+        url, headers=range_headers(offset, state), timeout=_client_timeout(timeout)
+    ) as r:
+        if r.status in BACKOFF_STATUS:
+            governor.record_backoff(
+                url, retry_after_seconds(r.headers.get("Retry-After"))
+            )
+        elif r.status < 400:
+            governor.record_success(url)
+        if r.status == 416:
+            # The partial file no longer matches the remote file.
+            clear_partial(file_path)
+        r.raise_for_status()
+
+        offset, total_bytes, state = await asyncio.to_thread(
+            begin_transfer, file_path, url, offset, r.status, r.headers, hasher
+        )
+        fd = await asyncio.to_thread(open_part_file, file_path, offset, total_bytes)
+        emit(
+            {
+                "type": "download_start",
+                "url": url,
+                "filename": filename,
+                "total_bytes": total_bytes,
+                "resumed_from": offset,
+            }
+        )
+
+        sizer = AdaptiveChunkSize()
+        writer = BlockWriter(positional_writer(fd), offset)
+        try:
+            while True:
+                began = time.perf_counter()
+                chunk = await r.content.read(chunk_size or sizer.size)
+                if not chunk:
+                    break
+                sizer.observe(len(chunk), time.perf_counter() - began)
+                await governor.athrottle(len(chunk))
+                if writer.filled + len(chunk) >= len(writer.buffer):
+                    # Filling the buffer writes a whole block to disk.
+                    await asyncio.to_thread(writer.write, chunk)
+                else:
+                    writer.write(chunk)
+                hasher.update(chunk)
+                emit(progress_event(filename, writer.end, total_bytes))
+        finally:
+            # Also runs on cancellation, so the next call resumes from here.
+            downloaded = await asyncio.to_thread(
+                close_part_file, file_path, fd, writer, state
+            )
+
+    return downloaded, total_bytes
+
+
+async def adownload_file(
+    url: str,
+    download_dir: str = "data/faers",
+    timeout: int = 600,
+    callback: Callable[[dict], None] | None = None,
+    num_retries: int = 5,
+    session: aiohttp.ClientSession | None = None,
+    skip_unchanged: bool = True,
+    progress_policy: ProgressPolicy | None = None,
+    chunk_size: int | None = None,
+    archive_store: ArchiveStore | None = None,
+    retry_delay: float = RETRY_DELAY,
+) -> str:
+    """
+    Save a file from a direct link without blocking the event loop.
+
+    Behaves like :func:`download_file` with a single stream: the transfer is
+    resumed from ``<filename>.part`` when possible, skipped when the manifest
+    shows the local copy is current, hashed and checked while it is written,
+    and retried up to ``num_retries`` times. Cancelling the task stops the
+    transfer and keeps the partial data so a later call resumes it.
+
+    Parameters
+    -----------
+    url: str
+        Direct URL to the file.
+
+    download_dir: str
+        Directory where the file should be saved.
+
+    timeout: int
+        Max seconds to wait for the connection and for each read (default 600).
+
+    callback: callable, optional
+        Callable to receive UI/status events, called with a dict. The events
+        are the same as for :func:`download_file`.
+
+    num_retries: int
+        Number of retries for data download after which error is thrown (default 5).
+
+    session: aiohttp.ClientSession, optional
+        Session to send the requests through. By default a session is
+        created for this call and closed afterwards.
+
+    skip_unchanged: bool
+        Return the existing file without downloading it again when the server
+        reports it unchanged (default True).
+
+    progress_policy: ProgressPolicy, optional
+        How often ``download_progress`` events reach ``callback``.
+
+    chunk_size: int, optional
+        Fixed number of bytes read per chunk. By default the read size adapts
+        to the measured throughput.
+
+    archive_store: ArchiveStore, optional
+        Shared store to take the file from before going to the network, and
+        to add it to after downloading (see :mod:`.archive_store`). By
+        default the store set with ``configure_archive_store`` is used, if
+        any. With ``skip_unchanged=False`` the store is not consulted.
+
+    retry_delay: float
+        Seconds to wait between attempts (default 20).
+
+    Returns
+    --------
+    Full path to the saved file as a string.
+
+    Examples
+    ---------
+        >>> import asyncio
+        >>> from SurVigilance.ui.scrapers import adownload_file
+        >>> asyncio.run(adownload_file(url, "data/faers"))
+    """
+    if session is None:
+        async with aiohttp.ClientSession() as own:
+            return await adownload_file(
+                url,
+                download_dir,
+                timeout,
+                callback,
+                num_retries,
+                own,
+                skip_unchanged,
+                progress_policy,
+                chunk_size,
+                archive_store,
+                retry_delay,
+            )
+
+    os.makedirs(download_dir, exist_ok=True)
+
+    if callback:
+        callback = (progress_policy or ProgressPolicy()).wrap(callback)
+
+    def _emit(evt: dict) -> None:
+        if callback:
+            try:
+                callback(evt)
+            except Exception:  # pragma: no cover
+                raise  # pragma: no cover
+
+    u = str(url)
+    filename = os.path.basename(urlparse(u).path) or "downloaded_file"
+    file_path = os.path.join(download_dir, filename)
+    part_path = file_path + PART_SUFFIX
+    manifest = DownloadManifest(download_dir)
+
+    store = archive_store or get_archive_store()
+    shared = None
+    stored = (
+        await _off_loop(lookup_in_store, store, u, emit=_emit)
+        if skip_unchanged
+        else None
+    )
+    if stored is not None:
+        # As in download_file, a stored copy is only used while it is current.
+        current = await _entry_is_current(stored, u, session, timeout)
+        shared = await _off_loop(
+            fetch_from_store,
+            store,
+            u,
+            file_path,
+            emit=_emit,
+            is_current=lambda _: current,
+        )
+    if shared is not None:
+        await asyncio.to_thread(
+            manifest.record,
+            filename,
+            url=u,
+            size=shared["size"],
+            etag=shared.get("etag"),
+            last_modified=shared.get("last_modified"),
+            sha256=shared["sha256"],
+        )
+        _emit(
+            {
+                "type": "download_complete",
+                "path": file_path,
+                "filename": filename,
+                "skipped": True,
+                "shared": True,
+                "sha256": shared["sha256"],
+            }
+        )
+        return file_path
+
+    if skip_unchanged and await _is_current(manifest, filename, u, session, timeout):
+        _emit({"type": "log", "message": f"{filename} is already up to date.\n"})
+        entry = manifest.get(filename) or {}
+        await _off_loop(
+            share_download,
+            store,
+            u,
+            file_path,
+            emit=_emit,
+            sha256=entry.get("sha256"),
+            etag=entry.get("etag"),
+            last_modified=entry.get("last_modified"),
+        )
+        _emit(
+            {
+                "type": "download_complete",
+                "path": file_path,
+                "filename": filename,
+                "skipped": True,
+            }
+        )
+        return file_path
+
+    exceptions = []
+    for attempt in range(num_retries):
+        try:
+            if attempt > 0:
+                _emit(
+                    {
+                        "type": "log",
+                        "message": f"Retrying download... ({attempt + 1}/{num_retries})\n",
+                    }
+                )
+
+            hasher = StreamHasher()
+            downloaded, total_bytes = await _download_stream(
+                session, u, file_path, timeout, _emit, hasher, chunk_size
+            )
+            await asyncio.to_thread(
+                verify_download, file_path, downloaded, total_bytes, hasher
+            )
+
+            state = read_sidecar(file_path)
+            os.replace(part_path, file_path)
+            await asyncio.to_thread(
+                manifest.record,
+                filename,
+                url=u,
+                size=os.path.getsize(file_path),
+                etag=state.get("etag"),
+                last_modified=state.get("last_modified"),
+                sha256=hasher.hexdigest(),
+            )
+            clear_partial(file_path)
+            await _off_loop(
+                share_download,
+                store,
+                u,
+                file_path,
+                emit=_emit,
+                sha256=hasher.hexdigest(),
+                etag=state.get("etag"),
+                last_modified=state.get("last_modified"),
+            )
+
+            _emit(
+                {
+                    "type": "download_complete",
+                    "path": file_path,
+                    "filename": filename,
+                    "sha256": hasher.hexdigest(),
+                }
+            )
+            return file_path
+
+        except Exception as e:  # pragma: no cover
+            exceptions.append(e)
+            _emit(
+                {
+                    "type": "error",
+                    "message": f"Download attempt {attempt + 1} failed: {e}",
+                    "url": u,
+                }
+            )
+            if is_disk_full(e):
+                # Fails early: retrying cannot help until space is freed.
+                raise
+            if attempt < num_retries - 1:
+                await asyncio.sleep(retry_delay)
+            continue
+
+    _emit(
+        {
+            "type": "error",
+            "message": (
+                f"All {num_retries} attempt(s) to download {url} failed. "
+                "Please check your internet connection and the URL."
+            ),
+            "url": u,
+        }
+    )
+    raise exceptions[-1]
+
+
+async def adownload_files(
+    urls: Iterable[str],
+    download_dir: str = "data/faers",
+    max_per_host: int = 4,
+    timeout: int = 600,
+    callback: Callable[[dict], None] | None = None,
+    num_retries: int = 5,
+    session: aiohttp.ClientSession | None = None,
+    progress_policy: ProgressPolicy | None = None,
+) -> DownloadResults:
+    """
+    Download several files concurrently on the running event loop.
+
+    Every file is fetched with :func:`adownload_file`. At most
+    ``max_per_host`` transfers run against the same host at a time; files
+    on different hosts do not wait for each other. Cancelling the call
+    cancels all transfers still running, keeping their partial data.
+
+    Parameters
+    -----------
+    urls: iterable of str
+        Direct URLs of the files to download; a URL listed more than once
+        is downloaded once.
+
+    download_dir: str
+        Directory where the files should be saved.
+
+    max_per_host: int
+        Maximum number of simultaneous downloads from one host (default 4).
+
+    timeout: int
+        Max seconds to wait for the connection and for each read (default 600).
+
+    callback: callable, optional
+        Callable to receive UI/status events, called with a dict. Per-file
+        events are forwarded with ``url`` and ``filename`` keys added, a
+        ``batch_progress`` event is sent whenever a file finishes and a
+        ``batch_complete`` event at the end.
+
+    num_retries: int
+        Number of retries per file after which it is recorded as failed
+        (default 5).
+
+    session: aiohttp.ClientSession, optional
+        Session to use instead of creating (and closing) one.
+
+    progress_policy: ProgressPolicy, optional
+        How often per-file ``download_progress`` events are forwarded.
+
+    Returns
+    --------
+    A :class:`DownloadResults` listing the files that succeeded and failed.
+    """
+
+    def _emit(evt: dict) -> None:
+        if callback:
+            try:
+                callback(evt)
+            except Exception:  # pragma: no cover
+                raise  # pragma: no cover
+
+    # Progress is kept by URL, so each URL is downloaded once.
+    urls = list(dict.fromkeys(str(u) for u in urls))
+    os.makedirs(download_dir, exist_ok=True)
+
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=max(1, max_per_host))
+        )
+
+    semaphores: dict[str, asyncio.Semaphore] = {}
+    fresh_bytes = dict.fromkeys(urls, 0)
+    results = DownloadResults()
+    began = time.perf_counter()
+
+    async def _run(u: str) -> None:
+        host = urlparse(u).netloc
+        sem = semaphores.setdefault(host, asyncio.Semaphore(max(1, max_per_host)))
+        resumed_from = 0
+
+        def _track(evt: dict) -> None:
+            nonlocal resumed_from
+            if evt.get("type") == "download_start":
+                resumed_from = int(evt.get("resumed_from") or 0)
+            elif evt.get("type") == "download_progress":
+                fresh_bytes[u] = evt.get("downloaded_bytes", 0) - resumed_from
+            evt.setdefault("url", u)
+            evt.setdefault("filename", os.path.basename(urlparse(u).path))
+            _emit(evt)
+
+        async with sem:
+            try:
+                path = await adownload_file(
+                    u,
+                    download_dir=download_dir,
+                    timeout=timeout,
+                    callback=_track,
+                    num_retries=num_retries,
+                    session=session,
+                    progress_policy=progress_policy,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # pragma: no cover
+                results.failures.append((u, str(e)))
+            else:
+                results.successes.append(path)
+        _emit(
+            {
+                "type": "batch_progress",
+                "completed_files": len(results.successes),
+                "failed_files": len(results.failures),
+                "total_files": len(urls),
+                "downloaded_bytes": sum(fresh_bytes.values()),
+                "percent": int(
+                    (len(results.successes) + len(results.failures))
+                    * 100
+                    / max(1, len(urls))
+                ),
+            }
+        )
+
+    tasks = [asyncio.ensure_future(_run(u)) for u in urls]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Let cancelled transfers save their resume state before returning.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own_session:
+            await session.close()
+
+    results.downloaded_bytes = sum(fresh_bytes.values())
+    results.elapsed_seconds = time.perf_counter() - began
+    _emit(
+        {
+            "type": "batch_complete",
+            "successes": len(results.successes),
+            "failures": len(results.failures),
+            "downloaded_bytes": results.downloaded_bytes,
+            "elapsed_seconds": results.elapsed_seconds,
+        }
+    )
+    return results
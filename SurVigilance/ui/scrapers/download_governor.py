@@ -0,0 +1,278 @@
+"""
+Process-wide limits on download bandwidth and connections per host.
+
+All transfers made by ``download_file``, ``download_files`` and the VAERS
+downloader go through one :class:`DownloadGovernor`:
+
+* a token bucket caps the combined bandwidth of every download in the
+  process, so several users of a shared deployment cannot saturate the
+  uplink between them;
+* a per-host window caps the number of simultaneous connections to each
+  server.
+
+Both follow an AIMD rule (additive increase, multiplicative decrease): when
+a server answers 429 / 503 or resets a connection, its connection window and
+the bandwidth rate are halved; every successful response grows them back by
+one connection and a tenth of the configured rate, up to the configured
+maximum. Downloads therefore settle at the highest throughput the server
+tolerates.
+
+The limits are changed with :func:`configure_download_limits` (the Streamlit
+app exposes them under "Download limits").
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+# Status codes that mean "slow down" rather than "this request is wrong".
+BACKOFF_STATUS = frozenset({429, 503})
+
+# Longest pause honoured from a Retry-After header, in seconds.
+MAX_RETRY_AFTER = 300
+
+
+@dataclass
+class DownloadLimits:
+    """
+    Limits applied by the process-wide :class:`DownloadGovernor`.
+
+    Parameters
+    -----------
+    max_bytes_per_sec: float, optional
+        Combined bandwidth of all downloads in bytes per second. None (the
+        default) means unlimited.
+
+    max_connections_per_host: int
+        Maximum number of simultaneous transfers from one host (default 8).
+        Several files or segments from the same server share this cap.
+    """
+
+    max_bytes_per_sec: float | None = None
+    max_connections_per_host: int = 8
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket holding up to ``burst`` bytes, refilled at ``rate``.
+
+    :meth:`reserve` takes tokens immediately, going into debt if needed, and
+    returns how long the caller has to wait for the debt to be repaid; this
+    keeps the waiting outside the lock and works for both threads and
+    coroutines. A ``rate`` of None disables the limit.
+
+    ``rate`` is the configured ceiling; :meth:`decrease` and :meth:`increase`
+    move the effective rate between an eighth of it and the ceiling.
+    """
+
+    def __init__(self, rate: float | None, burst: float | None = None) -> None:
+        self._lock = threading.Lock()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate: float | None, burst: float | None = None) -> None:
+        with self._lock:
+            self.ceiling = rate if rate and rate > 0 else None
+            self.rate = self.ceiling
+            # Half a second worth of data by default, but at least one large read.
+            self.burst = burst or max((self.rate or 0) / 2, 4 * 1024 * 1024)
+            self._tokens = self.burst
+            self._updated = time.monotonic()
+
+    def decrease(self) -> None:
+        with self._lock:
+            if self.ceiling is not None:
+                self.rate = max(self.ceiling / 8, self.rate / 2)
+
+    def increase(self) -> None:
+        with self._lock:
+            if self.ceiling is not None:
+                self.rate = min(self.ceiling, self.rate + self.ceiling / 10)
+
+    def reserve(self, nbytes: int) -> float:
+        """Take ``nbytes`` tokens and return the seconds to wait before using them."""
+        with self._lock:
+            if self.rate is None:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= nbytes
+            return max(0.0, -self._tokens / self.rate)
+
+
+class _HostWindow:
+    def __init__(self, maximum: int) -> None:
+        self.maximum = maximum
+        self.limit = float(maximum)
+        self.active = 0
+        self.blocked_until = 0.0
+
+
+class DownloadGovernor:
+    """
+    Bandwidth and per-host connection limits shared by all downloads.
+
+    Use :func:`get_governor` to obtain the process-wide instance.
+
+    Parameters
+    -----------
+    limits: DownloadLimits, optional
+        Initial limits (unlimited bandwidth, 8 connections per host).
+    """
+
+    def __init__(self, limits: DownloadLimits | None = None) -> None:
+        self._cond = threading.Condition()
+        self._hosts: dict[str, _HostWindow] = {}
+        self.limits = limits or DownloadLimits()
+        self.bucket = TokenBucket(self.limits.max_bytes_per_sec)
+
+    def configure(self, limits: DownloadLimits) -> None:
+        """Apply new limits; transfers already running pick them up."""
+        with self._cond:
+            if limits == self.limits:
+                return
+            self.limits = limits
+            for window in self._hosts.values():
+                window.maximum = max(1, limits.max_connections_per_host)
+                window.limit = min(window.limit, window.maximum)
+            self._cond.notify_all()
+        self.bucket.set_rate(limits.max_bytes_per_sec)
+
+    def _window(self, host: str) -> _HostWindow:
+        window = self._hosts.get(host)
+        if window is None:
+            window = self._hosts[host] = _HostWindow(
+                max(1, self.limits.max_connections_per_host)
+            )
+        return window
+
+    def host_limit(self, url: str) -> float:
+        """Current connection window for the host of ``url``."""
+        with self._cond:
+            return self._window(urlparse(url).netloc).limit
+
+    # Connections
+
+    def acquire(self, url: str) -> None:
+        """Block until a connection to the host of ``url`` may be opened."""
+        host = urlparse(url).netloc
+        with self._cond:
+            window = self._window(host)
+            while True:
+                wait = window.blocked_until - time.monotonic()
+                if wait <= 0 and window.active < int(window.limit):
+                    window.active += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, url: str) -> None:
+        with self._cond:
+            window = self._window(urlparse(url).netloc)
+            window.active = max(0, window.active - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def connection(self, url: str) -> Iterator[None]:
+        """Hold one of the host's connection slots for the duration of the block."""
+        self.acquire(url)
+        try:
+            yield
+        finally:
+            self.release(url)
+
+    # AIMD feedback
+
+    def record_success(self, url: str) -> None:
+        """Additive increase: allow one more connection and a little more bandwidth."""
+        with self._cond:
+            window = self._window(urlparse(url).netloc)
+            window.limit = min(float(window.maximum), window.limit + 1)
+            self._cond.notify_all()
+        self.bucket.increase()
+
+    def record_backoff(self, url: str, retry_after: float | None = None) -> None:
+        """
+        Multiplicative decrease after a 429 / 503 or a reset connection.
+
+        Halves the host's connection window (never below one) and the
+        bandwidth rate and, when the server sent ``Retry-After``, holds new
+        connections to the host back until then.
+        """
+        with self._cond:
+            window = self._window(urlparse(url).netloc)
+            window.limit = max(1.0, window.limit / 2)
+            if retry_after:
+                window.blocked_until = max(
+                    window.blocked_until,
+                    time.monotonic() + min(retry_after, MAX_RETRY_AFTER),
+                )
+        self.bucket.decrease()
+
+    # Bandwidth
+
+    def throttle(self, nbytes: int) -> None:
+        """Account for ``nbytes`` received, sleeping if over the bandwidth cap."""
+        delay = self.bucket.reserve(nbytes)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def athrottle(self, nbytes: int) -> None:
+        """Coroutine version of :meth:`throttle`."""
+        delay = self.bucket.reserve(nbytes)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """Parse a ``Retry-After`` header given in seconds (dates are ignored)."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+_GOVERNOR = DownloadGovernor()
+
+
+def get_governor() -> DownloadGovernor:
+    """Return the process-wide :class:`DownloadGovernor`."""
+    return _GOVERNOR
+
+
+def configure_download_limits(
+    max_bytes_per_sec: float | None = None,
+    max_connections_per_host: int = 8,
+) -> DownloadLimits:
+    """
+    Set the bandwidth and per-host connection limits for all downloads.
+
+    Parameters
+    -----------
+    max_bytes_per_sec: float, optional
+        Combined bandwidth of all downloads in the process, in bytes per
+        second. None or 0 removes the limit.
+
+    max_connections_per_host: int
+        Maximum number of simultaneous transfers from one host (default 8).
+
+    Returns
+    --------
+    The :class:`DownloadLimits` now in effect.
+
+    Examples
+    ---------
+        >>> from SurVigilance.ui.scrapers import configure_download_limits
+        >>> configure_download_limits(max_bytes_per_sec=20e6, max_connections_per_host=4)
+    """
+    limits = DownloadLimits(
+        max_bytes_per_sec=max_bytes_per_sec or None,
+        max_connections_per_host=max(1, int(max_connections_per_host)),
+    )
+    _GOVERNOR.configure(limits)
+    return limits
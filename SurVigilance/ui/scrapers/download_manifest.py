@@ -0,0 +1,220 @@
+"""
+Manifest of the archives saved in a download directory.
+
+Every file written by ``download_file`` is recorded in
+``download_manifest.json`` in its download directory, together with its URL,
+size, SHA-256 and the ETag / Last-Modified validators sent by the server. A
+later download of the same URL first asks the server whether the file has
+changed (a conditional HEAD request) and skips the transfer if the local copy
+is still current.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any
+
+MANIFEST_FILENAME = "download_manifest.json"
+
+# Manifests are updated from several download threads at once.
+_LOCKS: dict[str, threading.Lock] = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 digest of the file at ``path``."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def validator_headers(entry: dict) -> dict:
+    """Return ``If-None-Match`` / ``If-Modified-Since`` headers for ``entry``."""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def _content_length(headers: Any) -> int:
+    try:
+        return int(headers.get("Content-Length") or -1)
+    except ValueError:  # pragma: no cover
+        return -1
+
+
+def head_matches(entry: dict, status: int, headers: Any) -> bool:
+    """
+    Decide from the answer to a conditional HEAD whether ``entry`` is current.
+
+    ``entry`` holds the ``size``, ``etag`` and ``last_modified`` recorded for
+    a URL. It is current when the server answered 304, or when the returned
+    ETag (or, without one, the Last-Modified date) and Content-Length match.
+    """
+    if status == 304:
+        return True
+    if status != 200:
+        return False
+    if _content_length(headers) != entry.get("size"):
+        return False
+    etag = headers.get("ETag")
+    if entry.get("etag") or etag:
+        return etag == entry.get("etag")
+    return headers.get("Last-Modified") == entry.get("last_modified")
+
+
+def entry_is_current(entry: dict, url: str, session: Any, timeout: int = 60) -> bool:
+    """
+    Ask ``url`` with a conditional HEAD whether ``entry`` still describes it.
+
+    Used for copies recorded elsewhere than in a manifest, such as those of
+    the shared archive store. Any network error counts as "not current".
+    """
+    try:
+        r = session.head(
+            url, headers=validator_headers(entry), timeout=timeout, allow_redirects=True
+        )
+    except Exception:  # pragma: no cover
+        return False
+    return head_matches(entry, r.status_code, r.headers)
+
+
+class DownloadManifest:
+    """
+    JSON manifest of the files in one download directory, keyed by filename.
+
+    Parameters
+    -----------
+    download_dir: str
+        Directory holding the downloaded files and the manifest.
+
+    Examples
+    ---------
+        >>> from SurVigilance.ui.scrapers import DownloadManifest
+        >>> DownloadManifest("data/faers").get("faers_ascii_2024q1.zip")
+    """
+
+    def __init__(self, download_dir: str) -> None:
+        self.download_dir = download_dir
+        self.path = os.path.join(download_dir, MANIFEST_FILENAME)
+
+    def entries(self) -> dict[str, dict]:
+        """Return all manifest entries as ``{filename: entry}``."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data.get("files", {}) if isinstance(data, dict) else {}
+
+    def get(self, filename: str) -> dict | None:
+        """Return the entry for ``filename``, or None if it is not recorded."""
+        return self.entries().get(filename)
+
+    def record(self, filename: str, **fields: Any) -> dict:
+        """
+        Add or replace the entry for ``filename`` and save the manifest.
+
+        Typical fields are ``url``, ``size``, ``etag``, ``last_modified`` and
+        ``sha256``; ``recorded_at`` (a Unix timestamp) is added automatically.
+        """
+        entry = {**fields, "recorded_at": time.time()}
+        with _lock_for(self.path):
+            files = self.entries()
+            files[filename] = entry
+            self._save(files)
+        return entry
+
+    def remove(self, filename: str) -> None:
+        """Drop the entry for ``filename`` if there is one."""
+        with _lock_for(self.path):
+            files = self.entries()
+            if files.pop(filename, None) is not None:
+                self._save(files)
+
+    def _save(self, files: dict[str, dict]) -> None:
+        os.makedirs(self.download_dir, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "files": files}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def conditional_headers(self, filename: str, url: str) -> dict | None:
+        """
+        Return the headers for a conditional HEAD request for ``filename``.
+
+        Returns None when the local copy cannot be current without asking
+        the server: it is missing, or its manifest entry is for another URL
+        or another size.
+        """
+        file_path = os.path.join(self.download_dir, filename)
+        if not os.path.isfile(file_path):
+            return None
+        entry = self.get(filename)
+        if entry is None:
+            return {}
+        if entry.get("url") != url or entry.get("size") != os.path.getsize(file_path):
+            return None
+        return validator_headers(entry)
+
+    def check_head_response(
+        self, filename: str, url: str, status: int, headers: Any
+    ) -> bool:
+        """
+        Decide from the answer to the conditional HEAD whether the copy is current.
+
+        It is current when the server answered 304, or when the returned
+        ETag (or, without one, the Last-Modified date) and Content-Length
+        match what was recorded. A file without a manifest entry (e.g. one
+        downloaded by an older version) is adopted, and recorded, when its
+        size equals the remote Content-Length.
+        """
+        file_path = os.path.join(self.download_dir, filename)
+        entry = self.get(filename)
+        size = os.path.getsize(file_path)
+        if entry is not None:
+            return head_matches({**entry, "size": size}, status, headers)
+        if status != 200 or _content_length(headers) != size:
+            return False
+        self.record(
+            filename,
+            url=url,
+            size=size,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            sha256=file_sha256(file_path),
+        )
+        return True
+
+    def is_current(
+        self, filename: str, url: str, session: Any, timeout: int = 60
+    ) -> bool:
+        """
+        Check whether the local copy of ``filename`` matches the remote ``url``.
+
+        Sends a HEAD request with ``If-None-Match`` / ``If-Modified-Since``
+        built from the manifest entry (see :meth:`conditional_headers` and
+        :meth:`check_head_response`). Any network error counts as "not
+        current".
+        """
+        headers = self.conditional_headers(filename, url)
+        if headers is None:
+            return False
+        try:
+            r = session.head(
+                url, headers=headers, timeout=timeout, allow_redirects=True
+            )
+        except Exception:  # pragma: no cover
+            return False
+        return self.check_head_response(filename, url, r.status_code, r.headers)
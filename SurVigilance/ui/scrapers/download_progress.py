@@ -0,0 +1,93 @@
+"""
+Rate limiting of ``download_progress`` events.
+
+A download reads the response in many small chunks. Calling the UI callback
+for each chunk (about 130,000 times for a 1 GB file with 8 KB chunks) makes
+the callback, e.g. a Streamlit progress bar redraw, the bottleneck. A
+:class:`ProgressPolicy` merges progress events so that at most one is sent
+per ``min_interval`` seconds and per ``min_percent_step`` percent.
+"""
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+
+@dataclass
+class ProgressPolicy:
+    """
+    How often ``download_progress`` events are passed on to a callback.
+
+    A progress event is sent once at least ``min_interval`` seconds have
+    passed since the previous one *and* the percentage has grown by at least
+    ``min_percent_step`` (the percent condition is ignored when the total
+    size is unknown). Events in between are merged: only the most recent one
+    is kept, and it is sent before any other event (``download_complete``,
+    ``error``, ...) so the final byte count is always reported. Use
+    ``ProgressPolicy(0, 0)`` to receive every event.
+
+    Parameters
+    -----------
+    min_interval: float
+        Minimum seconds between two progress events (default 0.2).
+
+    min_percent_step: int
+        Minimum growth in percent between two progress events (default 1).
+
+    Examples
+    ---------
+        >>> from SurVigilance.ui.scrapers import ProgressPolicy, download_file
+        >>> download_file(url, callback=cb, progress_policy=ProgressPolicy(0.5, 5))
+    """
+
+    min_interval: float = 0.2
+    min_percent_step: int = 1
+
+    def wrap(self, emit: Callable[[dict], None]) -> Callable[[dict], None]:
+        """Return an event sink that applies this policy in front of ``emit``."""
+        if self.min_interval <= 0 and self.min_percent_step <= 0:
+            return emit
+        return _CoalescingEmitter(self, emit)
+
+
+class _CoalescingEmitter:
+    def __init__(self, policy: ProgressPolicy, emit: Callable[[dict], None]) -> None:
+        self.policy = policy
+        self.emit = emit
+        self._pending: dict | None = None
+        self._last_time = float("-inf")
+        self._last_percent: int | None = None
+
+    def __call__(self, evt: dict) -> None:
+        if evt.get("type") != "download_progress":
+            self.flush()
+            if evt.get("type") == "download_start":
+                self._last_time = float("-inf")
+                self._last_percent = None
+            self.emit(evt)
+            return
+
+        now = time.monotonic()
+        percent = evt.get("percent")
+        total = evt.get("total_bytes") or 0
+        finished = total > 0 and evt.get("downloaded_bytes", 0) >= total
+        due = now - self._last_time >= self.policy.min_interval and (
+            percent is None
+            or self._last_percent is None
+            or percent - self._last_percent >= self.policy.min_percent_step
+        )
+        if due or finished:
+            self._send(evt, now)
+        else:
+            self._pending = evt
+
+    def _send(self, evt: dict, now: float) -> None:
+        self._pending = None
+        self._last_time = now
+        self._last_percent = evt.get("percent")
+        self.emit(evt)
+
+    def flush(self) -> None:
+        """Send the merged progress event that is still waiting, if any."""
+        if self._pending is not None:
+            self._send(self._pending, time.monotonic())
@@ -14,6 +14,8 @@ Where quarter is 1 to 4 for:
     4 -> October - December
 """
 
+import re
+
 QUARTER_LABELS = {
     1: "January - March",
     2: "April - June",
@@ -40,3 +42,20 @@ def faers_ascii_url(year: int, quarter: int) -> str:  # pragma: no cover
         return f"https://fis.fda.gov/content/Exports/faers_ascii_{year}q{quarter}.zip"
     else:
         return f"https://fis.fda.gov/content/Exports/aers_ascii_{year}q{quarter}.zip"
+
+
+def quarter_number(label: str) -> int | None:
+    """
+    Return the quarter (1 to 4) named by a label from the FAERS website.
+
+    Accepts labels such as "Q1", "2024 Q1", "January - March" or
+    "January - March 2024"; returns None when no quarter can be recognised.
+    """
+    text = str(label or "").lower()
+    m = re.search(r"\bq\s*([1-4])\b", text)
+    if m:
+        return int(m.group(1))
+    for quarter, months in QUARTER_MONTHS.items():
+        if months[0].lower() in text or months[0][:3].lower() in text:
+            return quarter
+    return None
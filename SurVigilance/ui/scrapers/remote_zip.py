@@ -0,0 +1,563 @@
+"""
+Download selected members of a remote zip archive with HTTP ``Range`` requests.
+
+Most analyses only need a few tables (e.g. DEMO, DRUG and REAC) of a FAERS
+quarterly ASCII zip. A zip ends with a central directory that lists every
+member with its compressed size and the offset of its local header, so the
+directory can be read with one small request for the end of the file, and
+each wanted member fetched as one byte range. The members are written,
+still compressed, into a smaller zip that ``zipfile`` and
+``SurVigilance.faers.convert_quarter`` read like the full archive.
+"""
+
+import os
+import struct
+import time
+import zipfile
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any, BinaryIO
+from urllib.parse import urlparse
+
+import requests
+
+from ._downloads import (
+    _EOCD,
+    _ZIP64_EOCD,
+    _ZIP64_LOCATOR,
+    PART_SUFFIX,
+    TAIL_BYTES,
+    StreamHasher,
+    central_directory_location,
+    check_zip_tail,
+    governed_get,
+    parse_content_range,
+    progress_event,
+)
+from .download_governor import get_governor
+from .download_manifest import DownloadManifest
+from .download_progress import ProgressPolicy
+
+_CENTRAL_DIR = struct.Struct("<4s4B4HL2L5H2L")
+_ZIP64_EXTRA_ID = 0x0001
+_MAX32 = 0xFFFFFFFF
+
+# Ranges separated by less than this are fetched with one request.
+MAX_GAP_BYTES = 1 << 20
+
+DEFAULT_FAERS_TABLES = ("DEMO", "DRUG", "REAC")
+
+
+@dataclass
+class RemoteMember:
+    """One member of a remote zip, as listed in its central directory."""
+
+    filename: str
+    header_offset: int
+    compress_size: int
+    file_size: int
+    # Offset where the next member (or the central directory) starts, i.e.
+    # the end of this member's local header, data and data descriptor.
+    end: int
+    central: bytes
+
+
+def _zip64_extra_values(central: bytes, name_len: int, extra_len: int) -> list[int]:
+    extra = central[
+        _CENTRAL_DIR.size + name_len : _CENTRAL_DIR.size + name_len + extra_len
+    ]
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, size = struct.unpack_from("<HH", extra, pos)
+        if tag == _ZIP64_EXTRA_ID:
+            return list(struct.unpack_from(f"<{size // 8}Q", extra, pos + 4))
+        pos += 4 + size
+    return []
+
+
+def _zip64_fields(fields: tuple, central: bytes) -> tuple[int, int, int]:
+    """Return the real (file_size, compress_size, header_offset) of an entry."""
+    compress_size, file_size, name_len, extra_len = fields[10:14]
+    header_offset = fields[18]
+    values = iter(_zip64_extra_values(central, name_len, extra_len))
+    # The zip64 extra holds, in this order, only the fields that overflowed.
+    if file_size == _MAX32:
+        file_size = next(values)
+    if compress_size == _MAX32:
+        compress_size = next(values)
+    if header_offset == _MAX32:
+        header_offset = next(values)
+    return file_size, compress_size, header_offset
+
+
+def parse_central_directory(data: bytes, cd_offset: int) -> list[RemoteMember]:
+    """
+    Parse the central directory ``data`` of a zip whose directory starts at ``cd_offset``.
+    """
+    entries = []
+    pos = 0
+    while pos + _CENTRAL_DIR.size <= len(data):
+        fields = _CENTRAL_DIR.unpack_from(data, pos)
+        if fields[0] != b"PK\x01\x02":
+            raise zipfile.BadZipFile("Central directory header signature missing")
+        name_len, extra_len, comment_len = fields[12:15]
+        length = _CENTRAL_DIR.size + name_len + extra_len + comment_len
+        central = bytes(data[pos : pos + length])
+        name = central[_CENTRAL_DIR.size : _CENTRAL_DIR.size + name_len]
+        encoding = "utf-8" if fields[6] & 0x800 else "cp437"
+        file_size, compress_size, header_offset = _zip64_fields(fields, central)
+        entries.append(
+            [name.decode(encoding), header_offset, compress_size, file_size, central]
+        )
+        pos += length
+
+    ends = sorted({e[1] for e in entries} | {cd_offset})
+    members = []
+    for name, offset, compress_size, file_size, central in entries:
+        end = ends[ends.index(offset) + 1]
+        members.append(
+            RemoteMember(name, offset, compress_size, file_size, end, central)
+        )
+    return members
+
+
+def _with_offset(central: bytes, offset: int) -> bytes:
+    """Return a central directory entry pointing at a new local header offset."""
+    record = bytearray(central)
+    fields = _CENTRAL_DIR.unpack_from(record, 0)
+    if fields[18] != _MAX32:
+        struct.pack_into("<L", record, 42, offset)
+        return bytes(record)
+    # The offset lives in the zip64 extra field, after the overflowed sizes.
+    name_len, extra_len = fields[12:14]
+    index = (fields[11] == _MAX32) + (fields[10] == _MAX32)
+    pos = _CENTRAL_DIR.size + name_len
+    stop = pos + extra_len
+    while pos + 4 <= stop:
+        tag, size = struct.unpack_from("<HH", record, pos)
+        if tag == _ZIP64_EXTRA_ID:
+            struct.pack_into("<Q", record, pos + 4 + 8 * index, offset)
+            break
+        pos += 4 + size
+    return bytes(record)
+
+
+def _end_records(entries: int, cd_size: int, cd_offset: int) -> bytes:
+    if max(cd_size, cd_offset) < _MAX32 and entries < 0xFFFF:
+        return _EOCD.pack(b"PK\x05\x06", 0, 0, entries, entries, cd_size, cd_offset, 0)
+    zip64_offset = cd_offset + cd_size
+    return (
+        _ZIP64_EOCD.pack(
+            b"PK\x06\x06",
+            _ZIP64_EOCD.size - 12,
+            45,
+            45,
+            0,
+            0,
+            entries,
+            entries,
+            cd_size,
+            cd_offset,
+        )
+        + _ZIP64_LOCATOR.pack(b"PK\x06\x07", 0, zip64_offset, 1)
+        + _EOCD.pack(
+            b"PK\x05\x06",
+            0,
+            0,
+            min(entries, 0xFFFF),
+            min(entries, 0xFFFF),
+            min(cd_size, _MAX32),
+            min(cd_offset, _MAX32),
+            0,
+        )
+    )
+
+
+def _matches(name: str, wanted: list[str]) -> bool:
+    base = os.path.basename(name).upper()
+    return any(name.upper() == w or base.startswith(w) for w in wanted)
+
+
+class RemoteZip:
+    """
+    Central directory of a zip on a web server that supports ``Range`` requests.
+
+    Parameters
+    -----------
+    url: str
+        Direct URL of the archive, e.g. from ``faers_ascii_url``.
+
+    session: requests.Session, optional
+        Session to send the requests through (default the ``requests`` module).
+
+    timeout: int
+        Max seconds to wait for the connection and for each read (default 600).
+
+    Examples
+    ---------
+        >>> from SurVigilance.ui.scrapers import RemoteZip, faers_ascii_url
+        >>> rz = RemoteZip(faers_ascii_url(2024, 1))
+        >>> [m.filename for m in rz.members]
+    """
+
+    def __init__(self, url: str, session: Any = None, timeout: int = 600) -> None:
+        self.url = str(url)
+        self.http = session or requests
+        self.timeout = timeout
+        self.size = 0
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.members: list[RemoteMember] = []
+        self.requested_bytes = 0
+        # The last bytes of the archive, kept from the directory request;
+        # small members near the end are served from them.
+        self._tail = b""
+        self._tail_start = 0
+        self._read_directory()
+
+    def iter_range(
+        self, start: int, end: int, chunk_size: int = 1 << 20
+    ) -> Iterator[bytes]:
+        """
+        Yield bytes ``[start, end)`` of the archive as they arrive.
+
+        The request carries ``If-Range`` with the ETag seen when the
+        directory was read, so a file replaced on the server is detected
+        instead of being mixed with the old directory. Bytes already received
+        with the directory are not requested again.
+        """
+        if start >= self._tail_start:
+            yield self._tail[start - self._tail_start : end - self._tail_start]
+            return
+        headers = {"Range": f"bytes={start}-{end - 1}"}
+        if self.etag:
+            headers["If-Range"] = self.etag
+        governor = get_governor()
+        received = 0
+        with governed_get(
+            self.http, self.url, headers=headers, timeout=self.timeout
+        ) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise requests.HTTPError(
+                    f"{self.url} did not answer a range request (status "
+                    f"{r.status_code}); it may have changed on the server"
+                )
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    governor.throttle(len(chunk))
+                    received += len(chunk)
+                    self.requested_bytes += len(chunk)
+                    yield chunk
+        if received != end - start:
+            raise OSError(
+                f"Range {start}-{end - 1} of {self.url} ended after {received} bytes"
+            )
+
+    def _read_directory(self) -> None:
+        with governed_get(
+            self.http,
+            self.url,
+            headers={"Range": f"bytes=-{TAIL_BYTES}"},
+            timeout=self.timeout,
+        ) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise requests.HTTPError(f"{self.url} does not support range requests")
+            tail = r.content
+            content_range = parse_content_range(r.headers.get("Content-Range"))
+            self.etag = r.headers.get("ETag")
+            self.last_modified = r.headers.get("Last-Modified")
+        self.requested_bytes += len(tail)
+        self.size = content_range[2] if content_range and content_range[2] else 0
+        if not self.size:
+            raise requests.HTTPError(f"{self.url} did not report its size")
+
+        cd_offset, cd_size, _, _ = central_directory_location(tail, self.size)
+        self._tail = tail
+        self._tail_start = self.size - len(tail)
+        cd = b"".join(self.iter_range(cd_offset, cd_offset + cd_size))
+        self.members = parse_central_directory(cd, cd_offset)
+
+    def select(self, names: Iterable[str]) -> list[RemoteMember]:
+        """
+        Return the members whose name, or the start of whose base name, is in ``names``.
+
+        ``"DRUG"`` selects ``ASCII/DRUG24Q1.txt``; matching ignores case.
+        """
+        wanted = [str(n).upper() for n in names]
+        return [
+            m
+            for m in self.members
+            if not m.filename.endswith("/") and _matches(m.filename, wanted)
+        ]
+
+
+def _plan_requests(
+    members: list[RemoteMember], max_gap: int
+) -> list[tuple[int, int, list[RemoteMember]]]:
+    """Group members whose byte ranges are close into single requests."""
+    groups: list[tuple[int, int, list[RemoteMember]]] = []
+    for m in sorted(members, key=lambda m: m.header_offset):
+        if groups and m.header_offset - groups[-1][1] <= max_gap:
+            start, _, grouped = groups[-1]
+            groups[-1] = (start, m.end, [*grouped, m])
+        else:
+            groups.append((m.header_offset, m.end, [m]))
+    return groups
+
+
+def write_members(
+    rz: "RemoteZip",
+    members: list[RemoteMember],
+    out: BinaryIO,
+    hasher: StreamHasher,
+    max_gap: int = MAX_GAP_BYTES,
+    progress: Callable[[int], None] | None = None,
+) -> None:
+    """
+    Write ``members`` of ``rz`` to ``out`` as a complete zip archive.
+
+    Each member's local header, compressed data and data descriptor are
+    copied unchanged, followed by their central directory entries (with the
+    new offsets) and the end records. ``progress`` receives the number of
+    member bytes copied so far.
+    """
+    # The members are copied in archive order, so their new offsets are
+    # known before any byte is fetched.
+    ordered = sorted(members, key=lambda m: m.header_offset)
+    offsets = {}
+    written = 0
+    for m in ordered:
+        offsets[m.filename] = written
+        written += m.end - m.header_offset
+
+    def _write(data: bytes | memoryview) -> None:
+        out.write(data)
+        hasher.update(data)
+
+    copied = 0
+    for start, end, group in _plan_requests(ordered, max_gap):
+        # One request per group; only the members' bytes are kept.
+        pos = start
+        for chunk in rz.iter_range(start, end):
+            view = memoryview(chunk)
+            for m in group:
+                lo = max(m.header_offset, pos)
+                hi = min(m.end, pos + len(chunk))
+                if lo < hi:
+                    _write(view[lo - pos : hi - pos])
+                    copied += hi - lo
+            pos += len(chunk)
+            if progress:
+                progress(copied)
+
+    cd = b"".join(_with_offset(m.central, offsets[m.filename]) for m in ordered)
+    _write(cd)
+    _write(_end_records(len(ordered), len(cd), written))
+
+
+def member_filename(url: str, names: Iterable[str]) -> str:
+    """Return the local name for a subset of an archive, e.g. ``..._2024q1-demo-drug.zip``."""
+    base = os.path.basename(urlparse(str(url)).path) or "archive.zip"
+    stem, ext = os.path.splitext(base)
+    parts = sorted({os.path.splitext(os.path.basename(n))[0].lower() for n in names})
+    return f"{stem}-{'-'.join(parts)}{ext or '.zip'}"
+
+
+def _size_or_none(path: str) -> int | None:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def fetch_zip_members(
+    url: str,
+    members: Iterable[str] = DEFAULT_FAERS_TABLES,
+    download_dir: str = "data/faers",
+    timeout: int = 600,
+    callback: Callable[[dict], None] | None = None,
+    num_retries: int = 5,
+    session: requests.Session | None = None,
+    skip_unchanged: bool = True,
+    progress_policy: ProgressPolicy | None = None,
+    max_gap: int = MAX_GAP_BYTES,
+) -> str:
+    """
+    Download only the chosen members of a remote zip into a smaller zip.
+
+    The end of the archive is requested first to read its central directory;
+    then each selected member is fetched, still compressed, with a ``Range``
+    request (members lying close together share one request). The result is
+    a valid zip named after the archive and the members, e.g.
+    ``faers_ascii_2024q1-demo-drug-reac.zip``, which ``convert_quarter``
+    reads like the full quarter. It is recorded in the download manifest, and
+    skipped on a later call while the server's ETag is unchanged.
+
+    Parameters
+    -----------
+    url: str
+        Direct URL of the zip, e.g. ``faers_ascii_url(2024, 1)``.
+
+    members: iterable of str
+        Member names, or the start of their base names, to fetch (default
+        ``("DEMO", "DRUG", "REAC")``).
+
+    download_dir: str
+        Directory where the smaller zip is saved.
+
+    timeout: int
+        Max seconds to wait for the connection and for each read (default 600).
+
+    callback: callable, optional
+        Callable to receive UI/status events, called with a dict. The events
+        are those of ``download_file``; ``download_complete`` also carries
+        ``fetched_bytes`` and ``archive_bytes``.
+
+    num_retries: int
+        Number of attempts after which the error is raised (default 5).
+
+    session: requests.Session, optional
+        Session to send the requests through.
+
+    skip_unchanged: bool
+        Return the existing file when the archive's ETag has not changed
+        (default True).
+
+    progress_policy: ProgressPolicy, optional
+        How often ``download_progress`` events reach ``callback``.
+
+    max_gap: int
+        Members separated by at most this many bytes are fetched with one
+        request (default 1 MiB).
+
+    Returns
+    --------
+    Full path to the saved zip as a string.
+
+    Examples
+    ---------
+        >>> from SurVigilance.ui.scrapers import faers_ascii_url, fetch_zip_members
+        >>> fetch_zip_members(faers_ascii_url(2024, 1), ["DRUG", "REAC"])
+    """
+    os.makedirs(download_dir, exist_ok=True)
+
+    if callback:
+        callback = (progress_policy or ProgressPolicy()).wrap(callback)
+
+    def _emit(evt: dict) -> None:
+        if callback:
+            try:
+                callback(evt)
+            except Exception:  # pragma: no cover
+                raise  # pragma: no cover
+
+    u = str(url)
+    names = [str(n) for n in members]
+    filename = member_filename(u, names)
+    file_path = os.path.join(download_dir, filename)
+    part_path = file_path + PART_SUFFIX
+    manifest = DownloadManifest(download_dir)
+
+    exceptions = []
+    for attempt in range(num_retries):
+        try:
+            if attempt > 0:
+                _emit(
+                    {
+                        "type": "log",
+                        "message": f"Retrying download... ({attempt + 1}/{num_retries})\n",
+                    }
+                )
+            rz = RemoteZip(u, session=session, timeout=timeout)
+            selected = rz.select(names)
+            if not selected:
+                raise ValueError(f"None of {names} found in {u}")
+
+            entry = manifest.get(filename) or {}
+            if (
+                skip_unchanged
+                and rz.etag
+                and entry.get("url") == u
+                and entry.get("etag") == rz.etag
+                and entry.get("size") == _size_or_none(file_path)
+            ):
+                _emit(
+                    {"type": "log", "message": f"{filename} is already up to date.\n"}
+                )
+                _emit(
+                    {
+                        "type": "download_complete",
+                        "path": file_path,
+                        "filename": filename,
+                        "skipped": True,
+                    }
+                )
+                return file_path
+
+            wanted_bytes = sum(m.end - m.header_offset for m in selected)
+            _emit(
+                {
+                    "type": "log",
+                    "message": (
+                        f"Fetching {len(selected)} of {len(rz.members)} members "
+                        f"of {os.path.basename(urlparse(u).path)} "
+                        f"({wanted_bytes / 1e6:.1f} of {rz.size / 1e6:.1f} MB).\n"
+                    ),
+                }
+            )
+            _emit(progress_event(filename, 0, wanted_bytes))
+
+            hasher = StreamHasher()
+            with open(part_path, "wb") as out:
+                write_members(
+                    rz,
+                    selected,
+                    out,
+                    hasher,
+                    max_gap,
+                    lambda n, total=wanted_bytes: _emit(
+                        progress_event(filename, n, total)
+                    ),
+                )
+
+            check_zip_tail(hasher.head, hasher.tail, hasher.size)
+            os.replace(part_path, file_path)
+            manifest.record(
+                filename,
+                url=u,
+                size=os.path.getsize(file_path),
+                etag=rz.etag,
+                last_modified=rz.last_modified,
+                sha256=hasher.hexdigest(),
+                members=sorted(m.filename for m in selected),
+            )
+            _emit(
+                {
+                    "type": "download_complete",
+                    "path": file_path,
+                    "filename": filename,
+                    "sha256": hasher.hexdigest(),
+                    "fetched_bytes": rz.requested_bytes,
+                    "archive_bytes": rz.size,
+                }
+            )
+            return file_path
+
+        except Exception as e:  # pragma: no cover
+            exceptions.append(e)
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            _emit(
+                {
+                    "type": "error",
+                    "message": f"Download attempt {attempt + 1} failed: {e}",
+                    "url": u,
+                }
+            )
+            if isinstance(e, ValueError) or attempt == num_retries - 1:
+                raise
+            time.sleep(20)  # Wait before retrying
+
+    raise exceptions[-1]  # pragma: no cover
@@ -3,9 +3,12 @@ Scraper for FAERS using SeleniumBase.
 """
 
 import os
+import queue
 import time
 import warnings
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from typing import Any
 from urllib.parse import urlparse
 
@@ -13,6 +16,29 @@ import pandas as pd
 import requests
 from seleniumbase import SB
 
+from ._downloads import (
+    MIN_SEGMENT_BYTES,
+    PART_SUFFIX,
+    RETRY_DELAY,
+    StreamHasher,
+    clear_partial,
+    download_segmented,
+    download_stream,
+    is_disk_full,
+    pooled_session,
+    probe_url,
+    read_sidecar,
+    verify_download,
+)
+from .archive_store import (
+    ArchiveStore,
+    fetch_from_store,
+    get_archive_store,
+    share_download,
+)
+from .download_manifest import DownloadManifest, entry_is_current
+from .download_progress import ProgressPolicy
+
 warnings.filterwarnings("ignore")
 
 
@@ -231,10 +257,37 @@ def download_file(
     timeout: int = 600,
     callback: Callable[[dict], None] | None = None,
     num_retries: int = 5,
+    segments: int = 1,
+    session: requests.Session | None = None,
+    skip_unchanged: bool = True,
+    progress_policy: ProgressPolicy | None = None,
+    chunk_size: int | None = None,
+    archive_store: ArchiveStore | None = None,
+    retry_delay: float = RETRY_DELAY,
 ) -> str:
     """
     Save a file from a direct link using requests module.
 
+    The file is first written to ``<filename>.part`` and renamed once it is
+    complete. If a transfer is interrupted, the bytes already received are
+    kept and the next attempt (or the next call) resumes with an HTTP
+    ``Range`` request, provided the file has not changed on the server.
+    With ``segments`` > 1 the file is split into byte ranges fetched over
+    several connections at once, which helps when a single TCP stream cannot
+    use all of the available bandwidth.
+
+    Each saved file is recorded in ``download_manifest.json`` in
+    ``download_dir`` (URL, size, ETag, Last-Modified and SHA-256). When the
+    file is already on disk, a conditional HEAD request is sent first and the
+    download is skipped if the server reports it unchanged.
+
+    The SHA-256 is computed while the file is written, and zip archives are
+    checked against their end-of-central-directory record before the final
+    rename, so a truncated or corrupt archive is downloaded again instead of
+    being returned. When the server reports the size, the ``.part`` file is
+    preallocated first; if the disk cannot hold it the download fails at
+    once, without retrying.
+
     Parameters
     -----------
     url: str
@@ -253,6 +306,39 @@ def download_file(
     num_retries: int
         Number of retries for data download after which error is thrown (default 5).
 
+    segments: int
+        Number of byte ranges to download in parallel (default 1). Values
+        above 1 are only used when the server advertises ``Accept-Ranges``
+        and reports the file size; otherwise a single stream is used.
+
+    session: requests.Session, optional
+        Session to send the requests through, e.g. one shared by several
+        downloads so connections are kept alive and reused. By default the
+        module-level ``requests`` functions are used.
+
+    skip_unchanged: bool
+        Return the existing file without downloading it again when the server
+        reports it unchanged since it was recorded in the manifest
+        (default True).
+
+    progress_policy: ProgressPolicy, optional
+        How often ``download_progress`` events reach ``callback``. By default
+        they are merged to at most one per 0.2 s and per 1 percent; pass
+        ``ProgressPolicy(0, 0)`` to receive one event per chunk.
+
+    chunk_size: int, optional
+        Fixed number of bytes read per chunk. By default the read size adapts
+        to the measured throughput (64 KiB up to 4 MiB).
+
+    archive_store: ArchiveStore, optional
+        Shared store to take the file from before going to the network, and
+        to add it to after downloading (see :mod:`.archive_store`). By
+        default the store set with ``configure_archive_store`` is used, if
+        any. With ``skip_unchanged=False`` the store is not consulted.
+
+    retry_delay: float
+        Seconds to wait between attempts (default 20).
+
     Returns
     --------
     Full path to the saved file as a string.
@@ -260,6 +346,9 @@ def download_file(
 
     os.makedirs(download_dir, exist_ok=True)
 
+    if callback:
+        callback = (progress_policy or ProgressPolicy()).wrap(callback)
+
     def _emit(evt: dict) -> None:
         if callback:
             try:
@@ -271,6 +360,67 @@ def download_file(
 
     parsed = urlparse(u)
     filename = os.path.basename(parsed.path) or "downloaded_file"
+    file_path = os.path.join(download_dir, filename)
+    part_path = file_path + PART_SUFFIX
+    http = session or requests
+    manifest = DownloadManifest(download_dir)
+
+    store = archive_store or get_archive_store()
+    # A stored copy is only used while the server reports it unchanged, so a
+    # file republished at the same URL is downloaded again.
+    shared = (
+        fetch_from_store(
+            store,
+            u,
+            file_path,
+            _emit,
+            is_current=lambda entry: entry_is_current(entry, u, http, timeout),
+        )
+        if skip_unchanged
+        else None
+    )
+    if shared is not None:
+        manifest.record(
+            filename,
+            url=u,
+            size=shared["size"],
+            etag=shared.get("etag"),
+            last_modified=shared.get("last_modified"),
+            sha256=shared["sha256"],
+        )
+        _emit(
+            {
+                "type": "download_complete",
+                "path": file_path,
+                "filename": filename,
+                "skipped": True,
+                "shared": True,
+                "sha256": shared["sha256"],
+            }
+        )
+        return file_path
+
+    if skip_unchanged and manifest.is_current(filename, u, http, timeout):
+        _emit({"type": "log", "message": f"{filename} is already up to date.\n"})
+        entry = manifest.get(filename) or {}
+        share_download(
+            store,
+            u,
+            file_path,
+            _emit,
+            sha256=entry.get("sha256"),
+            etag=entry.get("etag"),
+            last_modified=entry.get("last_modified"),
+        )
+        _emit(
+            {
+                "type": "download_complete",
+                "path": file_path,
+                "filename": filename,
+                "skipped": True,
+            }
+        )
+        return file_path
 
     exceptions = []
     for attempt in range(num_retries):
@@ -283,52 +433,60 @@ def download_file(
                     }
                 )
 
-            with requests.get(u, stream=True, timeout=timeout) as r:
-                r.raise_for_status()
-
-                file_path = os.path.join(download_dir, filename)
-
-                try:
-                    total_bytes = int(
-                        r.headers.get("Content-Length")
-                        or r.headers.get("content-length")
-                        or 0
-                    )
-                except Exception:  # pragma: no cover
-                    total_bytes = 0
-
-                _emit(
-                    {
-                        "type": "download_start",
-                        "url": u,
-                        "filename": filename,
-                        "total_bytes": total_bytes,
-                    }
+            hasher = StreamHasher()
+            probe = probe_url(http, u, timeout) if segments > 1 else {}
+            if (
+                probe.get("accept_ranges")
+                and probe["total_bytes"] >= 2 * MIN_SEGMENT_BYTES
+            ):
+                downloaded, total_bytes = download_segmented(
+                    http,
+                    u,
+                    file_path,
+                    probe,
+                    segments,
+                    timeout,
+                    _emit,
+                    hasher,
+                    chunk_size=chunk_size,
+                )
+            else:
+                downloaded, total_bytes = download_stream(
+                    http, u, file_path, timeout, _emit, hasher, chunk_size=chunk_size
                 )
 
-                downloaded = 0
-                with open(file_path, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if not chunk:
-                            continue
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        if total_bytes > 0:
-                            percent = int(downloaded * 100 / max(1, total_bytes))
-                        else:
-                            percent = None
-                        _emit(
-                            {
-                                "type": "download_progress",
-                                "downloaded_bytes": downloaded,
-                                "total_bytes": total_bytes,
-                                "percent": percent,
-                                "filename": filename,
-                            }
-                        )
+            # Raises (and discards a corrupt .part) so the next attempt
+            # resumes or downloads the file again.
+            verify_download(file_path, downloaded, total_bytes, hasher)
+
+            state = read_sidecar(file_path)
+            os.replace(part_path, file_path)
+            manifest.record(
+                filename,
+                url=u,
+                size=os.path.getsize(file_path),
+                etag=state.get("etag"),
+                last_modified=state.get("last_modified"),
+                sha256=hasher.hexdigest(),
+            )
+            clear_partial(file_path)
+            share_download(
+                store,
+                u,
+                file_path,
+                _emit,
+                sha256=hasher.hexdigest(),
+                etag=state.get("etag"),
+                last_modified=state.get("last_modified"),
+            )
 
             _emit(
-                {"type": "download_complete", "path": file_path, "filename": filename}
+                {
+                    "type": "download_complete",
+                    "path": file_path,
+                    "filename": filename,
+                    "sha256": hasher.hexdigest(),
+                }
             )
             return file_path
 
@@ -341,7 +499,11 @@ def download_file(
                     "url": u,
                 }
             )
-            time.sleep(20)  # Wait before retrying
+            if is_disk_full(e):
+                # Fails early: retrying cannot help until space is freed.
+                raise
+            if attempt < num_retries - 1:
+                time.sleep(retry_delay)
             continue
 
     _emit(
@@ -356,3 +518,240 @@ def download_file(
     )
     if exceptions:
         raise exceptions[-1]
+
+
+@dataclass
+class DownloadResults:
+    """
+    Outcome of :func:`download_files`.
+
+    Attributes
+    -----------
+    successes: list
+        Paths of the files that were downloaded, in completion order.
+
+    failures: list
+        ``(url, error message)`` pairs for the files that could not be
+        downloaded.
+
+    downloaded_bytes: int
+        Bytes received across all files during this call.
+
+    elapsed_seconds: float
+        Wall-clock duration of the whole batch.
+    """
+
+    successes: list[str] = field(default_factory=list)
+    failures: list[tuple[str, str]] = field(default_factory=list)
+    downloaded_bytes: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+def download_files(
+    urls: Iterable[str],
+    download_dir: str = "data/faers",
+    max_workers: int = 4,
+    timeout: int = 600,
+    callback: Callable[[dict], None] | None = None,
+    num_retries: int = 5,
+    segments: int = 1,
+    session: requests.Session | None = None,
+    poll_interval: float = 0.5,
+    progress_policy: ProgressPolicy | None = None,
+) -> DownloadResults:
+    """
+    Download several files concurrently through one pooled ``requests.Session``.
+
+    Each file is fetched with :func:`download_file` (so resuming and
+    segmented downloads work the same way) on a bounded thread pool. All
+    threads share a single session whose connection pool is sized for
+    ``max_workers`` x ``segments`` connections, so sockets are kept alive and
+    reused between files instead of being opened for each one.
+
+    Parameters
+    -----------
+    urls: iterable of str
+        Direct URLs of the files to download; a URL listed more than once
+        is downloaded once.
+
+    download_dir: str
+        Directory where the files should be saved.
+
+    max_workers: int
+        Maximum number of files downloaded at the same time (default 4).
+
+    timeout: int
+        Max seconds to wait for each download (default 600s or 10 mins).
+
+    callback: callable, optional
+        Callable to receive UI/status events, called with a dict. Per-file
+        events from :func:`download_file` are forwarded with ``url`` and
+        ``filename`` keys added; ``download_progress`` events additionally
+        carry ``bytes_per_sec`` and ``eta_seconds`` for that file. Aggregate
+        ``batch_progress`` events are sent every ``poll_interval`` seconds
+        and a ``batch_complete`` event at the end. All events are delivered
+        on the calling thread, so UI code can update widgets directly.
+
+    num_retries: int
+        Number of retries per file after which it is recorded as failed
+        (default 5).
+
+    segments: int
+        Number of byte ranges to fetch in parallel for each file (default 1).
+
+    session: requests.Session, optional
+        Session to use instead of creating (and closing) a pooled one.
+
+    poll_interval: float
+        Seconds between aggregate progress events (default 0.5).
+
+    progress_policy: ProgressPolicy, optional
+        How often per-file ``download_progress`` events are forwarded (see
+        :func:`download_file`).
+
+    Returns
+    --------
+    A :class:`DownloadResults` listing the files that succeeded and failed.
+    """
+
+    def _emit(evt: dict) -> None:
+        if callback:
+            try:
+                callback(evt)
+            except Exception:  # pragma: no cover
+                raise  # pragma: no cover
+
+    # The state of every file is kept by URL, so each URL is downloaded once.
+    urls = list(dict.fromkeys(str(u) for u in urls))
+    os.makedirs(download_dir, exist_ok=True)
+
+    own_session = session is None
+    if own_session:
+        session = pooled_session(max(1, max_workers) * max(1, segments))
+
+    # Worker threads only enqueue events; they are handed to the callback on
+    # this thread, which is what Streamlit requires.
+    events: queue.Queue = queue.Queue()
+    files = {
+        u: {
+            "filename": os.path.basename(urlparse(u).path) or "downloaded_file",
+            "downloaded": 0,
+            "resumed_from": 0,
+            "total": 0,
+            "started": None,
+        }
+        for u in urls
+    }
+    results = DownloadResults()
+    began = time.perf_counter()
+
+    def _run(u: str) -> str:
+        return download_file(
+            url=u,
+            download_dir=download_dir,
+            timeout=timeout,
+            callback=lambda evt: events.put((u, evt)),
+            num_retries=num_retries,
+            segments=segments,
+            session=session,
+            progress_policy=progress_policy,
+        )
+
+    def _forward(u: str, evt: dict) -> None:
+        info = files[u]
+        evt.setdefault("url", u)
+        evt.setdefault("filename", info["filename"])
+        et = evt.get("type")
+        if et == "download_start":
+            info["started"] = time.perf_counter()
+            info["resumed_from"] = info["downloaded"] = evt.get("resumed_from", 0)
+            info["total"] = evt.get("total_bytes") or 0
+        elif et == "download_progress":
+            info["downloaded"] = evt.get("downloaded_bytes", info["downloaded"])
+            elapsed = time.perf_counter() - (info["started"] or began)
+            rate = (info["downloaded"] - info["resumed_from"]) / max(elapsed, 1e-9)
+            evt["bytes_per_sec"] = rate
+            evt["eta_seconds"] = (
+                (info["total"] - info["downloaded"]) / rate
+                if rate > 0 and info["total"]
+                else None
+            )
+        _emit(evt)
+
+    def _drain() -> None:
+        while True:
+            try:
+                u, evt = events.get_nowait()
+            except queue.Empty:
+                return
+            _forward(u, evt)
+
+    def _batch_progress() -> None:
+        started = [i for i in files.values() if i["started"] is not None]
+        downloaded = sum(i["downloaded"] for i in started)
+        fresh = downloaded - sum(i["resumed_from"] for i in started)
+        known = [i["total"] for i in started if i["total"]]
+        # Estimate the size of files that have not started from those that have.
+        expected = sum(known) + (
+            (sum(known) / len(known)) * (len(files) - len(started)) if known else 0
+        )
+        elapsed = time.perf_counter() - began
+        rate = fresh / max(elapsed, 1e-9)
+        finished = len(results.successes) + len(results.failures)
+        _emit(
+            {
+                "type": "batch_progress",
+                "completed_files": len(results.successes),
+                "failed_files": len(results.failures),
+                "total_files": len(files),
+                "downloaded_bytes": downloaded,
+                "expected_bytes": int(expected),
+                "bytes_per_sec": rate,
+                "eta_seconds": (
+                    max(0.0, expected - downloaded) / rate
+                    if rate > 0 and known and finished < len(files)
+                    else None
+                ),
+                "percent": (
+                    int(downloaded * 100 / max(1, expected)) if expected else None
+                ),
+            }
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {pool.submit(_run, u): u for u in urls}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=poll_interval)
+                _drain()
+                for fut in done:
+                    u = futures[fut]
+                    try:
+                        results.successes.append(fut.result())
+                    except Exception as e:  # pragma: no cover
+                        results.failures.append((u, str(e)))
+                _batch_progress()
+        _drain()
+    finally:
+        if own_session:
+            session.close()
+
+    results.downloaded_bytes = sum(
+        i["downloaded"] - i["resumed_from"] for i in files.values()
+    )
+    results.elapsed_seconds = time.perf_counter() - began
+    _emit(
+        {
+            "type": "batch_complete",
+            "successes": len(results.successes),
+            "failures": len(results.failures),
+            "downloaded_bytes": results.downloaded_bytes,
+            "elapsed_seconds": results.elapsed_seconds,
+        }
+    )
+    return results
@@ -5,12 +5,30 @@ Downloader for VAERS yearly ZIPs.
 import os
 import shutil
 import time
+import zipfile
 from collections.abc import Callable
 from typing import Any
 
 import requests
 from seleniumbase import SB
 
+from ._downloads import (
+    PART_SUFFIX,
+    RETRY_DELAY,
+    StreamHasher,
+    clear_partial,
+    download_stream,
+    is_disk_full,
+    verify_download,
+)
+from .archive_store import (
+    ArchiveStore,
+    fetch_from_store,
+    get_archive_store,
+    share_download,
+)
+from .download_progress import ProgressPolicy
+
 
 def vaers_intermediate_url(year: int) -> str:  # pragma: no cover
     return f"https://vaers.hhs.gov/eSubDownload/index.jsp?fn={year}VAERSData.zip"
@@ -23,6 +41,10 @@ def download_vaers_zip_sb(
     callback: Callable[[dict], None] | None = None,
     headless: bool = True,
     fallback_wait: int = 120,
+    num_retries: int = 5,
+    progress_policy: ProgressPolicy | None = None,
+    archive_store: ArchiveStore | None = None,
+    retry_delay: float = RETRY_DELAY,
 ) -> str:  # pragma: no cover
     """
     Navigate the VAERS intermediate page, solve CAPTCHA, and download the ZIP.
@@ -49,11 +71,32 @@ def download_vaers_zip_sb(
         complete in browser default folder if the "Download File" button
         isn't found in time.
 
+    num_retries: int
+        Number of attempts for the file transfer itself (default 5). An
+        interrupted transfer resumes where it stopped; an archive that fails
+        the zip integrity check is downloaded again.
+
+    progress_policy: ProgressPolicy, optional
+        How often ``download_progress`` events reach ``callback`` (by default
+        at most one per 0.2 s and per 1 percent).
+
+    archive_store: ArchiveStore, optional
+        Shared store checked before the browser is opened; a year found there
+        is linked into ``download_dir`` instead of being downloaded. By
+        default the store set with ``configure_archive_store`` is used, if
+        any.
+
+    retry_delay: float
+        Seconds to wait between transfer attempts (default 20).
+
     Returns
     --------
     The full path of the downloaded ZIP file.
     """
 
+    if callback:
+        callback = (progress_policy or ProgressPolicy()).wrap(callback)
+
     def _emit(event_type: str, **kw: Any) -> None:  # pragma: no cover
         if callback:
             try:
@@ -64,6 +107,26 @@ def download_vaers_zip_sb(
     os.makedirs(download_dir, exist_ok=True)
 
     url = vaers_intermediate_url(int(year))
+    # The direct link carries session tokens, so archives are keyed by the
+    # stable intermediate page URL.
+    store = archive_store or get_archive_store()
+
+    def _forward(evt: dict) -> None:
+        _emit(evt.pop("type"), **evt)
+
+    shared_path = os.path.join(download_dir, f"{year}VAERSData.zip")
+    shared = fetch_from_store(store, url, shared_path, _forward)
+    if shared is not None:
+        _emit(
+            "download_complete",
+            path=shared_path,
+            filename=os.path.basename(shared_path),
+            skipped=True,
+            shared=True,
+            sha256=shared["sha256"],
+        )
+        return shared_path
+
     _emit("log", message=f"Opening VAERS page for {year}")
 
     with SB(uc=True, headless=headless) as sb:
@@ -106,6 +169,7 @@ def download_vaers_zip_sb(
                         except Exception:  # pragma: no cover
                             raise  # pragma: no cover
                         if os.path.isfile(target_path):
+                            share_download(store, url, target_path, _forward)
                             _emit(
                                 "download_complete",
                                 path=target_path,
@@ -164,47 +228,39 @@ def download_vaers_zip_sb(
             raise  # pragma: no cover
 
         _emit("log", message="Starting VAERS data download")
-        with sess.get(href, stream=True, timeout=timeout) as r:
-            r.raise_for_status()
-            filename = f"{year}VAERSData.zip"
-            file_path = os.path.join(download_dir, filename)
+        filename = f"{year}VAERSData.zip"
+        file_path = os.path.join(download_dir, filename)
 
+        for attempt in range(num_retries):
+            hasher = StreamHasher()
             try:
-                total_bytes = int(
-                    r.headers.get("Content-Length")
-                    or r.headers.get("content-length")
-                    or 0
+                downloaded, total_bytes = download_stream(
+                    sess, href, file_path, timeout, _forward, hasher
                 )
-            except Exception:  # pragma: no cover
-                total_bytes = 0
-
-            _emit(
-                "download_start",
-                url=href,
-                filename=filename,
-                total_bytes=total_bytes,
-            )
-
-            downloaded = 0
-            with open(file_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if not chunk:
-                        continue
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if total_bytes > 0:
-                        try:
-                            percent = int(downloaded * 100 / max(1, total_bytes))
-                            _emit(
-                                "download_progress",
-                                downloaded_bytes=downloaded,
-                                total_bytes=total_bytes,
-                                percent=percent,
-                            )
-                        except Exception:  # pragma: no cover
-                            raise  # pragma: no cover
-
-        _emit("download_complete", path=file_path, filename=filename)
+                # A truncated download resumes on the next attempt; a corrupt
+                # zip is discarded and fetched again.
+                verify_download(file_path, downloaded, total_bytes, hasher)
+                break
+            except (OSError, requests.RequestException, zipfile.BadZipFile) as e:
+                _emit(
+                    "log",
+                    message=f"Download attempt {attempt + 1} failed: {e}",
+                )
+                if attempt == num_retries - 1 or is_disk_full(e):
+                    _emit("error", message=f"Failed to download {filename}: {e}")
+                    raise
+                time.sleep(retry_delay)
+
+        os.replace(file_path + PART_SUFFIX, file_path)
+        clear_partial(file_path)
+        share_download(store, url, file_path, _forward, sha256=hasher.hexdigest())
+
+        _emit(
+            "download_complete",
+            path=file_path,
+            filename=filename,
+            sha256=hasher.hexdigest(),
+        )
 
         try:
             stray_dir = os.path.join(os.getcwd(), "downloaded_files")
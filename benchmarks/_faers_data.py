@@ -0,0 +1,92 @@
+"""
+Synthetic FAERS quarterly archives for the benchmarks.
+
+The tables have the column layout of the real ASCII files and realistic
+shapes (about 2 drugs, 3 reactions and 1 outcome per report, a tenth of
+cases with a follow-up version), with drug names and preferred terms drawn
+from skewed vocabularies.
+"""
+
+import io
+import itertools
+import random
+import zipfile
+
+HEADERS = {
+    "DEMO": "primaryid$caseid$caseversion$i_f_code$event_dt$mfr_dt$init_fda_dt"
+    "$fda_dt$rept_cod$auth_num$mfr_num$mfr_sndr$lit_ref$age$age_cod$age_grp$sex"
+    "$e_sub$wt$wt_cod$rept_dt$to_mfr$occp_cod$reporter_country$occr_country",
+    "DRUG": "primaryid$caseid$drug_seq$role_cod$drugname$prod_ai$val_vbm$route"
+    "$dose_vbm$cum_dose_chr$cum_dose_unit$dechal$rechal$lot_num$exp_dt$nda_num"
+    "$dose_amt$dose_unit$dose_form$dose_freq",
+    "REAC": "primaryid$caseid$pt$drug_rec_act",
+    "OUTC": "primaryid$caseid$outc_cod",
+    "RPSR": "primaryid$caseid$rpsr_cod",
+    "THER": "primaryid$caseid$dsg_drug_seq$start_dt$end_dt$dur$dur_cod",
+    "INDI": "primaryid$caseid$indi_drug_seq$indi_pt",
+}
+
+DRUGS = [f"DRUG{i:05d}" for i in range(5000)]
+PTS = [f"Preferred term {i:05d}" for i in range(8000)]
+COUNTRIES = ["US", "GB", "JP", "FR", "DE", "CA", "IT", "ES", "BR", "CN"]
+
+
+def quarter_tables(
+    year: int, quarter: int, cases: int, seed: int = 0, first_caseid: int = 1
+) -> dict[str, list[str]]:
+    """Return the lines (without header) of every table of one quarter."""
+    rng = random.Random(seed * 100_000 + year * 10 + quarter)
+    # Cumulative weights, so random.choices does not re-add them on every call.
+    drug_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(DRUGS))))
+    pt_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(PTS))))
+    lines = {name: [] for name in HEADERS}
+    for caseid in range(first_caseid, first_caseid + cases):
+        versions = (1, 2) if rng.random() < 0.1 else (1,)
+        for version in versions:
+            pid = caseid * 100 + version
+            key = f"{pid}${caseid}"
+            age = rng.randint(0, 99)
+            age_cod = rng.choices(
+                ["YR", "MON", "WK", "DY", "DEC", ""], [90, 3, 1, 1, 1, 4]
+            )[0]
+            sex = rng.choices(["F", "M", "UNK", ""], [55, 40, 2, 3])[0]
+            country = rng.choice(COUNTRIES)
+            lines["DEMO"].append(
+                f"{key}${version}${'I' if version == 1 else 'F'}$$$$"
+                f"{year}{3 * quarter:02d}{rng.randint(1, 28):02d}$EXP$$$$$"
+                f"{age}${age_cod}$${sex}$Y$$$$$MD${country}${country}"
+            )
+            for seq, drug in enumerate(
+                rng.choices(DRUGS, cum_weights=drug_weights, k=rng.randint(1, 4)),
+                start=1,
+            ):
+                role = "PS" if seq == 1 else rng.choice(["SS", "C", "C", "I"])
+                lines["DRUG"].append(
+                    f"{key}${seq}${role}${drug}${drug.lower()}$1$ORAL$" + "$" * 11
+                )
+                lines["THER"].append(f"{key}${seq}$$$$")
+                lines["INDI"].append(f"{key}${seq}$Product used for unknown indication")
+            for pt in set(
+                rng.choices(PTS, cum_weights=pt_weights, k=rng.randint(1, 5))
+            ):
+                lines["REAC"].append(f"{key}${pt}$")
+            if rng.random() < 0.6:
+                lines["OUTC"].append(
+                    f"{key}${rng.choice(['OT', 'HO', 'DE', 'LT', 'DS'])}"
+                )
+            lines["RPSR"].append(f"{key}$HP")
+    return lines
+
+
+def make_quarter_zip(
+    year: int, quarter: int, cases: int, seed: int = 0, first_caseid: int = 1
+) -> bytes:
+    """Return a quarterly ASCII zip with ``cases`` cases."""
+    tables = quarter_tables(year, quarter, cases, seed, first_caseid)
+    yy = f"{year % 100:02d}Q{quarter}"
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for name, rows in tables.items():
+            text = HEADERS[name] + "\r\n" + "\r\n".join(rows) + "\r\n"
+            zf.writestr(f"ASCII/{name}{yy}.txt", text.encode("latin-1"))
+    return buf.getvalue()
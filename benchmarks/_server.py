@@ -0,0 +1,66 @@
+"""
+Local HTTP server used by the download benchmarks.
+
+Serves in-memory files with single ``Range`` support. Every connection can be
+capped at ``per_stream_bps`` bytes per second to mimic a link where one TCP
+stream cannot use the whole bandwidth.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _headers(self, status, body, start, end):
+        self.send_response(status)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{len(body)}"')
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        self.end_headers()
+
+    def do_HEAD(self):
+        body = self.server.files[self.path]
+        self._headers(200, body, 0, len(body) - 1)
+
+    def do_GET(self):
+        body = self.server.files[self.path]
+        start, end, status = 0, len(body) - 1, 200
+        if self.headers.get("Range"):
+            first, _, last = self.headers["Range"].split("=", 1)[1].partition("-")
+            if first:
+                start, end, status = int(first), int(last or end), 206
+            else:  # suffix range: the last ``last`` bytes
+                start, status = max(0, len(body) - int(last)), 206
+        self._headers(status, body, start, end)
+
+        view = memoryview(body)[start : end + 1]
+        block = 64 * 1024
+        began = time.perf_counter()
+        sent = 0
+        while sent < len(view):
+            self.wfile.write(view[sent : sent + block])
+            sent += min(block, len(view) - sent)
+            if self.server.per_stream_bps:
+                ahead = sent / self.server.per_stream_bps - (
+                    time.perf_counter() - began
+                )
+                if ahead > 0:
+                    time.sleep(ahead)
+
+
+def start_server(files: dict[str, bytes], per_stream_bps: int | None = None):
+    """Start the server in a daemon thread and return ``(server, base_url)``."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.files = files
+    server.per_stream_bps = per_stream_bps
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
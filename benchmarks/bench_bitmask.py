@@ -0,0 +1,130 @@
+"""
+Role and outcome filters as string comparisons and as bitmasks.
+
+Synthetic quarters are converted with ``build_warehouse`` (DRUG, REAC and
+OUTC) and coded with ``update_coded_arrays``. The filters "primary or
+secondary suspect" on DRUG and "death, life-threatening or hospitalization"
+on OUTC are timed on their own, as ``isin`` over the code strings of pandas
+frames held in memory and as a bitwise AND over the ``uint8`` masks of the
+coded arrays. Then the PT counts of a few drugs under both filters are
+computed with pandas on the frames and with ``CodedArrays.pt_counts``.
+
+Usage::
+
+    python benchmarks/bench_bitmask.py --quarters 8 --cases 100000
+
+On a 1-core container (880k reports, 2.2M DRUG rows) the role filter takes
+65.6ms with ``isin`` and 0.8ms with the bitmask, and the outcome filter
+17.6ms over the OUTC rows and 0.3ms over the reports. With both filters the
+PT counts of a drug take 0.21-0.37s with pandas and 0.004-0.032s with the
+bitmasks, from the rarest to the most frequent drug.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from _faers_data import DRUGS, make_quarter_zip
+
+from SurVigilance.faers import (
+    CodedArrays,
+    build_warehouse,
+    open_warehouse,
+    update_coded_arrays,
+)
+from SurVigilance.faers.coded import OUTCOME_BITS, ROLE_BITS, bitmask
+
+ROLES = ["PS", "SS"]
+OUTCOMES = ["DE", "LT", "HO"]
+
+
+def _frame(warehouse, table, columns):
+    rows = open_warehouse(warehouse, table).to_table(columns=columns)
+    return rows.to_pandas().astype({c: str for c in columns[1:]})
+
+
+def _timed(function, repeat=5):
+    began = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - began) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quarters", type=int, default=8)
+    parser.add_argument("--cases", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.quarters):
+            year, quarter = 2015 + i // 4, i % 4 + 1
+            path = os.path.join(tmp, f"faers_ascii_{year}q{quarter}.zip")
+            with open(path, "wb") as f:
+                f.write(
+                    make_quarter_zip(
+                        year,
+                        quarter,
+                        args.cases,
+                        seed=i,
+                        first_caseid=1 + i * args.cases,
+                    )
+                )
+        warehouse = build_warehouse(tmp, tables=["DRUG", "REAC", "OUTC"])[
+            "warehouse_dir"
+        ]
+        update_coded_arrays(warehouse)
+        coded = CodedArrays(warehouse)
+        drug = _frame(warehouse, "DRUG", ["primaryid", "drugname", "role_cod"])
+        reac = _frame(warehouse, "REAC", ["primaryid", "pt"])
+        outc = _frame(warehouse, "OUTC", ["primaryid", "outc_cod"])
+
+        roles = bitmask(ROLES, ROLE_BITS)
+        outcomes = bitmask(OUTCOMES, OUTCOME_BITS)
+        for label, strings, bits in (
+            (
+                f"roles {'/'.join(ROLES)}",
+                lambda: drug["role_cod"].isin(ROLES).to_numpy(),
+                lambda: (coded.drug_roles & roles) != 0,
+            ),
+            (
+                f"outcomes {'/'.join(OUTCOMES)}",
+                lambda: outc["outc_cod"].isin(OUTCOMES).to_numpy(),
+                lambda: (coded.report_outcomes & outcomes) != 0,
+            ),
+        ):
+            kept, string_seconds = _timed(strings)
+            kept_bits, bit_seconds = _timed(bits)
+            print(
+                f"{label:18s}  strings {string_seconds * 1000:6.1f}ms "
+                f"({len(kept):,} rows)  bitmask {bit_seconds * 1000:6.1f}ms "
+                f"({len(kept_bits):,} rows)"
+            )
+
+        for name in [DRUGS[i] for i in (0, 100, 1000)]:
+
+            def with_strings(name=name):
+                rows = drug[(drug["drugname"] == name) & drug["role_cod"].isin(ROLES)]
+                serious = outc.loc[outc["outc_cod"].isin(OUTCOMES), "primaryid"]
+                reports = set(rows["primaryid"]) & set(serious)
+                pairs = reac[reac["primaryid"].isin(reports)].drop_duplicates()
+                return pairs.groupby("pt").size()
+
+            expected, string_seconds = _timed(with_strings, repeat=1)
+            counts, bit_seconds = _timed(
+                lambda name=name: coded.pt_counts(name, roles=ROLES, outcomes=OUTCOMES),
+                repeat=1,
+            )
+            assert counts.sum() == expected.sum()
+            print(
+                f"{name}  pandas {string_seconds:5.2f}s  "
+                f"bitmasks {bit_seconds:5.3f}s  ({counts.sum():,} pairs)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Quarters scanned for a drug with and without the Bloom filters of the warehouse.
+
+Many small synthetic quarters are converted with ``build_warehouse`` (DRUG
+and REAC only), so that rare drugs are missing from most of them. For drugs
+from the most common to the rarest, the reactions of the reports with the
+drug are then read from the warehouse twice: from every quarter, and from
+the quarters ``quarters_with_drug`` keeps (``open_warehouse(..., drug=...)``).
+
+Usage::
+
+    python benchmarks/bench_bloom.py --quarters 40 --cases 5000
+
+On a 1-core container (40 quarters of 5,000 cases) checking the filters
+takes 14-20ms. The most common drugs are in every quarter and gain nothing
+(0.28s either way). A drug in 30 of the 40 quarters takes 0.22s instead of
+0.24s, one in 10 quarters 0.10s instead of 0.15s, and a name that is in no
+quarter 0.03s instead of 0.13s, as no file is opened at all.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from _faers_data import DRUGS, make_quarter_zip
+
+from SurVigilance.faers import build_warehouse, open_warehouse, quarters_with_drug
+
+
+def _reactions(warehouse, drug, skip):
+    drugs = open_warehouse(warehouse, "DRUG", drug=drug if skip else None)
+    reports = drugs.to_table(
+        columns=["primaryid"], filter=ds.field("drugname") == drug
+    ).column("primaryid")
+    reac = open_warehouse(warehouse, "REAC", drug=drug if skip else None)
+    rows = reac.to_table(
+        columns=["primaryid", "pt"],
+        filter=ds.field("primaryid").isin(pc.unique(reports)),
+    )
+    return rows.num_rows, len(reac.files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quarters", type=int, default=40)
+    parser.add_argument("--cases", type=int, default=5_000)
+    args = parser.parse_args()
+    drugs = [DRUGS[i] for i in (0, 100, 1000, 3000, 4999)] + ["NOT A DRUG"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.quarters):
+            year, quarter = 2005 + i // 4, i % 4 + 1
+            path = os.path.join(tmp, f"faers_ascii_{year}q{quarter}.zip")
+            with open(path, "wb") as f:
+                f.write(
+                    make_quarter_zip(
+                        year,
+                        quarter,
+                        args.cases,
+                        seed=i,
+                        first_caseid=1 + i * args.cases,
+                    )
+                )
+        warehouse = build_warehouse(tmp, tables=["DRUG", "REAC"])["warehouse_dir"]
+
+        for drug in drugs:
+            began = time.perf_counter()
+            quarters = quarters_with_drug(warehouse, drug)
+            filter_seconds = time.perf_counter() - began
+            timings = []
+            for skip in (False, True):
+                began = time.perf_counter()
+                rows, scanned = _reactions(warehouse, drug, skip)
+                timings.append((time.perf_counter() - began, rows, scanned))
+            (full, rows, all_quarters), (pruned, pruned_rows, scanned) = timings
+            assert rows == pruned_rows
+            print(
+                f"{drug:10s}  {len(quarters):3d}/{all_quarters} quarters kept "
+                f"({filter_seconds * 1000:4.0f}ms)  all {full:5.2f}s  "
+                f"pruned {pruned:5.2f}s  ({rows:,} reactions)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+All-pairs drug x PT case counts with pandas and with the sparse cube.
+
+Synthetic quarters whose cases overlap by half with the previous quarter
+(follow-ups) are added to a warehouse (DEMO, DRUG and REAC) one at a time,
+and ``update_drug_event_cube`` runs after each. At the end the counts of
+every pair are also computed with pandas, by joining the DRUG and REAC rows
+of the latest reports on primaryid and grouping by drug and PT, and
+compared with the cube; then the 2x2 tables of every pair are derived.
+
+Usage::
+
+    python benchmarks/bench_cube.py --quarters 8 --cases 100000
+
+On a 1-core container (8 quarters of 100,000 reports, 450,000 cases at the
+end) each update adds about 95,000 reports and removes the 45,000 they
+follow up in 0.7-1.4s. Counting every pair once with pandas at the end
+takes 2.9s, and grows with the whole history every quarter; opening the
+cube and deriving the 2x2 tables and RORs of its 1.1M pairs takes 0.07s.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from _faers_data import make_quarter_zip
+
+from SurVigilance.faers import (
+    DrugEventCube,
+    convert_to_warehouse,
+    open_warehouse,
+    read_case_index,
+    update_drug_event_cube,
+)
+
+
+def _pandas_counts(warehouse):
+    # A primaryid can be in two quarters, so match the quarter as well.
+    keys = ["primaryid", "year", "quarter"]
+    latest = read_case_index(warehouse).select(keys).to_pandas()
+    frames = {}
+    for table, column in (("DRUG", "drugname"), ("REAC", "pt")):
+        rows = open_warehouse(warehouse, table).to_table(columns=[*keys, column])
+        frames[table] = rows.to_pandas().merge(latest, on=keys).drop_duplicates()
+    pairs = frames["DRUG"].merge(frames["REAC"], on=keys)
+    return pairs.groupby(["drugname", "pt"], observed=True).size()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quarters", type=int, default=8)
+    parser.add_argument("--cases", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        warehouse = os.path.join(tmp, "warehouse")
+        for i in range(args.quarters):
+            year, quarter = 2015 + i // 4, i % 4 + 1
+            path = os.path.join(tmp, f"faers_ascii_{year}q{quarter}.zip")
+            with open(path, "wb") as f:
+                f.write(
+                    make_quarter_zip(
+                        year,
+                        quarter,
+                        args.cases,
+                        seed=i,
+                        first_caseid=1 + i * args.cases // 2,
+                    )
+                )
+            convert_to_warehouse(path, warehouse, tables=["DEMO", "DRUG", "REAC"])
+            result = update_drug_event_cube(warehouse)
+            print(
+                f"{year}Q{quarter}  +{result['added']:,} -{result['removed']:,} "
+                f"reports  {result['cases']:,} cases  {result['nonzero']:,} pairs  "
+                f"{result['seconds']:5.2f}s"
+            )
+
+        began = time.perf_counter()
+        expected = _pandas_counts(warehouse)
+        print(f"pandas join and groupby  {time.perf_counter() - began:6.2f}s")
+
+        began = time.perf_counter()
+        cube = DrugEventCube(warehouse)
+        tables = cube.two_by_two()
+        tables["ror"] = (tables["a"] * tables["d"]) / (tables["b"] * tables["c"])
+        print(
+            f"cube: open and 2x2 tables of {len(tables):,} pairs "
+            f"{time.perf_counter() - began:6.2f}s"
+        )
+        pairs = zip(tables["drug"].astype(str), tables["pt"].astype(str))
+        counts = dict(zip(pairs, tables["a"].tolist()))
+        assert counts == expected.to_dict(), "the cube and pandas disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Joining DRUG and REAC on primaryid with pandas and with the sorted merge.
+
+Synthetic quarters are converted with ``build_warehouse`` (DRUG and REAC
+only) and coded with ``update_coded_arrays``. The whole join, and the PT
+counts of a few drugs, are then computed with ``pandas.merge`` on the
+warehouse rows and with ``CodedArrays.drug_reactions`` / ``pt_counts``,
+which merge the sorted arrays in chunks. Peak memory is measured with
+``tracemalloc`` (numpy and pandas allocations; the memory-mapped arrays are
+not counted).
+
+Usage::
+
+    python benchmarks/bench_join.py --quarters 8 --cases 100000
+
+On a 1-core container (880k reports, 6.3M joined rows) pandas joins the
+two tables in 0.67s with a peak of 343 MiB on top of the frames. The merge
+takes 0.41s and 13 MiB in chunks of 65,536 drug rows (the default), or 200
+MiB in chunks of 1M rows. PT counts for one drug take 0.08-0.20s with
+pandas and 0.01-0.09s with the merge, from the rarest to the most frequent
+drug.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from _faers_data import DRUGS, make_quarter_zip
+
+from SurVigilance.faers import (
+    CodedArrays,
+    build_warehouse,
+    open_warehouse,
+    update_coded_arrays,
+)
+
+
+def _frames(warehouse):
+    drug = open_warehouse(warehouse, "DRUG").to_table(columns=["primaryid", "drugname"])
+    reac = open_warehouse(warehouse, "REAC").to_table(columns=["primaryid", "pt"])
+    return (
+        drug.to_pandas().drop_duplicates(),
+        reac.to_pandas().drop_duplicates(),
+    )
+
+
+def _measure(function):
+    tracemalloc.start()
+    began = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - began
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quarters", type=int, default=8)
+    parser.add_argument("--cases", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.quarters):
+            year, quarter = 2015 + i // 4, i % 4 + 1
+            path = os.path.join(tmp, f"faers_ascii_{year}q{quarter}.zip")
+            with open(path, "wb") as f:
+                f.write(
+                    make_quarter_zip(
+                        year,
+                        quarter,
+                        args.cases,
+                        seed=i,
+                        first_caseid=1 + i * args.cases,
+                    )
+                )
+        warehouse = build_warehouse(tmp, tables=["DRUG", "REAC"])["warehouse_dir"]
+        update_coded_arrays(warehouse)
+        coded = CodedArrays(warehouse)
+        drug, reac = _frames(warehouse)
+
+        rows, seconds, peak = _measure(
+            lambda: len(drug.merge(reac, on="primaryid", copy=False))
+        )
+        print(f"full join  pandas  {seconds:5.2f}s {peak:7.0f} MiB  ({rows:,} rows)")
+        for chunk_size in (1 << 20, 1 << 16):
+            streamed, seconds, peak = _measure(
+                lambda n=chunk_size: sum(
+                    len(c) for c in coded.drug_reactions(chunk_size=n)
+                )
+            )
+            assert streamed == rows
+            print(
+                f"full join  merge   {seconds:5.2f}s {peak:7.0f} MiB  "
+                f"(chunks of {chunk_size:,} drug rows)"
+            )
+
+        for name in [DRUGS[i] for i in (0, 100, 1000)]:
+
+            def with_pandas(name=name):
+                pairs = drug[drug["drugname"] == name].merge(reac, on="primaryid")
+                return pairs.groupby("pt", observed=True).size()
+
+            expected, pandas_seconds, pandas_peak = _measure(with_pandas)
+            counts, seconds, peak = _measure(lambda name=name: coded.pt_counts(name))
+            assert counts.sum() == expected.sum()
+            print(
+                f"{name}  pandas {pandas_seconds:5.2f}s {pandas_peak:5.0f} MiB  "
+                f"merge {seconds:5.2f}s {peak:5.0f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Find the reports of a drug, and of a drug and a PT, with and without the inverted index.
+
+Synthetic quarters are converted with ``build_warehouse`` (DRUG and REAC
+only) and indexed with ``update_postings``. The primaryids of a few drugs,
+alone and together with a common PT, are then found three ways: by reading
+the DRUG and REAC tables of every zip (``read_table``), by filtering the
+Parquet warehouse, and with ``PostingsIndex``.
+
+Usage::
+
+    python benchmarks/bench_postings.py --quarters 8 --cases 100000
+
+On a 1-core container (880k reports, 2.2M drug and 2.6M reaction pairs)
+indexing takes 3.7s and stores 2.4 bytes per posting. Finding the reports
+of a drug and of the most common PT, then intersecting them, takes 3.2-3.5s
+from the zips and 0.7-1.0s from the warehouse. With the index a drug alone
+takes 0.7-14ms (241 to 217k reports) and a drug and the PT 14-38ms, most of
+it decoding the list of the PT.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from _faers_data import DRUGS, PTS, make_quarter_zip
+
+from SurVigilance.faers import (
+    PostingsIndex,
+    build_warehouse,
+    open_warehouse,
+    read_table,
+    update_postings,
+)
+
+
+def _ids(table, column, value):
+    rows = table.filter(pc.equal(table.column(column), value))
+    return pc.unique(rows.column("primaryid")).to_numpy()
+
+
+def _zip_scan(zips, drug, pt):
+    with_drug, with_pt = [], []
+    for path in zips:
+        drugs = read_table(
+            path, "DRUG", usecols=["primaryid", "drugname"], output="arrow"
+        )
+        reac = read_table(path, "REAC", usecols=["primaryid", "pt"], output="arrow")
+        with_drug.append(_ids(drugs, "drugname", drug))
+        with_pt.append(_ids(reac, "pt", pt))
+    return np.unique(np.concatenate(with_drug)), np.unique(np.concatenate(with_pt))
+
+
+def _warehouse_scan(warehouse, drug, pt):
+    drugs = open_warehouse(warehouse, "DRUG").to_table(
+        columns=["primaryid"], filter=ds.field("drugname") == drug
+    )
+    reac = open_warehouse(warehouse, "REAC").to_table(
+        columns=["primaryid"], filter=ds.field("pt") == pt
+    )
+    return (
+        np.unique(drugs.column("primaryid").to_numpy()),
+        np.unique(reac.column("primaryid").to_numpy()),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quarters", type=int, default=8)
+    parser.add_argument("--cases", type=int, default=100_000)
+    args = parser.parse_args()
+    drugs = [DRUGS[i] for i in (0, 10, 100, 1000)]
+    pt = PTS[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zips = []
+        for i in range(args.quarters):
+            year, quarter = 2015 + i // 4, i % 4 + 1
+            zips.append(os.path.join(tmp, f"faers_ascii_{year}q{quarter}.zip"))
+            with open(zips[-1], "wb") as f:
+                f.write(
+                    make_quarter_zip(
+                        year,
+                        quarter,
+                        args.cases,
+                        seed=i,
+                        first_caseid=1 + i * args.cases,
+                    )
+                )
+        warehouse = build_warehouse(tmp, tables=["DRUG", "REAC"])["warehouse_dir"]
+
+        began = time.perf_counter()
+        sizes = update_postings(warehouse)
+        print(f"indexing {time.perf_counter() - began:.1f}s")
+        for kind in ("drug", "ingredient", "pt"):
+            s = sizes[kind]
+            print(
+                f"  {kind:10s} {s['terms']:6,} terms  {s['postings']:10,} postings  "
+                f"{s['bytes'] / s['postings']:.2f} bytes each"
+            )
+        index = PostingsIndex(warehouse)
+
+        for drug in drugs:
+            began = time.perf_counter()
+            with_drug, with_pt = _zip_scan(zips, drug, pt)
+            both = np.intersect1d(with_drug, with_pt)
+            zip_seconds = time.perf_counter() - began
+            began = time.perf_counter()
+            with_drug, with_pt = _warehouse_scan(warehouse, drug, pt)
+            assert np.array_equal(np.intersect1d(with_drug, with_pt), both)
+            warehouse_seconds = time.perf_counter() - began
+            began = time.perf_counter()
+            assert np.array_equal(index.lookup("drug", drug), with_drug)
+            lookup_seconds = time.perf_counter() - began
+            began = time.perf_counter()
+            assert np.array_equal(index.cases(drug=drug, pt=pt), both)
+            cases_seconds = time.perf_counter() - began
+            print(
+                f"{drug}  zips {zip_seconds:5.2f}s  warehouse {warehouse_seconds:5.2f}s"
+                f"  index: drug {lookup_seconds * 1000:5.1f}ms"
+                f"  drug and PT {cases_seconds * 1000:5.1f}ms"
+                f"  ({len(with_drug):,} reports, {len(both):,} with the PT)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure download throughput with and without a UI-like progress callback.
+
+The callback imitates a Streamlit progress bar update: it serialises the
+event and pays a fixed cost per call (``--callback-cost-us``), roughly what
+sending one delta to the browser costs. Four set-ups are compared:
+
+* 8 KiB chunks, no callback
+* 8 KiB chunks, callback on every chunk (the behaviour before ProgressPolicy)
+* adaptive chunks, no callback
+* adaptive chunks, callback behind the default ProgressPolicy
+
+Usage::
+
+    python benchmarks/bench_progress_callback.py --size-mb 256
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from _server import start_server
+
+from SurVigilance.ui.scrapers import ProgressPolicy, download_file
+
+
+def make_callback(cost_seconds):
+    calls = [0]
+
+    def callback(evt):
+        calls[0] += 1
+        json.dumps(evt)
+        end = time.perf_counter() + cost_seconds
+        while time.perf_counter() < end:
+            pass
+
+    return callback, calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--callback-cost-us", type=float, default=200.0)
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    server, base = start_server({"/bench.bin": payload})
+    url = base + "/bench.bin"
+
+    setups = [
+        ("8 KiB, no callback", 8192, False, None),
+        ("8 KiB, every chunk", 8192, True, ProgressPolicy(0, 0)),
+        ("adaptive, no callback", None, False, None),
+        ("adaptive, ProgressPolicy()", None, True, ProgressPolicy()),
+    ]
+
+    print(f"{'set-up':<28} {'MB/s':>8} {'callbacks':>10}")
+    try:
+        for name, chunk_size, with_callback, policy in setups:
+            callback, calls = make_callback(args.callback_cost_us / 1e6)
+            with tempfile.TemporaryDirectory() as tmp:
+                began = time.perf_counter()
+                download_file(
+                    url=url,
+                    download_dir=tmp,
+                    callback=callback if with_callback else None,
+                    num_retries=1,
+                    progress_policy=policy,
+                    chunk_size=chunk_size,
+                )
+                elapsed = time.perf_counter() - began
+            print(f"{name:<28} {args.size_mb / elapsed:>8.1f} {calls[0]:>10}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
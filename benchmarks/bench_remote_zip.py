@@ -0,0 +1,67 @@
+"""
+Compare downloading a whole FAERS quarter with fetching only some of its tables.
+
+A synthetic quarter is served from a local server with a per-stream
+bandwidth cap (``--mbps``). The full archive is fetched with
+``download_file`` and the tables (``--members``, default DEMO, DRUG and
+REAC) with ``fetch_zip_members``, which
+reads the central directory with one range request and then requests only
+the members' bytes.
+
+Usage::
+
+    python benchmarks/bench_remote_zip.py --cases 200000 --mbps 10
+    python benchmarks/bench_remote_zip.py --cases 200000 --mbps 10 --members REAC
+
+The gain is the share of the archive's bytes in the other members.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from _faers_data import make_quarter_zip
+from _server import start_server
+
+from SurVigilance.ui.scrapers import download_file, fetch_zip_members
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", type=int, default=200_000)
+    parser.add_argument("--mbps", type=float, default=20.0)
+    parser.add_argument("--members", nargs="+", default=["DEMO", "DRUG", "REAC"])
+    args = parser.parse_args()
+
+    archive = make_quarter_zip(2023, 1, args.cases)
+    server, base = start_server(
+        {"/faers_ascii_2023q1.zip": archive}, per_stream_bps=args.mbps * 1e6
+    )
+    url = base + "/faers_ascii_2023q1.zip"
+    print(f"archive {len(archive) / 1e6:.1f} MB at {args.mbps} MB/s")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            began = time.perf_counter()
+            download_file(url, tmp, num_retries=1)
+            full = time.perf_counter() - began
+        print(f"whole archive        {full:6.2f}s  {len(archive) / 1e6:7.1f} MB")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            events = []
+            began = time.perf_counter()
+            fetch_zip_members(url, args.members, tmp, callback=events.append)
+            partial = time.perf_counter() - began
+        fetched = events[-1]["fetched_bytes"]
+        label = ", ".join(args.members)
+        print(f"{label:<20} {partial:6.2f}s  {fetched / 1e6:7.1f} MB")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
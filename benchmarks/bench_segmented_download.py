@@ -0,0 +1,52 @@
+"""
+Compare single-stream and segmented downloads against a local range server.
+
+Each connection to the server is capped at ``--stream-mbps`` to mimic a link
+where one TCP stream cannot fill the available bandwidth.
+
+Usage::
+
+    python benchmarks/bench_segmented_download.py --size-mb 64 --stream-mbps 20
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from _server import start_server
+
+from SurVigilance.ui.scrapers import download_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--stream-mbps", type=float, default=20.0)
+    parser.add_argument("--segments", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    server, base = start_server(
+        {"/faers_ascii_bench.zip": payload},
+        per_stream_bps=int(args.stream_mbps * 1024 * 1024),
+    )
+    url = base + "/faers_ascii_bench.zip"
+
+    print(f"{'segments':>8} {'seconds':>8} {'MB/s':>8}")
+    try:
+        for n in args.segments:
+            with tempfile.TemporaryDirectory() as tmp:
+                began = time.perf_counter()
+                download_file(url=url, download_dir=tmp, segments=n, num_retries=1)
+                elapsed = time.perf_counter() - began
+            print(f"{n:>8} {elapsed:>8.2f} {args.size_mb / elapsed:>8.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+The PT history of a drug over many quarters, re-aggregated and materialized.
+
+Synthetic quarters are converted with ``build_warehouse`` (DRUG and REAC
+only); ``update_drug_pt_series`` then appends them to the series one at a
+time. The per-quarter PT counts of a few drugs are computed by
+re-aggregating every quarter of the warehouse with Arrow (filter DRUG by
+name, join REAC, group by quarter and PT) and read with
+``DrugPTSeries.history``.
+
+Usage::
+
+    python benchmarks/bench_series.py --quarters 40 --cases 20000
+
+On a 1-core container (40 quarters of 20,000 cases) coding the quarters
+and building the series of 3.9M (quarter, drug, PT) rows takes 2.6s, and
+opening it 2ms. The PT history of a drug over the 40 quarters takes
+0.34-0.73s to re-aggregate and 4-23ms to read from the series, from the
+rarest to the most frequent drug.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from _faers_data import DRUGS, make_quarter_zip
+
+from SurVigilance.faers import (
+    DrugPTSeries,
+    build_warehouse,
+    open_warehouse,
+    update_drug_pt_series,
+)
+
+
+def _reaggregate(warehouse, drug):
+    keys = ["primaryid", "year", "quarter"]
+    drugs = open_warehouse(warehouse, "DRUG").to_table(
+        columns=keys, filter=ds.field("drugname") == drug
+    )
+    reac = open_warehouse(warehouse, "REAC").to_table(
+        columns=[*keys, "pt"],
+        filter=ds.field("primaryid").isin(pc.unique(drugs.column("primaryid"))),
+    )
+    reac = reac.set_column(3, "pt", reac.column("pt").cast(pa.string()))
+    pairs = reac.join(drugs.group_by(keys).aggregate([]), keys)
+    pairs = pairs.group_by([*keys, "pt"]).aggregate([])
+    return pairs.group_by(["year", "quarter", "pt"]).aggregate([("primaryid", "count")])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quarters", type=int, default=40)
+    parser.add_argument("--cases", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.quarters):
+            year, quarter = 2005 + i // 4, i % 4 + 1
+            path = os.path.join(tmp, f"faers_ascii_{year}q{quarter}.zip")
+            with open(path, "wb") as f:
+                f.write(
+                    make_quarter_zip(
+                        year,
+                        quarter,
+                        args.cases,
+                        seed=i,
+                        first_caseid=1 + i * args.cases,
+                    )
+                )
+        warehouse = build_warehouse(tmp, tables=["DRUG", "REAC"])["warehouse_dir"]
+
+        began = time.perf_counter()
+        result = update_drug_pt_series(warehouse)
+        print(
+            f"series of {len(result['quarters'])} quarters, {result['rows']:,} rows: "
+            f"{time.perf_counter() - began:.1f}s"
+        )
+        began = time.perf_counter()
+        series = DrugPTSeries(warehouse)
+        print(f"open series {(time.perf_counter() - began) * 1000:.1f}ms")
+
+        for drug in [DRUGS[i] for i in (0, 100, 1000)]:
+            began = time.perf_counter()
+            expected = _reaggregate(warehouse, drug)
+            seconds = time.perf_counter() - began
+            began = time.perf_counter()
+            history = series.history(drug)
+            history_seconds = time.perf_counter() - began
+            assert (
+                history["count"].sum()
+                == pc.sum(expected.column("primaryid_count")).as_py()
+            )
+            print(
+                f"{drug}  re-aggregate {seconds:5.2f}s  "
+                f"history {history_seconds * 1000:5.1f}ms  ({len(history):,} rows)"
+            )
+
+
+if __name__ == "__main__":
+    main()
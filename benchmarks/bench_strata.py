@@ -0,0 +1,121 @@
+"""
+Age, sex and country stratified report counts with pandas and with ``stratify``.
+
+Synthetic quarters (ages in years, months, weeks, days and decades) are
+converted with ``build_warehouse`` (DEMO, DRUG and REAC), which stores every
+age in years as ``age_years``, and coded with ``update_coded_arrays``. For a
+few drugs, from the most to the least reported, the reports are then counted
+by age bin, sex and country of occurrence: with pandas, by joining the DRUG
+rows of the drug with DEMO, converting the ages from ``age_cod`` and grouping
+with ``pandas.cut``; and with ``stratify`` on the per-report arrays, with
+and without a PT axis.
+
+Usage::
+
+    python benchmarks/bench_strata.py --quarters 8 --cases 100000
+
+On a 1-core container (880k reports) the pandas counts take 0.14-0.44s per
+drug, from the least to the most reported, on top of 1.1s to load DEMO and
+DRUG once. ``stratify`` takes 0.002-0.014s per drug from the memory-mapped
+arrays, and 0.003-0.063s with the reports of 10 PTs as a fourth axis.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from _faers_data import DRUGS, PTS, make_quarter_zip
+
+from SurVigilance.faers import (
+    CodedArrays,
+    build_warehouse,
+    open_warehouse,
+    stratify,
+    update_coded_arrays,
+)
+from SurVigilance.faers._schema import AGE_UNITS
+from SurVigilance.faers.strata import AGE_BINS
+
+
+def _frames(warehouse):
+    keys = ["primaryid", "year", "quarter"]
+    demo = open_warehouse(warehouse, "DEMO").to_table(
+        columns=[*keys, "age", "age_cod", "sex", "occr_country"]
+    )
+    drug = open_warehouse(warehouse, "DRUG").to_table(columns=[*keys, "drugname"])
+    return demo.to_pandas(), drug.to_pandas().drop_duplicates()
+
+
+def _with_pandas(demo, drug, name):
+    # A primaryid can be in two quarters, so match the quarter as well.
+    reports = drug.loc[drug["drugname"] == name, ["primaryid", "year", "quarter"]]
+    rows = reports.merge(demo, on=["primaryid", "year", "quarter"])
+    units = rows["age_cod"].astype(str).map(AGE_UNITS).astype(float)
+    age = pd.cut(rows["age"] * units, [*AGE_BINS, np.inf], right=False)
+    sex = rows["sex"].astype(str).where(rows["sex"].isin(["F", "M"]), "unknown")
+    return rows.groupby(
+        [age, sex, rows["occr_country"].astype(str)], observed=True
+    ).size()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quarters", type=int, default=8)
+    parser.add_argument("--cases", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.quarters):
+            year, quarter = 2015 + i // 4, i % 4 + 1
+            path = os.path.join(tmp, f"faers_ascii_{year}q{quarter}.zip")
+            with open(path, "wb") as f:
+                f.write(
+                    make_quarter_zip(
+                        year,
+                        quarter,
+                        args.cases,
+                        seed=i,
+                        first_caseid=1 + i * args.cases,
+                    )
+                )
+        warehouse = build_warehouse(tmp, tables=["DEMO", "DRUG", "REAC"])[
+            "warehouse_dir"
+        ]
+        update_coded_arrays(warehouse)
+        coded = CodedArrays(warehouse)
+        print(f"{len(coded.reports):,} reports")
+
+        began = time.perf_counter()
+        demo, drug = _frames(warehouse)
+        print(f"pandas: load DEMO and DRUG  {time.perf_counter() - began:5.2f}s")
+
+        for name in [DRUGS[i] for i in (0, 100, 1000)]:
+            began = time.perf_counter()
+            expected = _with_pandas(demo, drug, name)
+            pandas_seconds = time.perf_counter() - began
+
+            began = time.perf_counter()
+            strata = stratify(coded, name)
+            seconds = time.perf_counter() - began
+            began = time.perf_counter()
+            stratify(coded, name, pts=PTS[:10])
+            pt_seconds = time.perf_counter() - began
+
+            known = strata.counts[: len(AGE_BINS)]
+            assert known.sum() == expected.sum(), "stratify and pandas disagree"
+            print(
+                f"{name}  {strata.counts.sum():7,} reports  pandas "
+                f"{pandas_seconds:5.3f}s  stratify {seconds:5.3f}s  "
+                f"with 10 PTs {pt_seconds:5.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare a drug query over the quarterly zips with the same query on the warehouse.
+
+Synthetic quarters are written to a folder and converted with
+``build_warehouse``. The query (every DRUG row of one drug, with its
+primaryid and role) is then answered twice: by streaming the DRUG table of
+every zip with ``read_table`` and filtering, and by ``open_warehouse`` with
+a filter on ``drugname``, where the row-group statistics of the sorted DRUG
+files let the scan skip most of the data.
+
+Usage::
+
+    python benchmarks/bench_warehouse.py --quarters 8 --cases 100000
+
+On a 4-core container (8 quarters, 465 MB of text in 79 MB of zips): build
+15.5s, warehouse 66 MB; the query takes 1.62s over the zips and 0.37s on the
+warehouse, which reads 8 of the 24 DRUG row groups.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from _faers_data import DRUGS, make_quarter_zip
+
+from SurVigilance.faers import build_warehouse, open_warehouse, read_table
+
+
+def _folder_bytes(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quarters", type=int, default=8)
+    parser.add_argument("--cases", type=int, default=100_000)
+    parser.add_argument("--drug", default=DRUGS[40])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        text_bytes = 0
+        for i in range(args.quarters):
+            year, quarter = 2015 + i // 4, i % 4 + 1
+            path = os.path.join(tmp, f"faers_ascii_{year}q{quarter}.zip")
+            with open(path, "wb") as f:
+                f.write(make_quarter_zip(year, quarter, args.cases, seed=i))
+            with zipfile.ZipFile(path) as zf:
+                text_bytes += sum(info.file_size for info in zf.infolist())
+        zip_bytes = _folder_bytes(tmp)
+
+        result = build_warehouse(tmp)
+        warehouse = result["warehouse_dir"]
+        print(
+            f"{args.quarters} quarters: {text_bytes / 1e6:.0f} MB of text in "
+            f"{zip_bytes / 1e6:.0f} MB of zips; build {result['seconds']:.1f}s, "
+            f"warehouse {_folder_bytes(warehouse) / 1e6:.0f} MB"
+        )
+
+        began = time.perf_counter()
+        rows = 0
+        for q in result["quarters"]:
+            for chunk in read_table(
+                q["zip_path"],
+                "DRUG",
+                chunksize=500_000,
+                usecols=["primaryid", "drugname", "role_cod"],
+                output="arrow",
+            ):
+                rows += pc.sum(pc.equal(chunk.column("drugname"), args.drug)).as_py()
+        print(f"zips       {time.perf_counter() - began:7.2f}s  {rows} rows")
+
+        began = time.perf_counter()
+        drug = open_warehouse(warehouse, "DRUG")
+        wanted = ds.field("drugname") == args.drug
+        table = drug.to_table(columns=["primaryid", "role_cod"], filter=wanted)
+        seconds = time.perf_counter() - began
+        groups = sum(len(f.split_by_row_group()) for f in drug.get_fragments())
+        read = sum(len(f.split_by_row_group(wanted)) for f in drug.get_fragments())
+        print(
+            f"warehouse  {seconds:7.2f}s  {table.num_rows} rows, "
+            f"{read} of {groups} row groups read"
+        )
+
+
+if __name__ == "__main__":
+    main()
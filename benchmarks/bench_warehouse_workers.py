@@ -0,0 +1,58 @@
+"""
+Scaling of ``build_warehouse`` with the number of worker processes.
+
+The same synthetic quarters are converted into a fresh warehouse with 1, 2,
+4 and 8 workers (``--workers``); the wall time and the speed-up over one
+worker are printed for each.
+
+Usage::
+
+    python benchmarks/bench_warehouse_workers.py --quarters 8 --cases 100000
+
+The speed-up is bounded by the number of cores, and every worker process
+first spends about 1.4s importing the package. In the 1-core container used
+for development there is nothing to gain: 12.3s with 1 worker, then 21.3s,
+26.2s and 31.2s with 2, 4 and 8.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from _faers_data import make_quarter_zip
+
+from SurVigilance.faers import build_warehouse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quarters", type=int, default=8)
+    parser.add_argument("--cases", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} cores, {args.quarters} quarters of {args.cases} cases")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.quarters):
+            year, quarter = 2015 + i // 4, i % 4 + 1
+            path = os.path.join(tmp, f"faers_ascii_{year}q{quarter}.zip")
+            with open(path, "wb") as f:
+                f.write(make_quarter_zip(year, quarter, args.cases, seed=i))
+
+        baseline = None
+        for workers in args.workers:
+            result = build_warehouse(
+                tmp, os.path.join(tmp, f"warehouse-{workers}"), workers=workers
+            )
+            baseline = baseline or result["seconds"]
+            print(
+                f"workers {workers:2d}  {result['seconds']:6.1f}s  "
+                f"{baseline / result['seconds']:4.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
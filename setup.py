@@ -31,6 +31,9 @@ REQUIRES = [
     "beautifulsoup4>=4.12.0",
     "lxml>=6.0.0",
     "openpyxl>=3.1.0",
+    "aiohttp>=3.8",
+    "pyarrow>=14.0",
+    "scipy>=1.8",
 ]
 
 setup(
@@ -0,0 +1,292 @@
+"""
+Shared fixtures for the download and FAERS tests.
+
+The download engine is exercised against a small HTTP server running on
+localhost that supports ``Range`` requests, so that resuming and partial
+transfers can be checked without depending on a remote website.
+"""
+
+import hashlib
+import io
+import random
+import threading
+import zipfile
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+def make_zip(size: int, seed: int = 0) -> bytes:
+    """Return a valid zip archive of roughly ``size`` bytes of random data."""
+    rng = random.Random(seed)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("ASCII/DEMO99Q1.txt", rng.randbytes(size))
+        zf.writestr("ASCII/REAC99Q1.txt", b"primaryid$caseid$pt$drug_rec_act\n")
+    return buf.getvalue()
+
+
+FAERS_HEADERS = {
+    "DEMO": "primaryid$caseid$caseversion$i_f_code$event_dt$mfr_dt$init_fda_dt"
+    "$fda_dt$rept_cod$auth_num$mfr_num$mfr_sndr$lit_ref$age$age_cod$age_grp$sex"
+    "$e_sub$wt$wt_cod$rept_dt$to_mfr$occp_cod$reporter_country$occr_country",
+    "DRUG": "primaryid$caseid$drug_seq$role_cod$drugname$prod_ai$val_vbm$route"
+    "$dose_vbm$cum_dose_chr$cum_dose_unit$dechal$rechal$lot_num$exp_dt$nda_num"
+    "$dose_amt$dose_unit$dose_form$dose_freq",
+    "REAC": "primaryid$caseid$pt$drug_rec_act",
+    "OUTC": "primaryid$caseid$outc_cod",
+    "RPSR": "primaryid$caseid$rpsr_cod",
+    "THER": "primaryid$caseid$dsg_drug_seq$start_dt$end_dt$dur$dur_cod",
+    "INDI": "primaryid$caseid$indi_drug_seq$indi_pt",
+}
+
+AERS_HEADERS = {
+    "DEMO": "ISR$CASE$I_F_COD$FOLL_SEQ$IMAGE$EVENT_DT$MFR_DT$FDA_DT$REPT_COD"
+    "$MFR_NUM$MFR_SNDR$AGE$AGE_COD$GNDR_COD$E_SUB$WT$WT_COD$REPT_DT$OCCP_COD"
+    "$DEATH_DT$TO_MFR$CONFID$REPORTER_COUNTRY",
+    "DRUG": "ISR$DRUG_SEQ$ROLE_COD$DRUGNAME$VAL_VBM$ROUTE$DOSE_VBM$DECHAL$RECHAL"
+    "$LOT_NUM$EXP_DT$NDA_NUM",
+    "REAC": "ISR$PT",
+    "OUTC": "ISR$OUTC_COD",
+    "RPSR": "ISR$RPSR_COD",
+    "THER": "ISR$DRUG_SEQ$START_DT$END_DT$DUR$DUR_COD",
+    "INDI": "ISR$DRUG_SEQ$INDI_PT",
+}
+
+FAERS_DRUGS = ["ASPIRIN", "METFORMIN", "HUMIRA", "LIPITOR", "ZOLOFT", "WARFARIN"]
+FAERS_PTS = ["Nausea", "Headache", "Rash", "Dizziness", "Death", "Fatigue"]
+
+
+def faers_rows(year: int, quarter: int, cases: int = 20, seed: int = 0) -> dict:
+    """
+    Return synthetic FAERS tables as ``{table: [row dict, ...]}``.
+
+    Case ``i`` has caseid ``1000 + i`` and primaryid ``caseid * 100 +
+    caseversion``; every third case also has a second version.
+    """
+    rng = random.Random(seed * 10_000 + year * 10 + quarter)
+    tables = {name: [] for name in FAERS_HEADERS}
+    for i in range(cases):
+        caseid = 1000 + i
+        for version in (1, 2) if i % 3 == 0 else (1,):
+            primaryid = caseid * 100 + version
+            key = {"primaryid": str(primaryid), "caseid": str(caseid)}
+            tables["DEMO"].append(
+                {
+                    **key,
+                    "caseversion": str(version),
+                    "i_f_code": "I" if version == 1 else "F",
+                    "fda_dt": f"{year}{3 * quarter:02d}{version:02d}",
+                    "age": str(rng.randint(1, 90)),
+                    "age_cod": rng.choice(["YR", "YR", "MON", "DEC"]),
+                    "sex": rng.choice(["F", "M", ""]),
+                    "reporter_country": rng.choice(["US", "JP", "FR"]),
+                    "occr_country": rng.choice(["US", "JP", "FR"]),
+                }
+            )
+            drugs = rng.sample(FAERS_DRUGS, rng.randint(1, 3))
+            for seq, drug in enumerate(drugs, start=1):
+                tables["DRUG"].append(
+                    {
+                        **key,
+                        "drug_seq": str(seq),
+                        "role_cod": "PS" if seq == 1 else rng.choice(["SS", "C"]),
+                        "drugname": drug,
+                        "prod_ai": drug.lower(),
+                    }
+                )
+                tables["THER"].append({**key, "dsg_drug_seq": str(seq)})
+                tables["INDI"].append(
+                    {**key, "indi_drug_seq": str(seq), "indi_pt": "Pain"}
+                )
+            for pt in rng.sample(FAERS_PTS, rng.randint(1, 3)):
+                tables["REAC"].append({**key, "pt": pt})
+            for outc in rng.sample(["DE", "HO", "OT"], rng.randint(0, 2)):
+                tables["OUTC"].append({**key, "outc_cod": outc})
+            tables["RPSR"].append({**key, "rpsr_cod": "HP"})
+    return tables
+
+
+_AERS_NAMES = {
+    "ISR": "primaryid",
+    "CASE": "caseid",
+    "GNDR_COD": "sex",
+    "DRUG_SEQ": "drug_seq",
+}
+
+
+def make_faers_zip(
+    year: int = 2024,
+    quarter: int = 1,
+    cases: int = 20,
+    seed: int = 0,
+    legacy: bool = False,
+) -> bytes:
+    """
+    Return a FAERS quarterly ASCII zip built from :func:`faers_rows`.
+
+    With ``legacy=True`` the archive uses the pre-2012Q4 AERS layout:
+    upper-case ISR-based columns, lines ending in ``$`` and ``ascii/``
+    members with a ``.TXT`` suffix.
+    """
+    tables = faers_rows(year, quarter, cases, seed)
+    yy = f"{year % 100:02d}Q{quarter}"
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, rows in tables.items():
+            if legacy:
+                columns = AERS_HEADERS[name].split("$")
+                lines = [AERS_HEADERS[name] + "$"]
+                for row in rows:
+                    values = []
+                    for col in columns:
+                        key = _AERS_NAMES.get(col, col.lower())
+                        if name == "INDI" and col == "DRUG_SEQ":
+                            key = "indi_drug_seq"
+                        if name == "THER" and col == "DRUG_SEQ":
+                            key = "dsg_drug_seq"
+                        values.append(row.get(key, ""))
+                    lines.append("$".join(values) + "$")
+                member = f"ascii/{name}{yy}.TXT"
+            else:
+                columns = FAERS_HEADERS[name].split("$")
+                lines = [FAERS_HEADERS[name]]
+                lines += ["$".join(row.get(c, "") for c in columns) for row in rows]
+                member = f"ASCII/{name}{yy}.txt"
+            zf.writestr(member, "\r\n".join(lines) + "\r\n")
+        zf.writestr("ASCII/ASC_NTS.pdf", b"%PDF-1.4 readme")
+    return buf.getvalue()
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """Serves ``server.files`` (path -> bytes) with single-range support."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _lookup(self):
+        body = self.server.files.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        return body
+
+    @staticmethod
+    def _etag(body):
+        return '"' + hashlib.md5(body).hexdigest() + '"'
+
+    def _common_headers(self, body):
+        self.send_header("ETag", self._etag(body))
+        self.send_header("Last-Modified", formatdate(0, usegmt=True))
+        if self.server.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+
+    def setup(self):
+        super().setup()
+        self.server.connections.add(self.client_address)
+
+    def _not_modified(self, body):
+        if self.headers.get("If-None-Match") == self._etag(body):
+            self.send_response(304)
+            self.send_header("ETag", self._etag(body))
+            self.end_headers()
+            return True
+        return False
+
+    def do_HEAD(self):
+        self.server.requests.append(("HEAD", self.path, dict(self.headers)))
+        body = self._lookup()
+        if body is None or self._not_modified(body):
+            return
+        self.send_response(200)
+        self._common_headers(body)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path, dict(self.headers)))
+        retry_after = self.server.reject.pop(self.path, None)
+        if retry_after is not None:
+            self.send_response(503)
+            self.send_header("Retry-After", str(retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self._lookup()
+        if body is None or self._not_modified(body):
+            return
+
+        start, end = 0, len(body) - 1
+        status = 200
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range.startswith('"') and if_range != self._etag(body):
+            range_header = None
+        if range_header and self.server.accept_ranges:
+            spec = range_header.split("=", 1)[1]
+            first, _, last = spec.partition("-")
+            if first:
+                start = int(first)
+                end = int(last) if last else len(body) - 1
+            else:  # suffix range: the last ``last`` bytes
+                start = max(0, len(body) - int(last))
+                end = len(body) - 1
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            end = min(end, len(body) - 1)
+            status = 206
+
+        payload = body[start : end + 1]
+        self.send_response(status)
+        self._common_headers(body)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+
+        cut = self.server.fail_after.pop(self.path, None)
+        if cut is not None:
+            # Simulate a dropped connection part way through the transfer.
+            self.wfile.write(payload[:cut])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def range_server():
+    """
+    Start a local HTTP server and yield it.
+
+    Tests add content with ``server.files["/name.zip"] = b"..."`` and build
+    URLs with ``server.url("/name.zip")``. ``server.fail_after[path] = n``
+    makes the next GET for ``path`` drop the connection after ``n`` bytes and
+    ``server.reject[path] = seconds`` answers it with 503 and Retry-After.
+    ``server.requests`` and ``server.connections`` record what was received.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+    server.daemon_threads = True
+    server.files = {}
+    server.requests = []
+    server.connections = set()
+    server.fail_after = {}
+    server.reject = {}
+    server.accept_ranges = True
+    server.url = lambda path: f"http://127.0.0.1:{server.server_port}{path}"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
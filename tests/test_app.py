@@ -2,8 +2,13 @@
 Test file to check if the landing page is loaded correctly and all buttons are displayed
 """
 
+import importlib
+import os
+
 from streamlit.testing.v1 import AppTest
 
+from SurVigilance.ui.scrapers import archive_store, download_governor
+
 
 def setup_app():
     # Load the app relative to the repo root where tests run
@@ -59,3 +64,63 @@ def test_daen_selection():
     at.run()
     at.button(key="daen").click().run()
     assert at.session_state["selected_database"] == "AU DAEN"
+
+
+def test_new_session_keeps_shared_download_limits():
+    at = setup_app()
+    at.run()
+    try:
+        download_governor.configure_download_limits(5e6, max_connections_per_host=3)
+        other = setup_app()
+        other.run()
+        limits = download_governor.get_governor().limits
+        assert limits.max_bytes_per_sec == 5e6
+        assert limits.max_connections_per_host == 3
+        assert other.number_input(key="max_download_mbps").value == 5.0
+
+        other.number_input(key="max_connections_per_host").set_value(2).run()
+        assert download_governor.get_governor().limits.max_connections_per_host == 2
+    finally:
+        download_governor.configure_download_limits()
+
+
+def test_new_session_keeps_shared_archive_store(tmp_path):
+    at = setup_app()
+    at.run()
+    archive_store.configure_archive_store(None)
+    at.run()
+    assert archive_store.get_archive_store() is None
+    assert at.text_input(key="archive_store_dir").value == ""
+    try:
+        at.text_input(key="archive_store_dir").input(str(tmp_path)).run()
+        assert archive_store.get_archive_store().root == str(tmp_path)
+
+        other = setup_app()
+        other.run()
+        assert archive_store.get_archive_store().root == str(tmp_path)
+        assert other.text_input(key="archive_store_dir").value == str(tmp_path)
+    finally:
+        archive_store.configure_archive_store(None)
+
+
+def test_pages_share_the_download_governor_of_the_package(monkeypatch):
+    # The pages import the scrapers as the top-level ``scrapers`` package.
+    monkeypatch.syspath_prepend(os.path.join("..", "SurVigilance", "ui"))
+    pages_copy = importlib.import_module("scrapers.download_governor")
+    assert pages_copy is download_governor
+    assert importlib.import_module("scrapers._downloads").get_governor() is (
+        download_governor.get_governor()
+    )
+
+
+def test_sync_uses_the_archive_store_set_by_the_pages(monkeypatch, tmp_path):
+    from SurVigilance.faers import sync
+
+    monkeypatch.syspath_prepend(os.path.join("..", "SurVigilance", "ui"))
+    pages_copy = importlib.import_module("scrapers.archive_store")
+    assert pages_copy is archive_store
+    try:
+        pages_copy.configure_archive_store(str(tmp_path))
+        assert sync.get_archive_store().root == str(tmp_path)
+    finally:
+        archive_store.configure_archive_store(None)
@@ -0,0 +1,116 @@
+"""
+Test file to check that downloads are shared through the content-addressed archive store
+"""
+
+import asyncio
+import os
+import stat
+
+from conftest import make_zip
+
+from SurVigilance.ui.scrapers import ArchiveStore, adownload_file, download_file
+from SurVigilance.ui.scrapers import archive_store as store_module
+from SurVigilance.ui.scrapers.download_manifest import file_sha256
+
+PAYLOAD = make_zip(128 * 1024)
+
+
+def test_second_data_folder_is_linked_without_download(range_server, tmp_path):
+    range_server.files["/faers_ascii_2095q1.zip"] = PAYLOAD
+    url = range_server.url("/faers_ascii_2095q1.zip")
+    store = ArchiveStore(str(tmp_path / "store"))
+
+    first = download_file(url, str(tmp_path / "alice" / "faers"), archive_store=store)
+    range_server.requests.clear()
+    events = []
+    second = download_file(
+        url,
+        str(tmp_path / "bob" / "faers"),
+        callback=events.append,
+        archive_store=store,
+    )
+
+    # Only a conditional HEAD checks that the stored copy is current.
+    assert [r[0] for r in range_server.requests] == ["HEAD"]
+    assert os.path.samefile(first, second)
+    entry = store.lookup(url)
+    assert os.path.samefile(entry["path"], second)
+    assert entry["sha256"] == file_sha256(second)
+    assert not os.stat(entry["path"]).st_mode & stat.S_IWUSR
+    complete = [e for e in events if e["type"] == "download_complete"]
+    assert complete[-1]["shared"] and complete[-1]["skipped"]
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = ArchiveStore(str(tmp_path / "store"))
+    a = tmp_path / "a" / "x.zip"
+    b = tmp_path / "b" / "x.zip"
+    for path in (a, b):
+        path.parent.mkdir()
+        path.write_bytes(PAYLOAD)
+
+    blob_a = store.add(str(a), "http://mirror-a/x.zip")
+    blob_b = store.add(str(b), "http://mirror-b/x.zip")
+
+    assert blob_a == blob_b
+    assert os.path.samefile(a, b)
+    assert len(list((tmp_path / "store" / "sha256").rglob("*.zip"))) == 1
+
+
+def test_missing_blob_falls_back_to_download(range_server, tmp_path):
+    range_server.files["/faers_ascii_2095q2.zip"] = PAYLOAD
+    url = range_server.url("/faers_ascii_2095q2.zip")
+    store = ArchiveStore(str(tmp_path / "store"))
+    download_file(url, str(tmp_path / "alice"), archive_store=store)
+    blob = store.lookup(url)["path"]
+    os.chmod(blob, stat.S_IWUSR | stat.S_IRUSR)
+    os.remove(blob)
+    range_server.requests.clear()
+
+    path = download_file(url, str(tmp_path / "bob"), archive_store=store)
+
+    assert [r[0] for r in range_server.requests] == ["GET"]
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert os.path.samefile(store.lookup(url)["path"], path)
+
+
+def test_republished_file_is_downloaded_again(range_server, tmp_path):
+    url = range_server.url("/faers_ascii_2095q3.zip")
+    store = ArchiveStore(str(tmp_path / "store"))
+    range_server.files["/faers_ascii_2095q3.zip"] = PAYLOAD
+    download_file(url, str(tmp_path / "alice"), archive_store=store)
+
+    republished = make_zip(128 * 1024, seed=1)
+    range_server.files["/faers_ascii_2095q3.zip"] = republished
+    events = []
+    path = download_file(
+        url, str(tmp_path / "bob"), callback=events.append, archive_store=store
+    )
+    with open(path, "rb") as f:
+        assert f.read() == republished
+    assert any("out of date" in e.get("message", "") for e in events)
+    assert store.lookup(url)["sha256"] == file_sha256(path)
+
+    range_server.files["/faers_ascii_2095q3.zip"] = PAYLOAD
+    path = asyncio.run(
+        adownload_file(url, str(tmp_path / "carol"), archive_store=store)
+    )
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+
+
+def test_link_falls_back_to_copy_across_file_systems(tmp_path, monkeypatch):
+    def cross_device(*args):
+        raise OSError(18, "Invalid cross-device link")
+
+    monkeypatch.setattr(store_module.os, "link", cross_device)
+    monkeypatch.setattr(store_module, "_reflink", cross_device)
+    src = tmp_path / "src.zip"
+    src.write_bytes(PAYLOAD)
+
+    method = store_module.link_file(str(src), str(tmp_path / "dst.zip"))
+
+    assert method == "copy"
+    assert (tmp_path / "dst.zip").read_bytes() == PAYLOAD
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["dst.zip", "src.zip"]
@@ -0,0 +1,157 @@
+"""
+Test file to check the asyncio download functions
+"""
+
+import asyncio
+import os
+
+import pytest
+import requests
+from conftest import make_zip
+
+from SurVigilance.ui.scrapers import (
+    DownloadManifest,
+    adownload_file,
+    adownload_files,
+    download_file,
+)
+from SurVigilance.ui.scrapers._downloads import read_sidecar
+
+
+def test_adownload_file_matches_sync_events(range_server, tmp_path):
+    body = make_zip(300_000)
+    range_server.files["/a.zip"] = body
+    events = []
+
+    path = asyncio.run(
+        adownload_file(
+            range_server.url("/a.zip"), str(tmp_path), callback=events.append
+        )
+    )
+
+    with open(path, "rb") as f:
+        assert f.read() == body
+    types = [e["type"] for e in events]
+    assert types[0] == "download_start"
+    assert types[-1] == "download_complete"
+    assert (
+        events[-1]["sha256"] == DownloadManifest(str(tmp_path)).get("a.zip")["sha256"]
+    )
+
+    events.clear()
+    asyncio.run(
+        adownload_file(
+            range_server.url("/a.zip"), str(tmp_path), callback=events.append
+        )
+    )
+    assert events[-1]["skipped"] is True
+
+
+def test_adownload_file_resumes_sync_partial(range_server, tmp_path):
+    body = make_zip(400_000)
+    range_server.files["/r.zip"] = body
+    range_server.fail_after["/r.zip"] = 150_000
+    url = range_server.url("/r.zip")
+
+    with pytest.raises((requests.RequestException, OSError)):
+        download_file(url, str(tmp_path), num_retries=1)
+    partial = os.path.getsize(os.path.join(str(tmp_path), "r.zip.part"))
+    assert partial > 0
+
+    path = asyncio.run(adownload_file(url, str(tmp_path), num_retries=1))
+
+    with open(path, "rb") as f:
+        assert f.read() == body
+    ranges = [h.get("Range") for m, _, h in range_server.requests if m == "GET"]
+    assert ranges == [None, f"bytes={partial}-"]
+
+
+def test_adownload_file_retries_after_retry_delay(range_server, tmp_path):
+    body = make_zip(400_000)
+    range_server.files["/d.zip"] = body
+    range_server.fail_after["/d.zip"] = 150_000
+
+    async def run():
+        began = asyncio.get_running_loop().time()
+        path = await adownload_file(
+            range_server.url("/d.zip"), str(tmp_path), num_retries=2, retry_delay=0
+        )
+        return path, asyncio.get_running_loop().time() - began
+
+    path, seconds = asyncio.run(run())
+
+    with open(path, "rb") as f:
+        assert f.read() == body
+    assert [m for m, _, _ in range_server.requests if m == "GET"] == ["GET", "GET"]
+    assert seconds < 10
+
+
+def test_adownload_files_limits_per_host(range_server, tmp_path):
+    for i in range(6):
+        range_server.files[f"/f{i}.zip"] = make_zip(50_000, seed=i)
+    urls = [range_server.url(f"/f{i}.zip") for i in range(6)]
+    running = 0
+    peak = 0
+
+    def callback(evt):
+        nonlocal running, peak
+        if evt["type"] == "download_start":
+            running += 1
+            peak = max(peak, running)
+        elif evt["type"] == "download_complete":
+            running -= 1
+
+    results = asyncio.run(
+        adownload_files(urls, str(tmp_path), max_per_host=2, callback=callback)
+    )
+
+    assert results.ok
+    assert len(results.successes) == 6
+    assert peak <= 2
+
+
+def test_adownload_files_downloads_repeated_urls_once(range_server, tmp_path):
+    range_server.files["/u.zip"] = make_zip(50_000)
+    url = range_server.url("/u.zip")
+
+    results = asyncio.run(adownload_files([url, url], str(tmp_path)))
+
+    assert results.ok
+    assert results.successes == [os.path.join(str(tmp_path), "u.zip")]
+    assert [m for m, _, _ in range_server.requests if m == "GET"] == ["GET"]
+
+
+def test_cancelled_download_keeps_partial(range_server, tmp_path):
+    body = make_zip(2_000_000)
+    range_server.files["/c.zip"] = body
+    file_path = os.path.join(str(tmp_path), "c.zip")
+
+    async def run():
+        started = asyncio.Event()
+
+        def callback(evt):
+            if evt["type"] == "download_progress":
+                started.set()
+
+        task = asyncio.create_task(
+            adownload_file(
+                range_server.url("/c.zip"),
+                str(tmp_path),
+                callback=callback,
+                chunk_size=16 * 1024,
+            )
+        )
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+    assert not os.path.exists(file_path)
+    state = read_sidecar(file_path)
+    assert state["offset"] == os.path.getsize(file_path + ".part") > 0
+
+    path = asyncio.run(adownload_file(range_server.url("/c.zip"), str(tmp_path)))
+    with open(path, "rb") as f:
+        assert f.read() == body
@@ -0,0 +1,89 @@
+"""
+Test file to check the concurrent bulk downloader download_files
+"""
+
+import threading
+
+from conftest import make_zip
+
+from SurVigilance.ui.scrapers import DownloadResults, download_files
+
+PAYLOAD = make_zip(256 * 1024)
+
+
+def test_download_files_reports_successes_and_failures(range_server, tmp_path):
+    urls = []
+    for q in range(1, 5):
+        path = f"/faers_ascii_2097q{q}.zip"
+        range_server.files[path] = make_zip(256 * 1024, seed=q)
+        urls.append(range_server.url(path))
+    missing = range_server.url("/faers_ascii_1900q1.zip")
+
+    events = []
+    caller = threading.get_ident()
+
+    def callback(evt):
+        assert threading.get_ident() == caller
+        events.append(evt)
+
+    result = download_files(
+        [*urls, missing],
+        download_dir=str(tmp_path),
+        max_workers=3,
+        num_retries=1,
+        callback=callback,
+        poll_interval=0.05,
+    )
+
+    assert isinstance(result, DownloadResults)
+    assert not result.ok
+    assert sorted(result.successes) == sorted(
+        str(tmp_path / f"faers_ascii_2097q{q}.zip") for q in range(1, 5)
+    )
+    assert [u for u, _ in result.failures] == [missing]
+    for q in range(1, 5):
+        assert (tmp_path / f"faers_ascii_2097q{q}.zip").read_bytes() == make_zip(
+            256 * 1024, seed=q
+        )
+    assert result.downloaded_bytes == sum(
+        len(range_server.files[f"/faers_ascii_2097q{q}.zip"]) for q in range(1, 5)
+    )
+
+    progress = [e for e in events if e["type"] == "download_progress"]
+    assert all("bytes_per_sec" in e and "url" in e for e in progress)
+    assert any(e["type"] == "batch_progress" for e in events)
+    assert events[-1]["type"] == "batch_complete"
+    assert events[-1]["successes"] == 4 and events[-1]["failures"] == 1
+
+
+def test_download_files_reuses_connections(range_server, tmp_path):
+    urls = []
+    for i in range(8):
+        path = f"/file{i}.zip"
+        range_server.files[path] = PAYLOAD
+        urls.append(range_server.url(path))
+
+    result = download_files(urls, download_dir=str(tmp_path), max_workers=2)
+
+    assert result.ok and len(result.successes) == 8
+    assert len(range_server.connections) <= 2
+
+
+def test_download_files_downloads_repeated_urls_once(range_server, tmp_path):
+    range_server.files["/faers_ascii_2097q1.zip"] = PAYLOAD
+    url = range_server.url("/faers_ascii_2097q1.zip")
+    events = []
+
+    result = download_files(
+        [url, url, url],
+        download_dir=str(tmp_path),
+        num_retries=1,
+        callback=events.append,
+        poll_interval=0.05,
+    )
+
+    assert result.ok
+    assert result.successes == [str(tmp_path / "faers_ascii_2097q1.zip")]
+    assert result.downloaded_bytes == len(PAYLOAD)
+    assert [m for m, _, _ in range_server.requests if m == "GET"] == ["GET"]
+    assert events[-1]["successes"] == 1
@@ -0,0 +1,90 @@
+"""
+Test file to check the process-wide bandwidth and connection limits
+"""
+
+import threading
+import time
+
+import pytest
+import requests
+from conftest import make_zip
+
+from SurVigilance.ui.scrapers import (
+    DownloadLimits,
+    configure_download_limits,
+    download_file,
+)
+from SurVigilance.ui.scrapers import download_governor as dg
+from SurVigilance.ui.scrapers._downloads import governed_get
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    """Replace the process-wide governor with a fresh one for the test."""
+    fresh = dg.DownloadGovernor(DownloadLimits(max_connections_per_host=4))
+    monkeypatch.setattr(dg, "_GOVERNOR", fresh)
+    return fresh
+
+
+def test_token_bucket_charges_for_bytes_over_the_burst():
+    bucket = dg.TokenBucket(rate=1000, burst=500)
+    assert bucket.reserve(500) == 0
+    assert bucket.reserve(250) == pytest.approx(0.25, abs=0.01)
+    assert dg.TokenBucket(rate=None).reserve(10**9) == 0
+
+
+def test_aimd_window_halves_and_recovers(governor):
+    url = "http://example.org/a.zip"
+    governor.record_backoff(url)
+    assert governor.host_limit(url) == 2
+    governor.record_backoff(url)
+    governor.record_backoff(url)
+    assert governor.host_limit(url) == 1
+    for _ in range(10):
+        governor.record_success(url)
+    assert governor.host_limit(url) == 4
+
+    configure_download_limits(max_bytes_per_sec=8000, max_connections_per_host=4)
+    governor.record_backoff(url)
+    assert governor.bucket.rate == 4000
+    governor.record_success(url)
+    assert governor.bucket.rate == 4800
+
+
+def test_connections_per_host_are_capped(governor):
+    configure_download_limits(max_connections_per_host=2)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def worker(host):
+        nonlocal running, peak
+        with governor.connection(f"http://{host}/f.zip"):
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+
+    threads = [threading.Thread(target=worker, args=("a.org",)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak == 2
+
+
+def test_503_shrinks_window_and_delays_host(governor, range_server, tmp_path):
+    range_server.files["/g.zip"] = make_zip(50_000)
+    range_server.reject["/g.zip"] = 1
+    url = range_server.url("/g.zip")
+
+    with requests.Session() as s, governed_get(s, url, timeout=10) as r:
+        assert r.status_code == 503
+    assert governor.host_limit(url) == 2
+
+    began = time.monotonic()
+    download_file(url, str(tmp_path))
+    assert time.monotonic() - began >= 0.9
+    assert governor.host_limit(url) == 3
@@ -0,0 +1,57 @@
+"""
+Test file to check the streaming checksum and zip validation of downloads
+"""
+
+import hashlib
+import os
+import zipfile
+
+import pytest
+from conftest import make_zip
+
+from SurVigilance.ui.scrapers import download_file
+from SurVigilance.ui.scrapers._downloads import check_zip_tail
+
+
+@pytest.mark.parametrize("segments", [1, 3])
+def test_valid_zip_is_hashed_while_downloading(range_server, tmp_path, segments):
+    payload = make_zip(3 * 1024 * 1024)
+    range_server.files["/faers_ascii_2095q1.zip"] = payload
+    url = range_server.url("/faers_ascii_2095q1.zip")
+
+    events = []
+    path = download_file(
+        url=url, download_dir=str(tmp_path), segments=segments, callback=events.append
+    )
+
+    assert events[-1]["type"] == "download_complete"
+    assert events[-1]["sha256"] == hashlib.sha256(payload).hexdigest()
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+
+
+def test_corrupt_zip_is_downloaded_again_and_not_returned(range_server, tmp_path):
+    payload = make_zip(64 * 1024)
+    corrupt = payload[:-30] + b"\0" * 30  # damaged end of central directory
+    range_server.files["/faers_ascii_2095q2.zip"] = corrupt
+    url = range_server.url("/faers_ascii_2095q2.zip")
+
+    with pytest.raises(zipfile.BadZipFile):
+        download_file(url=url, download_dir=str(tmp_path), num_retries=2, retry_delay=0)
+
+    gets = [h for m, _, h in range_server.requests if m == "GET"]
+    assert len(gets) == 2
+    assert all("Range" not in h for h in gets)
+    assert not os.path.exists(tmp_path / "faers_ascii_2095q2.zip")
+    assert not os.path.exists(tmp_path / "faers_ascii_2095q2.zip.part")
+
+
+def test_check_zip_tail_accepts_zip64_and_rejects_truncation(monkeypatch):
+    monkeypatch.setattr(zipfile, "ZIP_FILECOUNT_LIMIT", 1)
+    payload = make_zip(1024)
+    assert b"PK\x06\x06" in payload
+
+    check_zip_tail(payload[:4], payload[-4096:], len(payload))
+    with pytest.raises(zipfile.BadZipFile):
+        truncated = payload[:-200]
+        check_zip_tail(truncated[:4], truncated[-4096:], len(truncated))
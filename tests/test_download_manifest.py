@@ -0,0 +1,75 @@
+"""
+Test file to check that download_file records a manifest and skips unchanged files
+"""
+
+import os
+
+from conftest import make_zip
+
+from SurVigilance.ui.scrapers import DownloadManifest, download_file
+from SurVigilance.ui.scrapers.download_manifest import file_sha256
+
+PAYLOAD = make_zip(128 * 1024)
+CHANGED = make_zip(128 * 1024, seed=1)
+
+
+def _gets(server):
+    return [r for r in server.requests if r[0] == "GET"]
+
+
+def test_manifest_records_downloaded_file(range_server, tmp_path):
+    range_server.files["/faers_ascii_2096q1.zip"] = PAYLOAD
+    url = range_server.url("/faers_ascii_2096q1.zip")
+
+    path = download_file(url=url, download_dir=str(tmp_path))
+
+    entry = DownloadManifest(str(tmp_path)).get("faers_ascii_2096q1.zip")
+    assert entry["url"] == url
+    assert entry["size"] == len(PAYLOAD)
+    assert entry["sha256"] == file_sha256(path)
+    assert entry["etag"] and entry["last_modified"]
+
+
+def test_unchanged_file_is_not_downloaded_again(range_server, tmp_path):
+    range_server.files["/faers_ascii_2096q2.zip"] = PAYLOAD
+    url = range_server.url("/faers_ascii_2096q2.zip")
+    download_file(url=url, download_dir=str(tmp_path))
+    range_server.requests.clear()
+
+    events = []
+    path = download_file(url=url, download_dir=str(tmp_path), callback=events.append)
+
+    assert _gets(range_server) == []
+    method, _, headers = range_server.requests[0]
+    assert method == "HEAD" and "If-None-Match" in headers
+    assert events[-1]["type"] == "download_complete" and events[-1]["skipped"]
+    assert os.path.getsize(path) == len(PAYLOAD)
+
+
+def test_changed_file_is_downloaded_again(range_server, tmp_path):
+    range_server.files["/faers_ascii_2096q3.zip"] = PAYLOAD
+    url = range_server.url("/faers_ascii_2096q3.zip")
+    download_file(url=url, download_dir=str(tmp_path))
+
+    range_server.files["/faers_ascii_2096q3.zip"] = CHANGED
+    range_server.requests.clear()
+    path = download_file(url=url, download_dir=str(tmp_path))
+
+    assert len(_gets(range_server)) == 1
+    with open(path, "rb") as f:
+        assert f.read() == CHANGED
+    entry = DownloadManifest(str(tmp_path)).get("faers_ascii_2096q3.zip")
+    assert entry["sha256"] == file_sha256(path)
+
+
+def test_existing_file_without_entry_is_adopted(range_server, tmp_path):
+    range_server.files["/faers_ascii_2096q4.zip"] = PAYLOAD
+    url = range_server.url("/faers_ascii_2096q4.zip")
+    (tmp_path / "faers_ascii_2096q4.zip").write_bytes(PAYLOAD)
+
+    download_file(url=url, download_dir=str(tmp_path))
+
+    assert _gets(range_server) == []
+    assert DownloadManifest(str(tmp_path)).get("faers_ascii_2096q4.zip")["size"] == len(
+        PAYLOAD
+    )
@@ -0,0 +1,90 @@
+"""
+Test file to check that download progress events are rate limited and merged
+"""
+
+from conftest import make_zip
+
+from SurVigilance.ui.scrapers import ProgressPolicy, download_file
+from SurVigilance.ui.scrapers._downloads import AdaptiveChunkSize
+
+
+def _progress(total, step):
+    return [
+        {
+            "type": "download_progress",
+            "downloaded_bytes": n,
+            "total_bytes": total,
+            "percent": int(n * 100 / total),
+        }
+        for n in range(step, total + 1, step)
+    ]
+
+
+def test_policy_merges_events_and_keeps_the_last_one():
+    received = []
+    emit = ProgressPolicy(min_interval=60, min_percent_step=1).wrap(received.append)
+
+    emit({"type": "download_start", "total_bytes": 1000})
+    for evt in _progress(1000, 1)[:-1]:
+        emit(evt)
+    emit({"type": "error", "message": "connection reset"})
+
+    types = [e["type"] for e in received]
+    assert types == [
+        "download_start",
+        "download_progress",
+        "download_progress",
+        "error",
+    ]
+    # The merged event carries the latest byte count before the error.
+    assert received[2]["downloaded_bytes"] == 999
+
+
+def test_policy_respects_percent_step():
+    received = []
+    emit = ProgressPolicy(min_interval=0, min_percent_step=10).wrap(received.append)
+
+    for evt in _progress(1000, 1):
+        emit(evt)
+
+    percents = [e["percent"] for e in received]
+    assert percents == [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+
+
+def test_download_file_coalesces_progress_events(range_server, tmp_path):
+    payload = make_zip(2 * 1024 * 1024)
+    range_server.files["/faers_ascii_2094q1.zip"] = payload
+    url = range_server.url("/faers_ascii_2094q1.zip")
+
+    every_chunk = []
+    download_file(
+        url=url,
+        download_dir=str(tmp_path / "a"),
+        callback=every_chunk.append,
+        progress_policy=ProgressPolicy(0, 0),
+        chunk_size=8192,
+    )
+    throttled = []
+    download_file(
+        url=url,
+        download_dir=str(tmp_path / "b"),
+        callback=throttled.append,
+        progress_policy=ProgressPolicy(min_interval=0, min_percent_step=25),
+    )
+
+    def count(events):
+        return sum(e["type"] == "download_progress" for e in events)
+
+    assert count(every_chunk) >= len(payload) // 8192
+    assert count(throttled) <= 5
+    last = [e for e in throttled if e["type"] == "download_progress"][-1]
+    assert last["downloaded_bytes"] == len(payload)
+
+
+def test_adaptive_chunk_size_grows_with_throughput():
+    sizer = AdaptiveChunkSize(minimum=1024, maximum=1 << 20, target_seconds=0.1)
+    sizer.observe(1024, 1.0)  # 1 KiB/s
+    assert sizer.size == 1024
+    for _ in range(20):
+        sizer.observe(1 << 20, 0.01)  # 100 MiB/s
+    assert sizer.size == 1 << 20
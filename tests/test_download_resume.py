@@ -0,0 +1,67 @@
+"""
+Test file to check that download_file resumes interrupted transfers
+"""
+
+import json
+import os
+
+import pytest
+import requests
+from conftest import make_zip
+
+from SurVigilance.ui.scrapers import download_file
+
+PAYLOAD = make_zip(1024 * 1024)
+
+
+def test_download_file_resumes_after_dropped_connection(range_server, tmp_path):
+    range_server.files["/faers_ascii_2099q1.zip"] = PAYLOAD
+    range_server.fail_after["/faers_ascii_2099q1.zip"] = 300_000
+    url = range_server.url("/faers_ascii_2099q1.zip")
+    out_dir = tmp_path / "faers"
+
+    with pytest.raises((requests.RequestException, OSError)):
+        download_file(url=url, download_dir=str(out_dir), num_retries=1)
+
+    part = out_dir / "faers_ascii_2099q1.zip.part"
+    sidecar = out_dir / "faers_ascii_2099q1.zip.part.json"
+    assert part.is_file() and sidecar.is_file()
+    offset = os.path.getsize(part)
+    assert 0 < offset < len(PAYLOAD)
+    state = json.loads(sidecar.read_text())
+    assert state["url"] == url
+    assert state["offset"] == offset
+
+    events = []
+    path = download_file(url=url, download_dir=str(out_dir), callback=events.append)
+
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert not part.exists() and not sidecar.exists()
+
+    method, _, headers = range_server.requests[-1]
+    assert method == "GET"
+    assert headers["Range"] == f"bytes={offset}-"
+
+    start = next(e for e in events if e["type"] == "download_start")
+    assert start["resumed_from"] == offset
+    progress = [e for e in events if e["type"] == "download_progress"]
+    assert progress[0]["downloaded_bytes"] > offset
+    assert progress[-1]["downloaded_bytes"] == len(PAYLOAD)
+
+
+def test_download_file_restarts_when_remote_file_changed(range_server, tmp_path):
+    range_server.files["/faers_ascii_2099q2.zip"] = PAYLOAD
+    range_server.fail_after["/faers_ascii_2099q2.zip"] = 100_000
+    url = range_server.url("/faers_ascii_2099q2.zip")
+    out_dir = tmp_path / "faers"
+
+    with pytest.raises((requests.RequestException, OSError)):
+        download_file(url=url, download_dir=str(out_dir), num_retries=1)
+
+    changed = make_zip(1024 * 1024, seed=1)
+    range_server.files["/faers_ascii_2099q2.zip"] = changed
+    path = download_file(url=url, download_dir=str(out_dir))
+
+    with open(path, "rb") as f:
+        assert f.read() == changed
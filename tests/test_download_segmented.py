@@ -0,0 +1,74 @@
+"""
+Test file to check the segmented (parallel byte range) mode of download_file
+"""
+
+import pytest
+import requests
+from conftest import make_zip
+
+from SurVigilance.ui.scrapers import download_file
+
+PAYLOAD = make_zip(6 * 1024 * 1024)
+
+
+def _range_gets(server, path):
+    return [
+        headers["Range"]
+        for method, p, headers in server.requests
+        if method == "GET" and p == path and "Range" in headers
+    ]
+
+
+def test_segmented_download_matches_source(range_server, tmp_path):
+    range_server.files["/faers_ascii_2099q3.zip"] = PAYLOAD
+    url = range_server.url("/faers_ascii_2099q3.zip")
+
+    events = []
+    path = download_file(
+        url=url, download_dir=str(tmp_path), segments=4, callback=events.append
+    )
+
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert len(_range_gets(range_server, "/faers_ascii_2099q3.zip")) == 4
+
+    start = next(e for e in events if e["type"] == "download_start")
+    assert start["segments"] == 4
+    progress = [
+        e["downloaded_bytes"] for e in events if e["type"] == "download_progress"
+    ]
+    assert progress == sorted(progress)
+    assert progress[-1] == len(PAYLOAD)
+
+
+def test_segmented_download_falls_back_without_range_support(range_server, tmp_path):
+    range_server.accept_ranges = False
+    range_server.files["/faers_ascii_2099q4.zip"] = PAYLOAD
+    url = range_server.url("/faers_ascii_2099q4.zip")
+
+    path = download_file(url=url, download_dir=str(tmp_path), segments=4)
+
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert _range_gets(range_server, "/faers_ascii_2099q4.zip") == []
+
+
+def test_segmented_download_resumes_each_segment(range_server, tmp_path):
+    range_server.files["/faers_ascii_2098q1.zip"] = PAYLOAD
+    range_server.fail_after["/faers_ascii_2098q1.zip"] = 500_000
+    url = range_server.url("/faers_ascii_2098q1.zip")
+
+    with pytest.raises((requests.RequestException, OSError)):
+        download_file(url=url, download_dir=str(tmp_path), segments=3, num_retries=1)
+
+    range_server.requests.clear()
+    path = download_file(url=url, download_dir=str(tmp_path), segments=3)
+
+    with open(path, "rb") as f:
+        assert f.read() == PAYLOAD
+    # Only the unfinished parts of the segments are requested again.
+    starts = [
+        int(r.split("=")[1].split("-")[0])
+        for r in _range_gets(range_server, "/faers_ascii_2098q1.zip")
+    ]
+    assert any(s % (len(PAYLOAD) // 3) != 0 for s in starts)
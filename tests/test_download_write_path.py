@@ -0,0 +1,83 @@
+"""
+Test file to check the preallocated, block-buffered write path of downloads
+"""
+
+import errno
+import hashlib
+import os
+from collections import namedtuple
+
+import pytest
+from conftest import make_zip
+
+from SurVigilance.ui.scrapers import _downloads, download_file
+from SurVigilance.ui.scrapers._downloads import BlockWriter, read_sidecar, write_sidecar
+
+
+def test_block_writer_coalesces_small_writes():
+    calls = []
+    writer = BlockWriter(lambda data, pos: calls.append((bytes(data), pos)), 100, 16)
+
+    for i in range(10):
+        writer.write(bytes([i]) * 5)
+    writer.flush()
+
+    assert [pos for _, pos in calls] == [100, 116, 132, 148]
+    assert b"".join(data for data, _ in calls) == b"".join(
+        bytes([i]) * 5 for i in range(10)
+    )
+    assert writer.end == 150
+
+
+def test_disk_full_fails_before_transfer(range_server, tmp_path, monkeypatch):
+    range_server.files["/big.zip"] = make_zip(200_000)
+    usage = namedtuple("usage", "total used free")
+    monkeypatch.setattr(
+        _downloads.shutil, "disk_usage", lambda path: usage(10**6, 10**6, 1000)
+    )
+
+    with pytest.raises(OSError) as excinfo:
+        download_file(range_server.url("/big.zip"), str(tmp_path), num_retries=5)
+
+    assert excinfo.value.errno == errno.ENOSPC
+    assert [m for m, _, _ in range_server.requests].count("GET") == 1
+    part = os.path.join(str(tmp_path), "big.zip.part")
+    assert os.path.getsize(part) == 0
+
+
+def test_interrupted_transfer_gives_back_preallocated_space(range_server, tmp_path):
+    body = make_zip(3_000_000)
+    range_server.files["/p.zip"] = body
+    range_server.fail_after["/p.zip"] = 1_000_000
+    file_path = os.path.join(str(tmp_path), "p.zip")
+
+    with pytest.raises(OSError):
+        download_file(range_server.url("/p.zip"), str(tmp_path), num_retries=1)
+
+    size = os.path.getsize(file_path + ".part")
+    assert 0 < size < len(body)
+    assert read_sidecar(file_path)["offset"] == size
+
+
+def test_resume_trusts_sidecar_over_preallocated_size(range_server, tmp_path):
+    body = make_zip(500_000)
+    range_server.files["/s.zip"] = body
+    url = range_server.url("/s.zip")
+    file_path = os.path.join(str(tmp_path), "s.zip")
+    etag = '"' + hashlib.md5(body).hexdigest() + '"'
+
+    # As left by a process killed mid-transfer: the file has its full,
+    # preallocated length but the sidecar only vouches for the first bytes.
+    with open(file_path + ".part", "wb") as f:
+        f.write(body[:100_000] + bytes(len(body) - 100_000))
+    write_sidecar(
+        file_path,
+        {"url": url, "etag": etag, "total_bytes": len(body), "offset": 100_000},
+    )
+
+    download_file(url, str(tmp_path), num_retries=1)
+
+    with open(file_path, "rb") as f:
+        assert f.read() == body
+    get = [h for m, _, h in range_server.requests if m == "GET"]
+    assert get[0]["Range"] == "bytes=100000-"
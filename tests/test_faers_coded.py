@@ -0,0 +1,163 @@
+"""
+Test file to check the integer-coded, memory-mapped REAC and DRUG arrays
+"""
+
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from conftest import faers_rows, make_faers_zip
+
+from SurVigilance.faers import CodedArrays, convert_to_warehouse, update_coded_arrays
+from SurVigilance.faers.coded import (
+    ROLE_BITS,
+    bitmask,
+    merge_join,
+    normalize_drugnames,
+)
+
+
+def _add_quarter(tmp_path, warehouse, quarter):
+    path = tmp_path / f"faers_ascii_2024q{quarter}.zip"
+    path.write_bytes(make_faers_zip(2024, quarter, cases=30))
+    convert_to_warehouse(str(path), warehouse, tables=["DRUG", "REAC"])
+
+
+def _expected_counts(quarters, drug):
+    counts = Counter()
+    for q in quarters:
+        rows = faers_rows(2024, q, cases=30)
+        with_drug = {r["primaryid"] for r in rows["DRUG"] if r["drugname"] == drug}
+        pairs = {(r["primaryid"], r["pt"]) for r in rows["REAC"]}
+        counts.update(pt for pid, pt in pairs if pid in with_drug)
+    return counts
+
+
+def test_drug_names_are_normalized():
+    names = pa.array([" aspirin.", "ASPIRIN", "Humira  40 mg", None])
+    assert normalize_drugnames(names).to_pylist() == [
+        "ASPIRIN",
+        "ASPIRIN",
+        "HUMIRA 40 MG",
+        None,
+    ]
+
+
+def test_arrays_grow_one_quarter_at_a_time(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 1)
+    first = update_coded_arrays(warehouse)
+    pts_before = CodedArrays(warehouse).pts
+
+    _add_quarter(tmp_path, warehouse, 2)
+    second = update_coded_arrays(warehouse)
+
+    assert first["quarters"] == ["2024Q1"]
+    assert second["quarters"] == ["2024Q2"]
+    assert second["reports"] > first["reports"]
+    coded = CodedArrays(warehouse)
+    assert coded.pts[: len(pts_before)] == pts_before
+    assert isinstance(coded.reac_pt, np.memmap)
+    assert coded.reac_pt.dtype == np.int32
+    assert np.all(np.diff(coded.reac_report) >= 0)
+    assert set(coded.report_quarters.tolist()) == {20241, 20242}
+
+    counts = coded.pt_counts("aspirin")
+    assert counts.to_dict() == dict(_expected_counts((1, 2), "ASPIRIN"))
+    assert update_coded_arrays(warehouse)["quarters"] == []
+
+
+def test_interrupted_update_is_rolled_back(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 1)
+    update_coded_arrays(warehouse)
+    with open(os.path.join(warehouse, "coded", "reac.pt.i32"), "ab") as f:
+        f.write(b"\x00" * 12)
+
+    _add_quarter(tmp_path, warehouse, 2)
+    update_coded_arrays(warehouse)
+
+    coded = CodedArrays(warehouse)
+    assert os.path.getsize(os.path.join(warehouse, "coded", "reac.pt.i32")) == (
+        4 * len(coded.reac_report)
+    )
+    assert coded.pt_counts("ASPIRIN").to_dict() == dict(
+        _expected_counts((1, 2), "ASPIRIN")
+    )
+
+
+def test_merge_join_matches_pandas_merge():
+    rng = np.random.default_rng(0)
+    left = np.sort(rng.integers(0, 50, 300))
+    right = np.sort(rng.integers(0, 50, 200))
+    chunks = list(merge_join(left, right, chunk_size=7))
+    i = np.concatenate([c[0] for c in chunks])
+    j = np.concatenate([c[1] for c in chunks])
+    assert np.all(left[i] == right[j])
+    expected = pd.merge(
+        pd.DataFrame({"key": left, "i": np.arange(len(left))}),
+        pd.DataFrame({"key": right, "j": np.arange(len(right))}),
+        on="key",
+    )
+    assert sorted(zip(i, j)) == sorted(zip(expected["i"], expected["j"]))
+    assert list(merge_join(left[:0], right)) == []
+
+
+def test_drug_reactions_streams_the_join(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 1)
+    update_coded_arrays(warehouse)
+    coded = CodedArrays(warehouse)
+
+    chunks = list(coded.drug_reactions(chunk_size=10))
+    assert len(chunks) > 1
+    joined = pd.concat(chunks, ignore_index=True)
+    rows = faers_rows(2024, 1, cases=30)
+    expected = {
+        (d["primaryid"], d["drugname"], r["pt"])
+        for d in rows["DRUG"]
+        for r in rows["REAC"]
+        if d["primaryid"] == r["primaryid"]
+    }
+    found = {
+        (str(coded.reports[rep]), coded.drugs[drug], coded.pts[pt])
+        for rep, drug, pt in joined.itertuples(index=False)
+    }
+    assert found == expected
+    assert len(joined) == len(expected)
+
+    aspirin = pd.concat(coded.drug_reactions("ASPIRIN"))
+    assert set(aspirin["drug"]) == {coded.drug_code("ASPIRIN")}
+
+
+def test_role_and_outcome_bitmasks_filter_counts(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    path = tmp_path / "faers_ascii_2024q1.zip"
+    path.write_bytes(make_faers_zip(2024, 1, cases=30))
+    convert_to_warehouse(str(path), warehouse, tables=["DRUG", "REAC", "OUTC"])
+    update_coded_arrays(warehouse)
+    coded = CodedArrays(warehouse)
+    assert coded.drug_roles.dtype == coded.report_outcomes.dtype == np.uint8
+
+    rows = faers_rows(2024, 1, cases=30)
+    outcomes = {}
+    for r in rows["OUTC"]:
+        outcomes.setdefault(r["primaryid"], set()).add(r["outc_cod"])
+    with_drug = {
+        r["primaryid"]
+        for r in rows["DRUG"]
+        if r["drugname"] == "ASPIRIN" and r["role_cod"] in ("PS", "SS")
+    }
+    serious = {pid for pid, codes in outcomes.items() if codes & {"DE", "HO"}}
+    expected = Counter(
+        r["pt"] for r in rows["REAC"] if r["primaryid"] in with_drug & serious
+    )
+    counts = coded.pt_counts("ASPIRIN", roles=["PS", "ss"], outcomes=["DE", "HO"])
+    assert counts.to_dict() == dict(expected)
+    assert coded.pt_counts("ASPIRIN", roles=["I"]).empty
+    assert bitmask(["PS", "C"], ROLE_BITS) == 5
+    with pytest.raises(ValueError, match="Unknown code"):
+        bitmask(["XX"], ROLE_BITS)
@@ -0,0 +1,86 @@
+"""
+Test file to check the sparse drug x PT case counts and their 2x2 tables
+"""
+
+from collections import Counter
+
+import numpy as np
+from conftest import faers_rows, make_faers_zip
+
+from SurVigilance.faers import (
+    DrugEventCube,
+    convert_to_warehouse,
+    update_drug_event_cube,
+)
+
+
+def _add_quarter(tmp_path, warehouse, quarter):
+    path = tmp_path / f"faers_ascii_2024q{quarter}.zip"
+    path.write_bytes(make_faers_zip(2024, quarter, cases=30, seed=quarter))
+    convert_to_warehouse(str(path), warehouse, tables=["DEMO", "DRUG", "REAC"])
+
+
+def _expected(quarters):
+    # Pairs of the latest report of every case, counted from the rows.
+    latest = {}
+    for q in quarters:
+        rows = faers_rows(2024, q, cases=30, seed=q)
+        for r in rows["DEMO"]:
+            key = (int(r["caseversion"]), int(r["fda_dt"]), int(r["primaryid"]))
+            if r["caseid"] not in latest or key > latest[r["caseid"]][0]:
+                latest[r["caseid"]] = (key, q, r["primaryid"])
+    drugs, pts = {}, {}
+    for _, q, pid in latest.values():
+        rows = faers_rows(2024, q, cases=30, seed=q)
+        drugs[pid] = {r["drugname"] for r in rows["DRUG"] if r["primaryid"] == pid}
+        pts[pid] = {r["pt"] for r in rows["REAC"] if r["primaryid"] == pid}
+    pairs = Counter((d, p) for pid in drugs for d in drugs[pid] for p in pts[pid])
+    drug_cases = Counter(d for pid in drugs for d in drugs[pid])
+    pt_cases = Counter(p for pid in pts for p in pts[pid])
+    return pairs, drug_cases, pt_cases, len(latest)
+
+
+def _tables(cube):
+    tables = cube.two_by_two()
+    return {
+        (str(r.drug), str(r.pt)): (r.a, r.b, r.c, r.d)
+        for r in tables.itertuples(index=False)
+    }
+
+
+def test_cube_counts_latest_reports_and_updates_incrementally(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 1)
+    assert update_drug_event_cube(warehouse)["quarters"] == ["2024Q1"]
+    _add_quarter(tmp_path, warehouse, 2)
+    result = update_drug_event_cube(warehouse)
+    assert result["quarters"] == ["2024Q2"]
+    # Every case of 2024Q1 is followed up in 2024Q2.
+    assert result["removed"] == result["added"] == result["cases"]
+
+    pairs, drug_cases, pt_cases, n = _expected([1, 2])
+    cube = DrugEventCube(warehouse)
+    assert cube.n_cases == n
+    tables = _tables(cube)
+    assert {k: v[0] for k, v in tables.items()} == dict(pairs)
+    for (drug, pt), (a, b, c, d) in tables.items():
+        assert a + b == drug_cases[drug]
+        assert a + c == pt_cases[pt]
+        assert a + b + c + d == n
+
+    fresh = str(tmp_path / "fresh")
+    _add_quarter(tmp_path, fresh, 1)
+    _add_quarter(tmp_path, fresh, 2)
+    update_drug_event_cube(fresh)
+    assert _tables(DrugEventCube(fresh)) == tables
+    assert update_drug_event_cube(warehouse)["added"] == 0
+
+
+def test_two_by_two_min_count(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 1)
+    update_drug_event_cube(warehouse)
+    cube = DrugEventCube(warehouse)
+    tables = cube.two_by_two(min_count=3)
+    assert (tables["a"] >= 3).all()
+    assert len(tables) == int(np.sum(cube.counts.data >= 3))
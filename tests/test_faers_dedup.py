@@ -0,0 +1,76 @@
+"""
+Test file to check the deduplication of FAERS case versions across quarters
+"""
+
+import numpy as np
+import pyarrow.parquet as pq
+from conftest import faers_rows, make_faers_zip
+
+from SurVigilance.faers import (
+    convert_to_warehouse,
+    latest_reports,
+    open_warehouse,
+    read_case_index,
+    update_case_index,
+)
+from SurVigilance.faers.dedup import latest_versions
+
+
+def _add_quarter(tmp_path, warehouse, quarter, cases):
+    path = tmp_path / f"faers_ascii_2024q{quarter}.zip"
+    path.write_bytes(make_faers_zip(2024, quarter, cases=cases))
+    convert_to_warehouse(str(path), warehouse, tables=["DEMO", "REAC"])
+
+
+def test_latest_versions_ranks_version_then_date_then_primaryid():
+    caseid = np.array([7, 5, 7, 5, 9, 9])
+    version = np.array([1, 1, 2, -1, -1, -1])
+    fda_dt = np.array([20240101, 20240101, 20230101, 20240301, 20240101, 20240101])
+    primaryid = np.array([701, 501, 702, 500, 900, 901])
+
+    keep = latest_versions(caseid, version, fda_dt, primaryid)
+
+    assert primaryid[keep].tolist() == [501, 702, 901]
+
+
+def test_index_is_updated_one_quarter_at_a_time(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 1, cases=20)
+    first = update_case_index(warehouse)
+    assert first["quarters"] == ["2024Q1"]
+    assert first["cases"] == 20
+
+    _add_quarter(tmp_path, warehouse, 2, cases=8)
+    second = update_case_index(warehouse)
+
+    assert second["quarters"] == ["2024Q2"]
+    assert second["rows"] == len(faers_rows(2024, 2, cases=8)["DEMO"])
+    assert second["cases"] == 20
+    assert second["seconds_per_million_rows"] > 0
+    assert second["bytes_per_million_rows"] > 0
+    index = read_case_index(warehouse).to_pandas().set_index("caseid")
+    # Cases 1000-1007 were reported again in Q2, the others only in Q1.
+    assert (index.loc[1000:1007, "quarter"] == 2).all()
+    assert (index.loc[1008:, "quarter"] == 1).all()
+    assert index.loc[1000, "primaryid"] == 100002
+    assert index.loc[1001, "primaryid"] == 100101
+
+    assert update_case_index(warehouse)["quarters"] == []
+    rebuilt = update_case_index(warehouse, rebuild=True)
+    assert rebuilt["quarters"] == ["2024Q1", "2024Q2"]
+    assert pq.read_table(rebuilt["path"]).equals(read_case_index(warehouse))
+
+
+def test_latest_reports_filters_other_tables(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 1, cases=12)
+    update_case_index(warehouse)
+
+    reac = open_warehouse(warehouse, "REAC").to_table(filter=latest_reports(warehouse))
+
+    rows = faers_rows(2024, 1, cases=12)
+    latest = {}
+    for r in rows["DEMO"]:
+        latest[r["caseid"]] = max(latest.get(r["caseid"], 0), int(r["primaryid"]))
+    expected = [r for r in rows["REAC"] if int(r["primaryid"]) in latest.values()]
+    assert reac.num_rows == len(expected) < len(rows["REAC"])
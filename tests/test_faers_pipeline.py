@@ -0,0 +1,74 @@
+"""
+Test file to check the FAERS Parquet conversion and the download/ingest pipeline
+"""
+
+import os
+
+import pyarrow.parquet as pq
+from conftest import faers_rows, make_faers_zip
+
+from SurVigilance.faers import convert_quarter, download_and_ingest, table_path
+
+
+def test_convert_quarter_writes_every_table(tmp_path):
+    zip_path = os.path.join(str(tmp_path), "faers_ascii_2024q1.zip")
+    with open(zip_path, "wb") as f:
+        f.write(make_faers_zip(2024, 1))
+    expected = faers_rows(2024, 1)
+
+    result = convert_quarter(zip_path, str(tmp_path / "parquet"))
+
+    assert (result["year"], result["quarter"]) == (2024, 1)
+    assert set(result["tables"]) == set(expected)
+    reac = pq.read_table(table_path(str(tmp_path / "parquet"), 2024, 1, "REAC"))
+    assert reac.num_rows == len(expected["REAC"])
+    assert reac.column_names == ["primaryid", "caseid", "pt", "drug_rec_act"]
+    assert reac.column("pt").to_pylist() == [r["pt"] for r in expected["REAC"]]
+
+
+def test_convert_quarter_reads_legacy_aers(tmp_path):
+    zip_path = os.path.join(str(tmp_path), "aers_ascii_2011q2.zip")
+    with open(zip_path, "wb") as f:
+        f.write(make_faers_zip(2011, 2, legacy=True))
+
+    result = convert_quarter(zip_path, str(tmp_path), tables=["DRUG"])
+
+    drug = pq.read_table(result["tables"]["DRUG"]["path"])
+    assert result["tables"]["DRUG"]["skipped_rows"] == 0
+    assert drug.column_names[:4] == ["isr", "drug_seq", "role_cod", "drugname"]
+    assert drug.num_rows == len(faers_rows(2011, 2)["DRUG"])
+
+
+def test_download_and_ingest_overlaps_stages(range_server, tmp_path):
+    urls = []
+    for q in (1, 2, 3):
+        range_server.files[f"/faers_ascii_2023q{q}.zip"] = make_faers_zip(2023, q)
+        urls.append(range_server.url(f"/faers_ascii_2023q{q}.zip"))
+    events = []
+
+    result = download_and_ingest(
+        urls, str(tmp_path), max_pending=1, callback=events.append
+    )
+
+    assert result.ok
+    assert sorted(q["quarter"] for q in result.quarters) == [1, 2, 3]
+    for q in (1, 2, 3):
+        assert os.path.isfile(table_path(str(tmp_path / "parquet"), 2023, q, "DEMO"))
+    assert set(result.stage_seconds) == {"download", "ingest", "ingest_wait"}
+    types = [e["type"] for e in events]
+    assert types.count("ingest_complete") == 3
+    assert types[-1] == "pipeline_complete"
+    # Each quarter is ingested only after its download completed.
+    for q in (1, 2, 3):
+        name = f"faers_ascii_2023q{q}.zip"
+        done = next(
+            i
+            for i, e in enumerate(events)
+            if e["type"] == "download_complete" and e["filename"] == name
+        )
+        start = next(
+            i
+            for i, e in enumerate(events)
+            if e["type"] == "ingest_start" and e["filename"] == name
+        )
+        assert done < start
@@ -0,0 +1,75 @@
+"""
+Test file to check the inverted index from drugs, ingredients and PTs to reports
+"""
+
+import os
+
+import numpy as np
+from conftest import faers_rows, make_faers_zip
+
+from SurVigilance.faers import PostingsIndex, convert_to_warehouse, update_postings
+from SurVigilance.faers.postings import decode_varints, encode_varints, intersect
+
+
+def _add_quarter(tmp_path, warehouse, quarter):
+    path = tmp_path / f"faers_ascii_2024q{quarter}.zip"
+    path.write_bytes(make_faers_zip(2024, quarter, cases=30, seed=quarter))
+    convert_to_warehouse(str(path), warehouse, tables=["DRUG", "REAC"])
+
+
+def _expected(quarters, drug=None, pt=None):
+    with_drug, with_pt = set(), set()
+    for q in quarters:
+        rows = faers_rows(2024, q, cases=30, seed=q)
+        with_drug |= {
+            int(r["primaryid"]) for r in rows["DRUG"] if r["drugname"] == drug
+        }
+        with_pt |= {int(r["primaryid"]) for r in rows["REAC"] if r["pt"] == pt}
+    if drug and pt:
+        return sorted(with_drug & with_pt)
+    return sorted(with_drug or with_pt)
+
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 2**35, 2**63 - 1], dtype=np.uint64)
+    data, sizes = encode_varints(values)
+    assert sizes.tolist() == [1, 1, 1, 2, 2, 6, 9]
+    assert bytes(data[3:5]) == b"\x80\x01"
+    assert decode_varints(data).tolist() == values.tolist()
+
+
+def test_intersect_sorted_lists():
+    a = np.array([1, 5, 9, 12, 40])
+    b = np.array([5, 6, 12, 13, 40, 41, 90])
+    assert intersect(a, b).tolist() == [5, 12, 40]
+    assert intersect(a, b, np.array([12, 40])).tolist() == [12, 40]
+    assert intersect(a, np.array([], dtype=np.int64)).tolist() == []
+
+
+def test_lookups_match_tables_and_update_incrementally(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 1)
+    assert update_postings(warehouse)["quarters"] == ["2024Q1"]
+    index = PostingsIndex(warehouse)
+    assert index.lookup("drug", "ASPIRIN").tolist() == _expected([1], "ASPIRIN")
+
+    _add_quarter(tmp_path, warehouse, 2)
+    result = update_postings(warehouse)
+    assert result["quarters"] == ["2024Q2"]
+    assert result["drug"]["bytes"] < 8 * result["drug"]["postings"]
+    assert update_postings(warehouse) == {"quarters": []}
+    assert not [p for p in os.listdir(tmp_path) if p.endswith((".tmp", ".old"))]
+
+    index = PostingsIndex(warehouse)
+    for drug in ("ASPIRIN", "HUMIRA"):
+        assert index.lookup("drug", drug).tolist() == _expected([1, 2], drug)
+        # Names are normalized, and prod_ai holds the lower-case name.
+        assert index.lookup("drug", f" {drug.lower()}.").tolist() == _expected(
+            [1, 2], drug
+        )
+        assert index.lookup("ingredient", drug).tolist() == _expected([1, 2], drug)
+    assert index.lookup("pt", "Nausea").tolist() == _expected([1, 2], pt="Nausea")
+    assert index.cases(drug="HUMIRA", pt="Nausea").tolist() == _expected(
+        [1, 2], "HUMIRA", "Nausea"
+    )
+    assert index.lookup("drug", "NO SUCH DRUG").tolist() == []
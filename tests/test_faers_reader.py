@@ -0,0 +1,83 @@
+"""
+Test file to check that read_table streams typed FAERS tables out of the quarterly zips
+"""
+
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from conftest import faers_rows, make_faers_zip
+
+from SurVigilance.faers import read_table
+
+
+@pytest.fixture
+def quarter(tmp_path):
+    path = tmp_path / "faers_ascii_2024q1.zip"
+    path.write_bytes(make_faers_zip(2024, 1, cases=200))
+    return str(path)
+
+
+def test_whole_table_is_typed(quarter):
+    demo = read_table(quarter, "demo")
+
+    expected = faers_rows(2024, 1, cases=200)["DEMO"]
+    assert len(demo) == len(expected)
+    assert demo["primaryid"].dtype == "Int64"
+    assert demo["caseversion"].dtype == "Int32"
+    assert demo["age"].dtype == "float64"
+    assert isinstance(demo["sex"].dtype, pd.CategoricalDtype)
+    assert demo["primaryid"].tolist() == [int(r["primaryid"]) for r in expected]
+
+
+def test_chunks_are_bounded_and_pruned(quarter):
+    chunks = list(
+        read_table(quarter, "DRUG", chunksize=50, usecols=["primaryid", "drugname"])
+    )
+
+    total = len(faers_rows(2024, 1, cases=200)["DRUG"])
+    assert [len(c) for c in chunks[:-1]] == [50] * (len(chunks) - 1)
+    assert sum(len(c) for c in chunks) == total
+    assert all(list(c.columns) == ["primaryid", "drugname"] for c in chunks)
+
+
+def test_arrow_output_and_legacy_archives(tmp_path):
+    path = tmp_path / "aers_ascii_2004q1.zip"
+    path.write_bytes(make_faers_zip(2004, 1, cases=30, legacy=True))
+
+    reac = read_table(str(path), "REAC", output="arrow")
+
+    assert isinstance(reac, pa.Table)
+    assert reac.column_names == ["isr", "pt"]
+    assert reac.schema.field("isr").type == pa.int64()
+
+
+def test_invalid_numbers_become_missing(tmp_path):
+    path = tmp_path / "faers_ascii_2024q2.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(
+            "ASCII/DEMO24Q2.txt",
+            "primaryid$caseid$age$age_cod\r\n101$1$45$YR\r\n201$2$4,5$YR\r\n"
+            "301$3$$\r\n",
+        )
+
+    demo = read_table(str(path), "DEMO")
+
+    assert demo["age"].tolist()[0] == 45.0
+    assert demo["age"].isna().tolist() == [False, True, True]
+    assert demo["age_cod"].isna().tolist() == [False, False, True]
+
+
+def test_unknown_table_or_column_is_rejected(quarter):
+    with pytest.raises(ValueError, match="Unknown FAERS table"):
+        read_table(quarter, "XYZ")
+    with pytest.raises(ValueError, match="not in the REAC table"):
+        read_table(quarter, "REAC", chunksize=10, usecols=["pt", "drugname"])
+
+
+def test_no_files_are_extracted(quarter, tmp_path):
+    before = sorted(p.name for p in tmp_path.iterdir())
+    for _ in read_table(quarter, "REAC", chunksize=25):
+        pass
+    assert sorted(p.name for p in tmp_path.iterdir()) == before
@@ -0,0 +1,91 @@
+"""
+Test file to check the per-quarter drug x PT counts used for trend queries
+"""
+
+import os
+from collections import Counter
+
+from conftest import faers_rows, make_faers_zip
+
+from SurVigilance.faers import DrugPTSeries, convert_to_warehouse, update_drug_pt_series
+
+
+def _add_quarter(tmp_path, warehouse, quarter):
+    path = tmp_path / f"faers_ascii_2024q{quarter}.zip"
+    path.write_bytes(make_faers_zip(2024, quarter, cases=30, seed=quarter))
+    convert_to_warehouse(str(path), warehouse, tables=["DRUG", "REAC"])
+
+
+def _expected(quarter, drug):
+    rows = faers_rows(2024, quarter, cases=30, seed=quarter)
+    with_drug = {r["primaryid"] for r in rows["DRUG"] if r["drugname"] == drug}
+    pairs = {(r["primaryid"], r["pt"]) for r in rows["REAC"]}
+    return Counter(pt for pid, pt in pairs if pid in with_drug)
+
+
+def test_series_appends_quarters_and_returns_history(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 1)
+    assert update_drug_pt_series(warehouse)["quarters"] == ["2024Q1"]
+    offsets = os.path.join(warehouse, "series", "offsets.i64")
+    size = os.path.getsize(offsets)
+
+    _add_quarter(tmp_path, warehouse, 2)
+    assert update_drug_pt_series(warehouse)["quarters"] == ["2024Q2"]
+    assert update_drug_pt_series(warehouse)["quarters"] == []
+    assert os.path.getsize(offsets) > size
+
+    series = DrugPTSeries(warehouse)
+    history = series.history("aspirin")
+    assert list(history.columns) == ["quarter", "pt", "count"]
+    for quarter in (1, 2):
+        rows = history[history["quarter"] == f"2024Q{quarter}"]
+        assert dict(zip(rows["pt"].astype(str), rows["count"])) == dict(
+            _expected(quarter, "ASPIRIN")
+        )
+
+    trend = series.pair("ASPIRIN", "Nausea")
+    assert list(trend.index) == ["2024Q1", "2024Q2"]
+    assert trend.tolist() == [_expected(q, "ASPIRIN")["Nausea"] for q in (1, 2)]
+
+
+def test_interrupted_append_is_rolled_back(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 1)
+    update_drug_pt_series(warehouse)
+    with open(os.path.join(warehouse, "series", "pt.i32"), "ab") as f:
+        f.write(b"\x00" * 8)
+
+    _add_quarter(tmp_path, warehouse, 2)
+    update_drug_pt_series(warehouse)
+    history = DrugPTSeries(warehouse).history("HUMIRA")
+    rows = history[history["quarter"] == "2024Q2"]
+    assert dict(zip(rows["pt"].astype(str), rows["count"])) == dict(
+        _expected(2, "HUMIRA")
+    )
+
+
+def test_chunks_keep_offsets_of_reported_drugs_only(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    _add_quarter(tmp_path, warehouse, 2)
+    update_drug_pt_series(warehouse)
+    # An earlier quarter added later is coded after the later one.
+    _add_quarter(tmp_path, warehouse, 1)
+    update_drug_pt_series(warehouse)
+
+    series = DrugPTSeries(warehouse)
+    for chunk in series.chunks:
+        quarter = chunk["quarter"]
+        rows = faers_rows(2024, quarter, cases=30, seed=quarter)
+        reported = {r["primaryid"] for r in rows["REAC"]}
+        drugs = {r["drugname"] for r in rows["DRUG"] if r["primaryid"] in reported}
+        assert chunk["drugs"] == len(drugs)
+    assert len(series._offsets) == sum(c["drugs"] + 1 for c in series.chunks)
+    assert len(series._drug) == sum(c["drugs"] for c in series.chunks)
+
+    history = series.history("ASPIRIN")
+    for quarter in (1, 2):
+        rows = history[history["quarter"] == f"2024Q{quarter}"]
+        assert dict(zip(rows["pt"].astype(str), rows["count"])) == dict(
+            _expected(quarter, "ASPIRIN")
+        )
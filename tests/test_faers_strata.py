@@ -0,0 +1,108 @@
+"""
+Test file to check the age, sex and country stratified report counts
+"""
+
+from collections import Counter
+
+import numpy as np
+import pyarrow as pa
+import pytest
+from conftest import faers_rows, make_faers_zip
+
+from SurVigilance.faers import (
+    CodedArrays,
+    convert_to_warehouse,
+    stratify,
+    update_coded_arrays,
+)
+from SurVigilance.faers._schema import age_in_years
+
+UNITS = {"YR": 1, "MON": 1 / 12, "DEC": 10}
+
+
+@pytest.fixture
+def coded(tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    for quarter in (1, 2):
+        path = tmp_path / f"faers_ascii_2024q{quarter}.zip"
+        path.write_bytes(make_faers_zip(2024, quarter, cases=40, seed=quarter))
+        convert_to_warehouse(str(path), warehouse, tables=["DEMO", "DRUG", "REAC"])
+    update_coded_arrays(warehouse)
+    return CodedArrays(warehouse)
+
+
+def _age_bin(age, unit):
+    years = float(age) * UNITS[unit]
+    bins = [(65, "65+"), (18, "18-65"), (12, "12-18"), (2, "2-12"), (0, "0-2")]
+    return next(label for edge, label in bins if years >= edge)
+
+
+def _expected(drug, pt=None):
+    counts = Counter()
+    for quarter in (1, 2):
+        rows = faers_rows(2024, quarter, cases=40, seed=quarter)
+        reports = {r["primaryid"] for r in rows["DRUG"] if r["drugname"] == drug}
+        if pt is not None:
+            reports &= {r["primaryid"] for r in rows["REAC"] if r["pt"] == pt}
+        for r in rows["DEMO"]:
+            if r["primaryid"] in reports:
+                stratum = (
+                    _age_bin(r["age"], r["age_cod"]),
+                    r["sex"] or "unknown",
+                    r["occr_country"],
+                )
+                counts[stratum] += 1
+    return counts
+
+
+def test_ages_are_converted_to_years():
+    age = pa.array([30.0, 6.0, 3.0, 2.0, 12.0, 5.0, -1.0, None])
+    unit = pa.array(["YR", "MON", "DEC", "WK", "HR", "XX", "YR", "YR"])
+    years = age_in_years(age, unit).to_pylist()
+    assert years[:5] == pytest.approx(
+        [30.0, 0.5, 30.0, 14 / 365.25, 12 / (24 * 365.25)]
+    )
+    assert years[5:] == [None, None, None]
+
+
+def test_counts_match_the_demo_rows(coded):
+    strata = stratify(coded, "aspirin")
+    assert list(strata.axes) == ["age", "sex", "country"]
+    assert strata.axes["age"] == ["0-2", "2-12", "12-18", "18-65", "65+", "unknown"]
+    assert strata.counts.shape == (6, 3, len(coded.countries) + 1)
+    frame = strata.to_frame()
+    found = {(r.age, r.sex, r.country): r.count for r in frame.itertuples(index=False)}
+    assert found == dict(_expected("ASPIRIN"))
+
+    by_sex = stratify(coded, "ASPIRIN", by=["sex"])
+    assert by_sex.counts.tolist() == strata.counts.sum(axis=(0, 2)).tolist()
+
+
+def test_unknown_sex_is_the_last_label(coded):
+    strata = stratify(coded, "ASPIRIN", by=["sex"])
+    assert strata.axes["sex"] == ["F", "M", "unknown"]
+    expected = Counter()
+    for (_, sex, _), count in _expected("ASPIRIN").items():
+        expected[sex] += count
+    assert expected["unknown"] > 0
+    assert strata.counts.tolist() == [expected[s] for s in ("F", "M", "unknown")]
+
+
+def test_pt_axis_counts_reports_of_the_drug_and_pt(coded):
+    strata = stratify(coded, "HUMIRA", pts=["Nausea", "Rash", "Not a PT"])
+    assert strata.axes["pt"] == ["Nausea", "Rash", "Not a PT"]
+    for i, pt in enumerate(["Nausea", "Rash"]):
+        cells = strata.counts[..., i]
+        assert cells.sum() == sum(_expected("HUMIRA", pt).values())
+    assert not strata.counts[..., 2].any()
+
+
+def test_bad_arguments_are_rejected(coded):
+    with pytest.raises(ValueError, match="dimension"):
+        stratify(coded, "ASPIRIN", by=["weight"])
+    with pytest.raises(ValueError, match="increasing"):
+        stratify(coded, "ASPIRIN", age_bins=[18, 2])
+    assert np.array_equal(
+        stratify(coded, "ASPIRIN", by=[]).counts,
+        np.array(sum(_expected("ASPIRIN").values())),
+    )
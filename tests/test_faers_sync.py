@@ -0,0 +1,74 @@
+"""
+Test file to check that sync_faers plans and downloads only the missing FAERS quarters
+"""
+
+import pandas as pd
+from conftest import make_faers_zip
+
+from SurVigilance.faers import sync_faers
+from SurVigilance.faers.sync import available_quarters, parse_quarter
+
+AVAILABLE = [(2023, 3), (2023, 4), (2024, 1), (2024, 2)]
+
+
+def _serve(server):
+    for year, quarter in AVAILABLE:
+        path = f"/faers_ascii_{year}q{quarter}.zip"
+        server.files[path] = make_faers_zip(year, quarter, seed=quarter)
+    return lambda year, quarter: server.url(f"/faers_ascii_{year}q{quarter}.zip")
+
+
+def test_parse_quarter():
+    assert parse_quarter("2020Q3") == (2020, 3)
+    assert parse_quarter("2020 q2") == (2020, 2)
+    assert parse_quarter(2019) == (2019, 1)
+    assert parse_quarter((2018, 4)) == (2018, 4)
+
+
+def test_dry_run_prints_plan_without_downloading(range_server, tmp_path, capsys):
+    url_for = _serve(range_server)
+
+    plan = sync_faers(
+        str(tmp_path),
+        since="2023Q4",
+        dry_run=True,
+        available=AVAILABLE,
+        url_for=url_for,
+    )
+
+    assert range_server.requests == []
+    assert plan.results is None
+    assert plan.missing == [(2023, 4), (2024, 1), (2024, 2)]
+    out = capsys.readouterr().out
+    assert "to download: 3" in out
+    assert "2024Q2" in out and "2023Q3" not in out
+
+
+def test_sync_downloads_only_the_gaps(range_server, tmp_path):
+    url_for = _serve(range_server)
+    sync_faers(str(tmp_path), available=AVAILABLE[:2], workers=2, url_for=url_for)
+    range_server.requests.clear()
+
+    plan = sync_faers(str(tmp_path), available=AVAILABLE, workers=2, url_for=url_for)
+
+    assert plan.present == [(2023, 3), (2023, 4)]
+    assert plan.missing == [(2024, 1), (2024, 2)]
+    assert plan.results.ok and len(plan.results.successes) == 2
+    fetched = sorted(r[1] for r in range_server.requests if r[0] == "GET")
+    assert fetched == ["/faers_ascii_2024q1.zip", "/faers_ascii_2024q2.zip"]
+    assert (tmp_path / "faers" / "faers_ascii_2024q2.zip").is_file()
+
+
+def test_available_quarters_reads_saved_list(tmp_path):
+    pd.DataFrame(
+        {
+            "Year": ["2024", "2024", "2012"],
+            "Quarter": ["January - March", "April - June", "October - December"],
+        }
+    ).to_csv(tmp_path / "faers_available_quarters.csv", index=False)
+
+    assert available_quarters(str(tmp_path), refresh=False) == [
+        (2012, 4),
+        (2024, 1),
+        (2024, 2),
+    ]
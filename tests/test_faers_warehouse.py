@@ -0,0 +1,183 @@
+"""
+Test file to check the Parquet warehouse built from FAERS and AERS quarters
+"""
+
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+from conftest import faers_rows, make_faers_zip
+
+from SurVigilance.faers import (
+    build_warehouse,
+    open_warehouse,
+    quarters_with_drug,
+    table_path,
+)
+from SurVigilance.faers.bloom import BloomFilter
+
+
+@pytest.fixture
+def downloads(tmp_path):
+    folder = tmp_path / "faers"
+    folder.mkdir()
+    (folder / "aers_ascii_2011q2.zip").write_bytes(
+        make_faers_zip(2011, 2, cases=40, legacy=True)
+    )
+    (folder / "faers_ascii_2024q1.zip").write_bytes(make_faers_zip(2024, 1, cases=40))
+    # Subsets made by fetch_zip_members are not whole quarters.
+    (folder / "faers_ascii_2024q1-reac.zip").write_bytes(b"")
+    return str(folder)
+
+
+def test_every_quarter_gets_the_faers_columns(downloads):
+    events = []
+    result = build_warehouse(downloads, callback=events.append)
+
+    assert [(q["year"], q["quarter"]) for q in result["quarters"]] == [
+        (2011, 2),
+        (2024, 1),
+    ]
+    assert events[-1]["type"] == "warehouse_complete"
+    old = pq.read_table(table_path(result["warehouse_dir"], 2011, 2, "DEMO"))
+    new = pq.read_table(table_path(result["warehouse_dir"], 2024, 1, "DEMO"))
+    assert old.schema == new.schema
+    assert old.schema.field("primaryid").type == pa.int64()
+    meta = pq.ParquetFile(table_path(result["warehouse_dir"], 2011, 2, "DEMO"))
+    sex = meta.metadata.row_group(0).column(old.schema.get_field_index("sex"))
+    assert "RLE_DICTIONARY" in sex.encodings
+    expected = faers_rows(2011, 2, cases=40)["DEMO"]
+    assert old.column("primaryid").to_pylist() == [
+        int(r["primaryid"]) for r in expected
+    ]
+    assert old.column("sex").to_pylist() == [r["sex"] or None for r in expected]
+    assert old.column("caseversion").null_count == old.num_rows
+    units = {"YR": 1, "MON": 1 / 12, "DEC": 10}
+    assert new.column("age_years").to_pylist() == pytest.approx(
+        [
+            float(r["age"]) * units[r["age_cod"]]
+            for r in faers_rows(2024, 1, cases=40)["DEMO"]
+        ]
+    )
+
+    ther = pq.read_table(table_path(result["warehouse_dir"], 2011, 2, "THER"))
+    assert ther.column("dsg_drug_seq").null_count == 0
+
+
+def test_drug_rows_are_sorted_by_name(downloads, tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    build_warehouse(downloads, warehouse, tables=["DRUG"], row_group_size=10)
+
+    path = table_path(warehouse, 2024, 1, "DRUG")
+    drug = pq.read_table(path)
+    names = drug.column("drugname").to_pylist()
+    assert names == sorted(names)
+    assert drug.num_rows == len(faers_rows(2024, 1, cases=40)["DRUG"])
+    meta = pq.ParquetFile(path).metadata
+    stats = [meta.row_group(i).column(4).statistics for i in range(meta.num_row_groups)]
+    assert all(s.has_min_max for s in stats)
+    assert [s.min for s in stats] == sorted(s.min for s in stats)
+
+    fragment = next(open_warehouse(warehouse, "DRUG").get_fragments())
+    groups = fragment.split_by_row_group(ds.field("drugname") == "ZOLOFT")
+    assert 0 < len(groups) < meta.num_row_groups
+
+
+def test_open_warehouse_spans_quarters(downloads):
+    result = build_warehouse(downloads)
+
+    drug = open_warehouse(result["warehouse_dir"], "drug")
+    aspirin = drug.to_table(
+        columns=["primaryid", "year"], filter=ds.field("drugname") == "ASPIRIN"
+    )
+    expected = [
+        r
+        for y, q in ((2011, 2), (2024, 1))
+        for r in faers_rows(y, q, cases=40)["DRUG"]
+        if r["drugname"] == "ASPIRIN"
+    ]
+    assert aspirin.num_rows == len(expected)
+    assert set(aspirin.column("year").to_pylist()) == {2011, 2024}
+    assert pa.types.is_dictionary(drug.schema.field("drugname").type)
+    recent = drug.count_rows(filter=ds.field("year") == 2024)
+    assert recent == len(faers_rows(2024, 1, cases=40)["DRUG"])
+    assert not any(
+        name.endswith(".tmp")
+        for _, _, files in os.walk(result["warehouse_dir"])
+        for name in files
+    )
+
+    with pytest.raises(ValueError, match="Unknown FAERS table"):
+        open_warehouse(result["warehouse_dir"], "XYZ")
+
+
+def test_bloom_filters_skip_quarters_without_a_drug(downloads):
+    warehouse = build_warehouse(downloads, tables=["DRUG", "REAC"])["warehouse_dir"]
+
+    assert quarters_with_drug(warehouse, " aspirin.") == [(2011, 2), (2024, 1)]
+    assert quarters_with_drug(warehouse, "NO SUCH DRUG") == []
+    reac = open_warehouse(warehouse, "REAC", drug="NO SUCH DRUG")
+    assert reac.count_rows() == 0
+    assert open_warehouse(warehouse, "REAC", drug="ASPIRIN").count_rows() > 0
+
+    # Quarters converted without a filter are never skipped.
+    path = table_path(warehouse, 2011, 2, "DRUG")
+    pq.write_table(pq.read_table(path).replace_schema_metadata(), path)
+    assert quarters_with_drug(warehouse, "NO SUCH DRUG") == [(2011, 2)]
+
+    bloom = BloomFilter.from_string(BloomFilter.for_items(["A", "B"]).to_string())
+    assert "A" in bloom and "B" in bloom
+    misses = sum(f"X{i}" in bloom for i in range(1000))
+    assert misses < 50
+
+
+def test_workers_produce_the_same_warehouse(downloads, tmp_path):
+    one = build_warehouse(downloads, str(tmp_path / "one"))
+    events = []
+    four = build_warehouse(
+        downloads, str(tmp_path / "four"), workers=4, callback=events.append
+    )
+
+    assert four["failures"] == []
+    for a, b in zip(one["quarters"], four["quarters"]):
+        assert sorted(a["tables"]) == sorted(b["tables"])
+        for table in a["tables"]:
+            assert pq.read_table(a["tables"][table]["path"]).equals(
+                pq.read_table(b["tables"][table]["path"])
+            )
+    types = [e["type"] for e in events]
+    assert types.count("ingest_start") == types.count("ingest_complete") == 2
+
+
+def test_interrupted_build_resumes(downloads, tmp_path):
+    warehouse = str(tmp_path / "warehouse")
+    build_warehouse(downloads, warehouse)
+    os.remove(table_path(warehouse, 2024, 1, "REAC"))
+
+    events = []
+    result = build_warehouse(downloads, warehouse, callback=events.append)
+
+    tables = result["quarters"][1]["tables"]
+    assert "resumed" not in tables["REAC"]
+    assert all(tables[t]["resumed"] for t in tables if t != "REAC")
+    assert all(t["resumed"] for t in result["quarters"][0]["tables"].values())
+    assert [e["filename"] for e in events if e["type"] == "ingest_start"] == [
+        "faers_ascii_2024q1.zip"
+    ]
+    assert tables["DEMO"]["rows"] == len(faers_rows(2024, 1, cases=40)["DEMO"])
+
+
+def test_failed_tables_are_reported(downloads, tmp_path):
+    broken = os.path.join(downloads, "faers_ascii_2024q2.zip")
+    with open(broken, "wb") as f:
+        f.write(b"not a zip")
+
+    result = build_warehouse(downloads, str(tmp_path / "warehouse"), workers=2)
+
+    assert {(os.path.basename(p), t) for p, t, _ in result["failures"]} == {
+        ("faers_ascii_2024q2.zip", t)
+        for t in ("DEMO", "DRUG", "REAC", "OUTC", "RPSR", "THER", "INDI")
+    }
+    assert len(result["quarters"][1]["tables"]) == 7
@@ -0,0 +1,105 @@
+"""
+Test file to check that selected members of a remote zip are fetched with Range requests
+"""
+
+import io
+import struct
+import zipfile
+
+import pytest
+import requests
+from conftest import make_faers_zip
+
+from SurVigilance.faers import convert_quarter
+from SurVigilance.ui.scrapers import RemoteZip, fetch_zip_members
+
+ARCHIVE = make_faers_zip(2024, 1, cases=6000)
+
+
+def _gets(server):
+    return [r for r in server.requests if r[0] == "GET"]
+
+
+def _with_zip64_offsets(data: bytes) -> bytes:
+    """Rewrite every central directory entry to keep its offset in a zip64 extra."""
+    eocd = data.rfind(b"PK\x05\x06")
+    _, _, _, _, n, cd_size, cd_offset, _ = struct.unpack_from("<4s4H2LH", data, eocd)
+    cd = data[cd_offset : cd_offset + cd_size]
+    out = bytearray()
+    pos = 0
+    for _ in range(n):
+        fields = list(struct.unpack_from("<4s4B4HL2L5H2L", cd, pos))
+        name_len, extra_len, comment_len = fields[12:15]
+        name = cd[pos + 46 : pos + 46 + name_len]
+        extra = struct.pack("<HHQ", 1, 8, fields[18])
+        fields[13] = len(extra)
+        fields[14] = 0
+        fields[18] = 0xFFFFFFFF
+        out += struct.pack("<4s4B4HL2L5H2L", *fields) + name + extra
+        pos += 46 + name_len + extra_len + comment_len
+    end = struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, n, n, len(out), cd_offset, 0)
+    return data[:cd_offset] + bytes(out) + end
+
+
+def test_only_selected_members_are_fetched(range_server, tmp_path):
+    range_server.files["/faers_ascii_2024q1.zip"] = ARCHIVE
+    url = range_server.url("/faers_ascii_2024q1.zip")
+
+    events = []
+    path = fetch_zip_members(
+        url, ["DEMO", "DRUG", "REAC"], str(tmp_path), callback=events.append
+    )
+
+    assert path.endswith("faers_ascii_2024q1-demo-drug-reac.zip")
+    with zipfile.ZipFile(path) as small, zipfile.ZipFile(io.BytesIO(ARCHIVE)) as full:
+        assert small.testzip() is None
+        assert sorted(small.namelist()) == [
+            "ASCII/DEMO24Q1.txt",
+            "ASCII/DRUG24Q1.txt",
+            "ASCII/REAC24Q1.txt",
+        ]
+        for name in small.namelist():
+            assert small.read(name) == full.read(name)
+
+    complete = events[-1]
+    assert complete["type"] == "download_complete"
+    assert complete["fetched_bytes"] < len(ARCHIVE)
+    assert all("Range" in r[2] for r in _gets(range_server))
+
+    converted = convert_quarter(path, str(tmp_path / "parquet"))
+    assert sorted(converted["tables"]) == ["DEMO", "DRUG", "REAC"]
+
+
+def test_unchanged_archive_is_not_fetched_again(range_server, tmp_path):
+    range_server.files["/faers_ascii_2024q1.zip"] = ARCHIVE
+    url = range_server.url("/faers_ascii_2024q1.zip")
+    fetch_zip_members(url, ["REAC"], str(tmp_path))
+    range_server.requests.clear()
+
+    fetch_zip_members(url, ["REAC"], str(tmp_path))
+
+    assert [r[2]["Range"] for r in _gets(range_server)] == ["bytes=-131072"]
+
+
+def test_zip64_offsets_are_read_and_rewritten(range_server, tmp_path):
+    range_server.files["/faers_ascii_2024q1.zip"] = _with_zip64_offsets(ARCHIVE)
+    url = range_server.url("/faers_ascii_2024q1.zip")
+
+    rz = RemoteZip(url)
+    with zipfile.ZipFile(io.BytesIO(ARCHIVE)) as full:
+        offsets = {i.filename: i.header_offset for i in full.infolist()}
+    assert {m.filename: m.header_offset for m in rz.members} == offsets
+
+    path = fetch_zip_members(url, ["DRUG", "OUTC"], str(tmp_path))
+    with zipfile.ZipFile(path) as small, zipfile.ZipFile(io.BytesIO(ARCHIVE)) as full:
+        assert small.read("ASCII/OUTC24Q1.txt") == full.read("ASCII/OUTC24Q1.txt")
+        assert small.read("ASCII/DRUG24Q1.txt") == full.read("ASCII/DRUG24Q1.txt")
+
+
+def test_server_without_ranges_is_reported(range_server, tmp_path):
+    range_server.accept_ranges = False
+    range_server.files["/faers_ascii_2024q1.zip"] = ARCHIVE
+    url = range_server.url("/faers_ascii_2024q1.zip")
+
+    with pytest.raises(requests.HTTPError, match="range requests"):
+        fetch_zip_members(url, ["REAC"], str(tmp_path), num_retries=1)